@@ -0,0 +1,263 @@
+"""Replay recorded messages through the Moderation automod pipeline.
+
+Messages go through the same checks as live ones (spam, duplicates,
+filter, mentions and links) with the cog in dry-run mode: violations are
+collected instead of acted on, and no Discord connection is made. The cog
+runs in a temporary directory, so no data files of the bot are touched;
+``--data`` copies the bot's filter lists, link policies and automod
+profiles in first.
+
+Input is JSON lines, one message per line::
+
+    {"author_id": 1, "content": "hello", "guild_id": 2, "channel_id": 3,
+     "timestamp": 1700000000.5, "mentions": 0, "roles": [], "label": "ok"}
+
+Only ``author_id`` and ``content`` are required. ``timestamp`` is epoch
+seconds or ISO 8601 and drives the spam windows, ``label`` ("ok" or
+"spam") marks known good or bad messages to score the run against.
+
+Usage:
+    python -m benchmarks.automod_replay messages.jsonl [--data data]
+        [--set spam_threshold=4] [--filter word] [--show 20] [--output flagged.jsonl]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+
+from cogs.moderation import Moderation
+
+DATA_FILES = ("filtered_words.json", "link_policies.json", "automod_profiles.json")
+
+
+class ReplayObjects:
+    """Builds and caches the guild, channel and member stand-ins of a replay."""
+
+    def __init__(self):
+        self.guilds = {}
+        self.channels = {}
+        self.members = {}
+
+    def guild(self, guild_id: int):
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            guild = self.guilds[guild_id] = SimpleNamespace(id=guild_id, name=str(guild_id))
+        return guild
+
+    def channel(self, guild, channel_id: int, category_id=None):
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            channel = self.channels[channel_id] = SimpleNamespace(
+                id=channel_id, guild=guild, category_id=category_id, parent_id=None,
+                mention=f"<#{channel_id}>")
+        return channel
+
+    def member(self, guild, record: dict):
+        key = (guild.id, record["author_id"])
+        member = self.members.get(key)
+        if member is None:
+            member = self.members[key] = SimpleNamespace(
+                id=record["author_id"], guild=guild, bot=bool(record.get("bot")),
+                roles=[SimpleNamespace(id=role_id) for role_id in record.get("roles", [])],
+                guild_permissions=SimpleNamespace(administrator=bool(record.get("admin"))),
+                mention=f"<@{record['author_id']}>")
+        return member
+
+
+def parse_timestamp(value, index: int, interval: float) -> float:
+    if value is None:
+        return index * interval
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    return float(value)
+
+
+def read_messages(stream, interval: float):
+    """Yield replay messages from JSON lines."""
+    objects = ReplayObjects()
+    for index, line in enumerate(stream):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        guild = objects.guild(record.get("guild_id", 0))
+        channel = objects.channel(guild, record.get("channel_id", 0), record.get("category_id"))
+        mentions = record.get("mentions", 0)
+        yield SimpleNamespace(
+            id=record.get("id", index),
+            guild=guild,
+            channel=channel,
+            author=objects.member(guild, record),
+            content=record["content"],
+            mentions=mentions if isinstance(mentions, list) else [None] * int(mentions),
+            timestamp=parse_timestamp(record.get("timestamp"), index, interval),
+            label=record.get("label")
+        )
+
+
+def build_cog(args) -> Moderation:
+    os.makedirs("data", exist_ok=True)
+    if args.data:
+        for name in DATA_FILES:
+            source = os.path.join(args.data, name)
+            if os.path.exists(source):
+                shutil.copy(source, os.path.join("data", name))
+
+    cog = Moderation(SimpleNamespace(user=None, outbound=None, guilds=[]))
+    for setting in args.set:
+        name, _, value = setting.partition("=")
+        if name not in vars(cog.config):
+            raise SystemExit(f"Unknown setting: {name}")
+        setattr(cog.config, name, int(value))
+    for word in args.filter:
+        cog.word_filter.add_global(word)
+    cog.dry_run_log = []
+    return cog
+
+
+async def replay(cog: Moderation, messages) -> dict:
+    current = SimpleNamespace(time=0.0)
+    cog.clock = lambda: current.time
+    timer = time.perf_counter
+
+    counts = Counter()
+    history = defaultdict(int)
+    first_violation = {}
+    labels = Counter()
+    processed = 0
+    elapsed = 0.0
+    for message in messages:
+        current.time = message.timestamp
+        before = len(cog.dry_run_log)
+        started = timer()
+        await cog.on_message(message)
+        elapsed += timer() - started
+        processed += 1
+
+        key = (message.guild.id, message.author.id)
+        flagged = cog.dry_run_log[before:]
+        if flagged and key not in first_violation:
+            first_violation[key] = history[key]
+        history[key] += 1
+        if message.label:
+            labels[(message.label, bool(flagged))] += 1
+        for _, violation_type in flagged:
+            counts[violation_type] += 1
+
+    return {
+        "messages": processed,
+        "elapsed": elapsed,
+        "counts": counts,
+        "history": history,
+        "first_violation": first_violation,
+        "labels": labels
+    }
+
+
+def false_positive_candidates(cog: Moderation, result: dict, established: int):
+    """Return violations likely to be wrong.
+
+    Messages labelled "ok", and the only violation of members who had
+    posted ``established`` messages without one before.
+    """
+    violations = Counter((m.guild.id, m.author.id) for m, _ in cog.dry_run_log)
+    candidates = []
+    for message, violation_type in cog.dry_run_log:
+        key = (message.guild.id, message.author.id)
+        if message.label == "ok":
+            candidates.append((message, violation_type, "labelled ok"))
+        elif violations[key] == 1 and result["first_violation"][key] >= established:
+            candidates.append((message, violation_type,
+                               f"first violation after {result['first_violation'][key]} messages"))
+    return candidates
+
+
+def describe(message) -> str:
+    content = message.content.replace("\n", " ")
+    if len(content) > 60:
+        content = content[:57] + "..."
+    return f"{message.guild.id}/{message.channel.id} <@{message.author.id}> {content!r}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSON lines file of messages, - for stdin")
+    parser.add_argument("--data", help="bot data directory to load filters, link policies "
+                                       "and automod profiles from")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="override an automod default, may be repeated")
+    parser.add_argument("--filter", action="append", default=[], metavar="WORD",
+                        help="add a filter entry for every guild, may be repeated")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="seconds between messages without a timestamp (default: 1)")
+    parser.add_argument("--established", type=int, default=20,
+                        help="messages after which a first violation is suspicious (default: 20)")
+    parser.add_argument("--show", type=int, default=10,
+                        help="number of violations and candidates to print (default: 10)")
+    parser.add_argument("--output", help="write every violation to this JSON lines file")
+    args = parser.parse_args()
+    # Would-be violations are reported below, not logged one by one
+    logging.getLogger("cogs.moderation").setLevel(logging.ERROR)
+
+    stream = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        if args.data:
+            args.data = os.path.abspath(args.data)
+        os.chdir(workdir)
+        try:
+            cog = build_cog(args)
+            result = asyncio.run(replay(cog, read_messages(stream, args.interval)))
+        finally:
+            os.chdir(cwd)
+            if stream is not sys.stdin:
+                stream.close()
+
+    log = cog.dry_run_log
+    flagged = {id(message) for message, _ in log}
+    print(f"{result['messages']:,} messages, {len(flagged):,} would be acted on "
+          f"({len(log):,} violations)")
+    if result["elapsed"]:
+        print(f"Throughput: {result['messages'] / result['elapsed']:,.0f} messages/s "
+              f"({result['elapsed']:.2f}s in the pipeline)")
+    for violation_type, count in result["counts"].most_common():
+        print(f"{violation_type:>20} {count:8,}")
+
+    labels = result["labels"]
+    if labels:
+        caught, missed = labels[("spam", True)], labels[("spam", False)]
+        wrong = labels[("ok", True)]
+        print(f"Labelled: {caught} of {caught + missed} spam caught, "
+              f"{wrong} of {wrong + labels[('ok', False)]} good messages flagged")
+
+    for message, violation_type in log[:args.show]:
+        print(f"  {violation_type:>18}: {describe(message)}")
+
+    candidates = false_positive_candidates(cog, result, args.established)
+    print(f"False-positive candidates: {len(candidates)}")
+    for message, violation_type, reason in candidates[:args.show]:
+        print(f"  {violation_type:>18}: {describe(message)} ({reason})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for message, violation_type in log:
+                f.write(json.dumps({
+                    "id": message.id,
+                    "guild_id": message.guild.id,
+                    "channel_id": message.channel.id,
+                    "author_id": message.author.id,
+                    "violation": violation_type,
+                    "content": message.content
+                }) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Drive the Levels message hot path with synthetic load.
+
+Fake guilds, members and messages are fed through the same stages a
+message goes through once it passes the XP cooldown: ``roll_message_xp``,
+``process_message_xp``, ``check_achievements``, ``check_tasks`` and
+``update_streak``. No Discord connection is made and reward notifications
+are discarded instead of sent. The cog runs in a temporary directory, so
+no data files of the bot are touched.
+
+Usage:
+    python -m benchmarks.levels_load [--messages 200000] [--users 10000]
+                                     [--guilds 10] [--rate 0] [--trace-memory]
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from cogs.levels import Levels
+from utils.metrics import RollingStats
+from utils.outbound import OutboundDispatcher
+
+STAGES = ("roll_message_xp", "process_message_xp", "check_achievements",
+          "check_tasks", "update_streak")
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.name = f"guild-{guild_id}"
+        self.roles = []
+        self.text_channels = []
+        self.system_channel = None
+        self.me = None
+
+    def get_role(self, role_id: int):
+        return None
+
+    def get_channel(self, channel_id: int):
+        return None
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int, guild: FakeGuild):
+        self.id = channel_id
+        self.guild = guild
+
+
+class FakeMember:
+    def __init__(self, user_id: int, guild: FakeGuild):
+        self.id = user_id
+        self.guild = guild
+        self.bot = False
+        self.name = f"user-{user_id}"
+        self.mention = f"<@{user_id}>"
+
+    def get_role(self, role_id: int):
+        return None
+
+
+class FakeMessage:
+    def __init__(self, author: FakeMember, channel: FakeChannel, content: str):
+        self.author = author
+        self.guild = author.guild
+        self.channel = channel
+        self.content = content
+
+
+def synthetic_messages(count: int, users: int, guilds: int, seed: int = 0):
+    """Yield ``count`` messages from ``users`` members spread over ``guilds``."""
+    rng = random.Random(seed)
+    guild_list = [FakeGuild(1000 + i) for i in range(guilds)]
+    channels = [FakeChannel(2000 + i, guild) for i, guild in enumerate(guild_list)]
+    members = [FakeMember(100000000000000000 + i, guild_list[i % guilds])
+               for i in range(users)]
+    contents = ["hi", "hello there!", "x" * 150]
+
+    for _ in range(count):
+        member = members[rng.randrange(users)]
+        yield FakeMessage(member, channels[member.guild.id - 1000], rng.choice(contents))
+
+
+def discard_notifications(cog: Levels):
+    queue = cog.notifier.queue
+    while not queue.empty():
+        queue.get_nowait()
+
+
+async def run(args) -> dict:
+    # The dispatcher is never started, so nothing is sent
+    cog = Levels(SimpleNamespace(outbound=OutboundDispatcher()))
+    stages = {stage: RollingStats(window=args.messages) for stage in STAGES}
+    interval = 1 / args.rate if args.rate else 0
+    timer = time.perf_counter
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if args.trace_memory:
+        tracemalloc.start()
+    heap_before = tracemalloc.get_traced_memory()[0] if args.trace_memory else 0
+
+    started = timer()
+    for i, message in enumerate(synthetic_messages(args.messages, args.users, args.guilds)):
+        if interval:
+            delay = started + i * interval - timer()
+            if delay > 0.001:
+                await asyncio.sleep(delay)
+
+        member = message.author
+        t0 = timer()
+        xp_gain = cog.roll_message_xp(message)
+        t1 = timer()
+        await cog.process_message_xp(member, message.channel, xp_gain)
+        t2 = timer()
+        await cog.check_achievements(member)
+        t3 = timer()
+        await cog.check_tasks(member, "messages", 1)
+        await cog.check_tasks(member, "xp", xp_gain)
+        t4 = timer()
+        await cog.update_streak(member)
+        t5 = timer()
+
+        for stage, begin, end in zip(STAGES, (t0, t1, t2, t3, t4), (t1, t2, t3, t4, t5)):
+            stages[stage].add((end - begin) * 1000)
+
+        if i % 1000 == 0:
+            discard_notifications(cog)
+            await asyncio.sleep(0)
+    elapsed = timer() - started
+
+    heap_after = 0
+    if args.trace_memory:
+        heap_after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+    return {
+        "elapsed": elapsed,
+        "stages": {stage: stats.summary() for stage, stats in stages.items()},
+        "table_users": len(cog.users),
+        "heap_growth": heap_after - heap_before,
+        "rss_growth": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * 1024,
+        "notifications": cog.notifier.events_received
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200000,
+                        help="number of synthetic messages (default: 200000)")
+    parser.add_argument("--users", type=int, default=10000,
+                        help="number of distinct users (default: 10000)")
+    parser.add_argument("--guilds", type=int, default=10,
+                        help="number of guilds the users are spread over (default: 10)")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="target messages per second, 0 for as fast as possible")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="measure Python heap growth with tracemalloc (slows the run)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            result = asyncio.run(run(args))
+        finally:
+            os.chdir(cwd)
+
+    print(f"{args.messages:,} messages from {args.users:,} users in {args.guilds} guilds")
+    print(f"Throughput: {args.messages / result['elapsed']:,.0f} messages/s "
+          f"({result['elapsed']:.2f}s)")
+    print(f"{'stage':>20} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for stage, summary in result["stages"].items():
+        print(f"{stage:>20} {summary['p50']:9.4f} {summary['p99']:9.4f} {summary['max']:9.4f}")
+    print(f"Users in table: {result['table_users']:,}, "
+          f"notifications discarded: {result['notifications']:,}")
+    print(f"Max RSS growth: {result['rss_growth'] / 1024 / 1024:.1f} MB")
+    if args.trace_memory:
+        print(f"Python heap growth: {result['heap_growth'] / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Compare the memory used by the legacy Levels layout and the UserTable.
+
+The legacy layout is five dicts keyed by str(user_id) holding per-user dicts
+with ISO timestamp strings. The new layout is the struct-of-arrays
+``UserTable`` used by the Levels cog.
+
+Usage:
+    python -m benchmarks.levels_memory [--users 1000000]
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from utils.daily_tasks import SECONDS_PER_DAY, TASK_TYPES
+from utils.user_table import UserTable
+
+ACHIEVEMENT_IDS = ["first_message", "message_streak_7", "reach_level_10",
+                   "reach_level_50", "messages_100", "messages_1000"]
+
+
+def synthetic_users(count: int, seed: int = 0):
+    """Yield (user_id, fields) tuples for ``count`` synthetic users."""
+    rng = random.Random(seed)
+    now = int(time.time())
+    for i in range(count):
+        yield 100000000000000000 + i * 7919, {
+            "xp": rng.randint(0, 500000),
+            "level": rng.randint(0, 120),
+            "total_messages": rng.randint(0, 50000),
+            "last_message": now - rng.randint(0, 90 * SECONDS_PER_DAY),
+            "karma": rng.randint(0, 5000),
+            "achievements": rng.sample(ACHIEVEMENT_IDS, rng.randint(0, 6)),
+            "current_streak": rng.randint(0, 30),
+            "longest_streak": rng.randint(0, 365),
+            "progress": {metric: rng.randint(0, 50) for metric in TASK_TYPES},
+        }
+
+
+def build_legacy(users):
+    levels, achievements, tasks, karma, streaks = {}, {}, {}, {}, {}
+    for user_id, fields in users:
+        key = str(user_id)
+        last_message = datetime.utcfromtimestamp(fields["last_message"])
+        levels[key] = {
+            "xp": fields["xp"],
+            "level": fields["level"],
+            "last_message": last_message.isoformat(),
+            "total_messages": fields["total_messages"],
+            "longest_streak": fields["longest_streak"]
+        }
+        achievements[key] = list(fields["achievements"])
+        tasks[key] = {
+            "date": last_message.isoformat(),
+            "tasks": [
+                {"type": "messages", "goal": 30, "reward": 300, "completed": False},
+                {"type": "xp", "goal": 1000, "reward": 500, "completed": False}
+            ]
+        }
+        karma[key] = fields["karma"]
+        streaks[key] = {
+            "current_streak": fields["current_streak"],
+            "last_active": (last_message - timedelta(hours=1)).isoformat(),
+            "longest_streak": fields["longest_streak"]
+        }
+    return levels, achievements, tasks, karma, streaks
+
+
+def build_table(users):
+    table = UserTable()
+    for user_id, fields in users:
+        row = table.ensure(user_id)
+        table.xp[row] = fields["xp"]
+        table.level[row] = fields["level"]
+        table.total_messages[row] = fields["total_messages"]
+        table.last_message[row] = fields["last_message"]
+        table.karma[row] = fields["karma"]
+        for achievement_id in fields["achievements"]:
+            table.achievements[row] |= 1 << ACHIEVEMENT_IDS.index(achievement_id)
+        table.current_streak[row] = fields["current_streak"]
+        table.longest_streak[row] = fields["longest_streak"]
+        table.last_active_day[row] = fields["last_message"] // SECONDS_PER_DAY
+        for metric, value in fields["progress"].items():
+            getattr(table, f"task_{metric}")[row] = value
+    return table
+
+
+def measure(builder, count: int):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = builder(synthetic_users(count))
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000000,
+                        help="number of synthetic users (default: 1000000)")
+    args = parser.parse_args()
+
+    print(f"Building {args.users:,} synthetic users...")
+    results = {}
+    for name, builder in (("legacy dicts", build_legacy), ("UserTable", build_table)):
+        size, elapsed = measure(builder, args.users)
+        results[name] = size
+        print(f"{name:>14}: {size / 1024 / 1024:9.1f} MB "
+              f"({size / args.users:6.1f} B/user, built in {elapsed:.1f}s)")
+
+    ratio = results["legacy dicts"] / max(results["UserTable"], 1)
+    print(f"UserTable uses {ratio:.1f}x less memory than the legacy layout")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,10 +9,40 @@ import aiofiles
 from typing import Optional, Dict, List, Union
 import logging
 import os
+import time
+import copy
+import csv
+import io
+import numpy as np
+from utils.daily_tasks import DailyTaskEngine, TASK_TYPES, current_day
+from utils.user_table import UserTable, to_epoch, to_epoch_day
+from utils.metrics import RollingStats
+from utils.role_rewards import RoleRewardResolver
+from utils.reward_notifier import RewardNotifier
+from utils.level_stats import LevelStats
+from utils.bulk_xp import rows_for_ids, standings, update_xp
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+USERS_FILE = 'data/users.json'
+LEVEL_ROLES_FILE = 'data/level_roles.json'
+LEVEL_STATS_FILE = 'data/level_stats.json'
+
+# Running stats are checked against a full recount this often (seconds)
+STATS_RECONCILE_INTERVAL = 6 * 3600
+# The stats read by other threads (the webserver) are republished this often (seconds)
+STATS_PUBLISH_INTERVAL = 10
+
+SEASONS_DIR = 'data/seasons'
+# Bulk XP operations update this many users between progress reports
+BULK_CHUNK_SIZE = 100000
+
+# Queued messages are processed in micro-batches every XP_BATCH_INTERVAL
+# seconds, at most XP_BATCH_MAX messages at a time.
+XP_BATCH_INTERVAL = 0.25
+XP_BATCH_MAX = 5000
+
 
 class Achievements:
     ACHIEVEMENTS = {
@@ -48,8 +78,13 @@ class Achievements:
         },
     }
 
+    # Bit of each achievement in the UserTable achievements bitmask
+    BITS = {achievement_id: 1 << i for i,
+            achievement_id in enumerate(ACHIEVEMENTS)}
+
 
 class LevelRewards:
+    # Defaults resolved by name for guilds without a role ID configuration
     ROLES = {
         20: "Novatos SS",
         60: "Intermedios SS",
@@ -66,18 +101,31 @@ class LevelRewards:
 class Levels(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.levels: Dict[str, Dict] = {}
-        self.achievements: Dict[str, List] = {}
-        self.tasks: Dict[str, Dict] = {}
-        self.karma: Dict[str, int] = {}
-        self.streaks: Dict[str, Dict] = {}
+        self.users = UserTable()
+        # Held by anything that may move rows (batches, resets, bulk operations)
+        self.table_lock = asyncio.Lock()
+        self.stats_aggregates = LevelStats(self.users)
+        self.role_resolver = RoleRewardResolver(
+            {}, LevelRewards.ROLES, LevelRewards.XP_MULTIPLIERS)
         self.xp_cooldown = commands.CooldownMapping.from_cooldown(
             1, 60, commands.BucketType.user)
         self.session: Optional[aiohttp.ClientSession] = None
         self.image_cache: Dict[str, str] = {}
         self.cache_expiry: Dict[str, datetime] = {}
         self.save_task: Optional[asyncio.Task] = None
-        self.boost_events: Dict[str, datetime] = {}
+        self.boost_events: Dict[int, float] = {}
+        self.task_engine = DailyTaskEngine(self.users)
+        self.rollover_task: Optional[asyncio.Task] = None
+        self.voice_sessions: Dict[int, float] = {}
+        self.message_queue: asyncio.Queue = asyncio.Queue()
+        self.batch_task: Optional[asyncio.Task] = None
+        self.batch_sizes = RollingStats()
+        self.batch_latency = RollingStats()
+        self.notifier = RewardNotifier(
+            bot.outbound, image_provider=self.get_random_image)
+        self.reconcile_task: Optional[asyncio.Task] = None
+        self.stats_snapshot: Optional[Dict] = None
+        self.publish_task: Optional[asyncio.Task] = None
 
         # Create data directory if it doesn't exist
         os.makedirs('data', exist_ok=True)
@@ -87,13 +135,9 @@ class Levels(commands.Cog):
 
     def initialize_data_files(self):
         """Initialize empty data files if they don't exist."""
-        files = ['levels.json', 'achievements.json',
-                 'tasks.json', 'karma.json', 'streaks.json']
-        for file in files:
-            file_path = f'data/{file}'
-            if not os.path.exists(file_path):
-                with open(file_path, 'w') as f:
-                    json.dump({}, f)
+        if not os.path.exists(USERS_FILE):
+            with open(USERS_FILE, 'w') as f:
+                json.dump({}, f)
 
     async def cog_load(self):
         """Initialize the cog."""
@@ -101,18 +145,79 @@ class Levels(commands.Cog):
             self.session = aiohttp.ClientSession()
             await self.load_all_data()
             self.save_task = asyncio.create_task(self.auto_save())
+            self.rollover_task = asyncio.create_task(
+                self.daily_task_rollover())
+            self.batch_task = asyncio.create_task(
+                self.process_message_batches())
+            self.notifier.start()
+            self.reconcile_task = asyncio.create_task(
+                self.reconcile_stats())
+            self.publish_task = asyncio.create_task(self.publish_stats())
             logger.info("LevelsCog loaded successfully")
         except Exception as e:
             logger.error(f"Error loading LevelsCog: {e}")
             raise
 
+    async def cog_unload(self):
+        """Cleanup when cog is unloaded."""
+        for task in (self.save_task, self.rollover_task, self.batch_task, self.reconcile_task,
+                     self.publish_task):
+            if task:
+                task.cancel()
+        self.notifier.stop()
+        if not self.message_queue.empty():
+            await self.process_batch(self.drain_message_queue())
+        await self.save_all_data()
+        if self.session:
+            await self.session.close()
+
     async def load_all_data(self):
-        """Load all data files."""
-        self.levels = await self.load_data('data/levels.json')
-        self.achievements = await self.load_data('data/achievements.json')
-        self.tasks = await self.load_data('data/tasks.json')
-        self.karma = await self.load_data('data/karma.json')
-        self.streaks = await self.load_data('data/streaks.json')
+        """Load the user table, migrating the legacy per-file layout if needed."""
+        data = await self.load_data(USERS_FILE)
+        if data:
+            self.users = UserTable.from_snapshot(data)
+        else:
+            self.users = await self.load_legacy_data()
+        self.task_engine.bind(self.users)
+        self.stats_aggregates = LevelStats.from_snapshot(
+            self.users,
+            await self.load_data(LEVEL_STATS_FILE) if os.path.exists(LEVEL_STATS_FILE) else {})
+        self.role_resolver = RoleRewardResolver(
+            await self.load_data(LEVEL_ROLES_FILE) if os.path.exists(LEVEL_ROLES_FILE) else {},
+            LevelRewards.ROLES, LevelRewards.XP_MULTIPLIERS)
+
+    async def load_legacy_data(self) -> UserTable:
+        """Build the user table from the old levels/achievements/karma/streaks files."""
+        users = UserTable()
+        legacy = {}
+        for name in ('levels', 'achievements', 'karma', 'streaks'):
+            filename = f'data/{name}.json'
+            legacy[name] = await self.load_data(filename) if os.path.exists(filename) else {}
+
+        for user_id, data in legacy['levels'].items():
+            row = users.ensure(int(user_id))
+            users.xp[row] = data.get("xp", 0)
+            users.level[row] = data.get("level", 0)
+            users.total_messages[row] = data.get("total_messages", 0)
+            users.last_message[row] = to_epoch(data.get("last_message"))
+
+        for user_id, earned in legacy['achievements'].items():
+            row = users.ensure(int(user_id))
+            for achievement_id in earned:
+                users.achievements[row] |= Achievements.BITS.get(achievement_id, 0)
+
+        for user_id, karma in legacy['karma'].items():
+            users.karma[users.ensure(int(user_id))] = karma
+
+        for user_id, data in legacy['streaks'].items():
+            row = users.ensure(int(user_id))
+            users.current_streak[row] = data.get("current_streak", 0)
+            users.longest_streak[row] = data.get("longest_streak", 0)
+            users.last_active_day[row] = to_epoch_day(data.get("last_active"))
+
+        if len(users):
+            logger.info(f"Migrated {len(users)} users to {USERS_FILE}")
+        return users
 
     async def load_data(self, filename: str) -> Dict:
         """Load data from a JSON file."""
@@ -159,19 +264,21 @@ class Levels(commands.Cog):
 
     async def save_data(self, data: Dict, filename: str):
         try:
+            # Serializing a large table takes a while, keep it off the event loop
+            content = await asyncio.to_thread(json.dumps, data)
             async with aiofiles.open(filename, 'w') as f:
-                await f.write(json.dumps(data, indent=4))
+                await f.write(content)
         except Exception as e:
             logger.error(f"Error saving {filename}: {e}")
 
     async def save_all_data(self):
         try:
             await asyncio.gather(
-                self.save_data(self.levels, 'data/levels.json'),
-                self.save_data(self.achievements, 'data/achievements.json'),
-                self.save_data(self.tasks, 'data/tasks.json'),
-                self.save_data(self.karma, 'data/karma.json'),
-                self.save_data(self.streaks, 'data/streaks.json')
+                self.save_data(self.users.snapshot(), USERS_FILE),
+                self.save_data(copy.deepcopy(
+                    self.role_resolver.config), LEVEL_ROLES_FILE),
+                self.save_data(self.stats_aggregates.snapshot(),
+                               LEVEL_STATS_FILE)
             )
             logger.info("All data saved successfully")
         except Exception as e:
@@ -185,6 +292,56 @@ class Levels(commands.Cog):
             except Exception as e:
                 logger.error(f"Error in auto_save: {e}")
 
+    async def daily_task_rollover(self):
+        """Move every user onto new daily tasks at UTC midnight."""
+        while True:
+            try:
+                await asyncio.sleep(self.task_engine.seconds_until_rollover())
+                rolled = self.task_engine.rollover()
+                logger.info(f"Rolled over daily tasks for {rolled} users")
+            except Exception as e:
+                logger.error(f"Error in daily_task_rollover: {e}")
+                await asyncio.sleep(60)
+
+    async def reconcile_stats(self):
+        """Periodically check the running stats against a full recount."""
+        while True:
+            try:
+                await asyncio.sleep(STATS_RECONCILE_INTERVAL)
+                drift = self.stats_aggregates.reconcile()
+                if any(drift.values()):
+                    logger.warning(f"Corrected drift in Levels stats: {drift}")
+            except Exception as e:
+                logger.error(f"Error in reconcile_stats: {e}")
+
+    async def publish_stats(self):
+        """Periodically copy the global stats into a snapshot other threads can read."""
+        while True:
+            try:
+                # Replaced, never mutated, so readers always see a complete summary
+                self.stats_snapshot = self.stats_aggregates.summary()
+            except Exception as e:
+                logger.error(f"Error in publish_stats: {e}")
+            await asyncio.sleep(STATS_PUBLISH_INTERVAL)
+
+    def grant_xp(self, row: int, amount: int, guild_id: Optional[int] = None):
+        """Add (or remove, if negative) XP on a user row and update the stats."""
+        self.users.xp[row] += amount
+        self.stats_aggregates.add_xp(amount, guild_id)
+
+    def set_level(self, row: int, level: int):
+        """Set the level of a user row and update the stats."""
+        old_level = self.users.level[row]
+        if level != old_level:
+            self.users.level[row] = level
+            self.stats_aggregates.level_changed(
+                self.users.ids[row], old_level, level)
+
+    def get_level(self, user_id: int) -> int:
+        """Return the level of a user, 0 if the user is unknown."""
+        row = self.users.row(user_id)
+        return self.users.level[row] if row is not None else 0
+
     def get_level_xp(self, level: int) -> int:
         return 5 * (level ** 2) + 50 * level + 100
 
@@ -196,39 +353,34 @@ class Levels(commands.Cog):
         return level
 
     def get_xp_multiplier(self, member: discord.Member) -> float:
-        multiplier = 1.0
-        for role in member.roles:
-            if role.name in LevelRewards.XP_MULTIPLIERS:
-                multiplier = max(
-                    multiplier, LevelRewards.XP_MULTIPLIERS[role.name])
-        return multiplier
+        return self.role_resolver.multiplier(member)
 
     async def check_achievements(self, member: discord.Member):
         """Check and award achievements for a user"""
-        user_id = str(member.id)
-        if user_id not in self.achievements:
-            self.achievements[user_id] = []
-
-        user_data = self.levels.get(user_id, {})
-        current_achievements = self.achievements[user_id]
-
-        for achievement_id, achievement in Achievements.ACHIEVEMENTS.items():
-            if achievement_id in current_achievements:
+        users = self.users
+        row = users.ensure(member.id)
+        earned = users.achievements[row]
+        total_messages = users.total_messages[row]
+        level = users.level[row]
+        streak = users.current_streak[row]
+
+        for achievement_id, bit in Achievements.BITS.items():
+            if earned & bit:
                 continue
 
             achieved = False
 
-            if achievement_id == "first_message" and user_data.get("total_messages", 0) >= 1:
+            if achievement_id == "first_message" and total_messages >= 1:
                 achieved = True
-            elif achievement_id == "message_streak_7" and self.streaks.get(user_id, {}).get("current_streak", 0) >= 7:
+            elif achievement_id == "message_streak_7" and streak >= 7:
                 achieved = True
-            elif achievement_id == "reach_level_10" and user_data.get("level", 0) >= 10:
+            elif achievement_id == "reach_level_10" and level >= 10:
                 achieved = True
-            elif achievement_id == "reach_level_50" and user_data.get("level", 0) >= 50:
+            elif achievement_id == "reach_level_50" and level >= 50:
                 achieved = True
-            elif achievement_id == "messages_100" and user_data.get("total_messages", 0) >= 100:
+            elif achievement_id == "messages_100" and total_messages >= 100:
                 achieved = True
-            elif achievement_id == "messages_1000" and user_data.get("total_messages", 0) >= 1000:
+            elif achievement_id == "messages_1000" and total_messages >= 1000:
                 achieved = True
 
             if achieved:
@@ -236,162 +388,173 @@ class Levels(commands.Cog):
 
     async def award_achievement(self, member: discord.Member, achievement_id: str):
         """Award an achievement to a user"""
-        user_id = str(member.id)
+        users = self.users
+        row = users.ensure(member.id)
         achievement = Achievements.ACHIEVEMENTS[achievement_id]
-
-        if user_id not in self.achievements:
-            self.achievements[user_id] = []
-
-        if achievement_id not in self.achievements[user_id]:
-            self.achievements[user_id].append(achievement_id)
-
-            if user_id in self.levels:
-                self.levels[user_id]["xp"] += achievement["xp_reward"]
-
-            embed = discord.Embed(
-                title="🏆 Achievement Unlocked! 🏆",
-                description=f"Congratulations {member.mention}!",
-                color=discord.Color.gold()
+        bit = Achievements.BITS[achievement_id]
+
+        if not users.achievements[row] & bit:
+            users.achievements[row] |= bit
+            self.grant_xp(row, achievement["xp_reward"])
+
+            self.notifier.notify(
+                member,
+                "🏆 Achievement Unlocked! 🏆",
+                f"**{achievement['name']}**: {achievement['description']}\n"
+                f"Reward: {achievement['xp_reward']} XP",
+                discord.Color.gold()
             )
-            embed.add_field(
-                name=achievement["name"], value=achievement["description"])
-            embed.add_field(name="Reward", value=f"{
-                            achievement['xp_reward']} XP")
-
-            try:
-                await member.send(embed=embed)
-            except discord.Forbidden:
-                if member.guild:
-                    for channel in member.guild.text_channels:
-                        if channel.permissions_for(member.guild.me).send_messages:
-                            await channel.send(embed=embed)
-                            break
 
     async def level_up(self, member: discord.Member, channel: discord.TextChannel, new_level: int):
         """Handle level up event"""
-        embed = discord.Embed(
-            title="🎉 Level Up! 🎉",
-            description=f"{member.mention} has reached level {new_level}!",
-            color=discord.Color.green()
-        )
-
-        # Add next level information
         next_level_xp = self.get_level_xp(new_level)
-        embed.add_field(
-            name="Next Level",
-            value=f"You need {next_level_xp:,} XP to reach level {
-                new_level + 1}",
-            inline=False
+        self.notifier.notify(
+            member,
+            "🎉 Level Up! 🎉",
+            f"{member.mention} has reached level {new_level}!\n"
+            f"You need {next_level_xp:,} XP to reach level {new_level + 1}",
+            discord.Color.green(),
+            channel=channel,
+            image=True
         )
 
-        try:
-            image_url = await self.get_random_image()
-            if image_url:
-                embed.set_image(url=image_url)
-        except Exception as e:
-            logger.error(f"Error getting random image: {e}")
-
-        await channel.send(embed=embed)
-
-    async def check_tasks(self, member: discord.Member):
-        """Check and update user tasks"""
-        user_id = str(member.id)
-        if user_id not in self.tasks:
-            self.tasks[user_id] = self.generate_daily_tasks()
-
-        current_time = datetime.utcnow()
-        task_data = self.tasks[user_id]
-
-        if current_time.date() > datetime.fromisoformat(task_data["date"]).date():
-            self.tasks[user_id] = self.generate_daily_tasks()
-            return
-
-        for task in task_data["tasks"]:
-            if not task["completed"]:
-                if self.check_task_completion(member, task):
-                    task["completed"] = True
-                    await self.reward_task_completion(member, task)
-
-    def generate_daily_tasks(self) -> Dict:
-        """Generate new daily tasks"""
-        tasks = [
-            {
-                "type": "messages",
-                "goal": random.randint(10, 50),
-                "reward": random.randint(100, 500),
-                "completed": False
-            },
-            {
-                "type": "xp",
-                "goal": random.randint(500, 2000),
-                "reward": random.randint(200, 1000),
-                "completed": False
-            }
-        ]
-        return {
-            "date": datetime.utcnow().isoformat(),
-            "tasks": tasks
-        }
-
-    def check_task_completion(self, member: discord.Member, task: Dict) -> bool:
-        """Check if a task has been completed"""
-        user_id = str(member.id)
-        user_data = self.levels.get(user_id, {})
-
-        if task["type"] == "messages":
-            return user_data.get("total_messages", 0) >= task["goal"]
-        elif task["type"] == "xp":
-            return user_data.get("xp", 0) >= task["goal"]
-        return False
+    async def check_tasks(self, member: discord.Member, metric: str = "messages", amount: int = 1):
+        """Record daily task progress and reward completed tasks"""
+        for task in self.task_engine.record(member.id, metric, amount):
+            await self.reward_task_completion(member, task)
 
     async def reward_task_completion(self, member: discord.Member, task: Dict):
         """Reward user for completing a task"""
-        user_id = str(member.id)
-        self.levels[user_id]["xp"] += task["reward"]
+        self.grant_xp(self.users.ensure(member.id), task["reward"])
 
-        embed = discord.Embed(
-            title="✅ Task Completed!",
-            description=f"You've completed a daily task and earned {
-                task['reward']} XP!",
-            color=discord.Color.green()
+        self.notifier.notify(
+            member,
+            "✅ Task Completed!",
+            f"You've completed a daily task and earned {task['reward']} XP!",
+            discord.Color.green()
         )
 
-        try:
-            await member.send(embed=embed)
-        except discord.Forbidden:
-            pass
-
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         if message.author.bot or not message.guild:
             return
 
-        await self.process_message_xp(message)
-        await self.check_achievements(message.author)
-        await self.check_tasks(message.author)
-        await self.update_streak(message.author)
+        # Drop messages on cooldown before touching any user data
+        bucket = self.xp_cooldown.get_bucket(message)
+        if bucket.update_rate_limit():
+            return
+
+        self.message_queue.put_nowait((message, time.monotonic()))
+
+    async def process_message_batches(self):
+        """Process queued XP messages in micro-batches."""
+        while True:
+            try:
+                first = await self.message_queue.get()
+                await asyncio.sleep(XP_BATCH_INTERVAL)
+                batch = [first] + self.drain_message_queue(XP_BATCH_MAX - 1)
+                async with self.table_lock:
+                    await self.process_batch(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error processing XP batch: {e}")
+
+    def drain_message_queue(self, limit: Optional[int] = None) -> List:
+        """Take up to ``limit`` queued messages without waiting."""
+        batch = []
+        while not self.message_queue.empty() and (limit is None or len(batch) < limit):
+            batch.append(self.message_queue.get_nowait())
+        return batch
+
+    async def process_batch(self, batch: List):
+        """Apply a batch of queued messages.
+
+        XP is rolled per message and summed per user, so levels, achievements,
+        tasks and streaks are evaluated once per user no matter how many of
+        their messages are in the batch.
+        """
+        started = time.monotonic()
+        gains: Dict[int, List] = {}
+        for message, _ in batch:
+            try:
+                xp_gain = self.roll_message_xp(message)
+            except Exception as e:
+                logger.error(f"Error rolling XP for message {message.id}: {e}")
+                continue
+            entry = gains.get(message.author.id)
+            if entry is None:
+                gains[message.author.id] = [
+                    message.author, message.channel, xp_gain, 1]
+            else:
+                entry[1] = message.channel
+                entry[2] += xp_gain
+                entry[3] += 1
+
+        side_effects = []
+        for member, channel, xp_gain, count in gains.values():
+            side_effects.append(self.apply_message_xp(
+                member, channel, xp_gain, count))
+        for result in await asyncio.gather(*side_effects, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error(f"Error applying message XP: {result}")
+
+        finished = time.monotonic()
+        self.batch_sizes.add(len(batch))
+        self.batch_latency.add((finished - batch[0][1]) * 1000)
+        logger.debug(f"Processed XP batch of {len(batch)} messages from "
+                     f"{len(gains)} users in {(finished - started) * 1000:.1f} ms")
+
+    async def apply_message_xp(self, member: discord.Member, channel: discord.TextChannel, xp_gain: int, count: int):
+        """Apply the aggregated XP of a user and run the per-user side effects"""
+        await self.process_message_xp(member, channel, xp_gain, count)
+        await self.check_achievements(member)
+        await self.check_tasks(member, "messages", count)
+        await self.check_tasks(member, "xp", xp_gain)
+        await self.update_streak(member)
+
+    def get_metrics(self) -> Dict:
+        """Return XP ingestion metrics."""
+        return {
+            "queue_depth": self.message_queue.qsize(),
+            "batch_size": self.batch_sizes.summary(),
+            "batch_latency_ms": self.batch_latency.summary(),
+            "notifications": self.notifier.get_metrics()
+        }
 
-    async def process_message_xp(self, message: discord.Message):
-        user_id = str(message.author.id)
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        member = payload.member
+        if member is None or member.bot:
+            return
 
-        if user_id not in self.levels:
-            self.levels[user_id] = {
-                "xp": 0,
-                "level": 0,
-                "last_message": datetime.utcnow().isoformat(),
-                "total_messages": 0,
-                "longest_streak": 0
-            }
+        await self.check_tasks(member, "reactions")
 
-        bucket = self.xp_cooldown.get_bucket(message)
-        retry_after = bucket.update_rate_limit()
-        if retry_after:
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
+        if member.bot:
             return
 
+        afk_channel = member.guild.afk_channel
+        was_active = before.channel is not None and before.channel != afk_channel
+        is_active = after.channel is not None and after.channel != afk_channel
+
+        if is_active and not was_active:
+            self.voice_sessions[member.id] = time.monotonic()
+        elif was_active and not is_active:
+            started = self.voice_sessions.pop(member.id, None)
+            if started is not None:
+                minutes = int((time.monotonic() - started) // 60)
+                if minutes:
+                    await self.check_tasks(member, "voice_minutes", minutes)
+
+    def roll_message_xp(self, message: discord.Message) -> int:
+        """Return the XP earned by a single message"""
         base_xp = random.randint(15, 25)
         multiplier = self.get_xp_multiplier(message.author)
 
-        if user_id in self.boost_events and datetime.utcnow() < self.boost_events[user_id]:
+        boost_until = self.boost_events.get(message.author.id)
+        if boost_until and time.time() < boost_until:
             multiplier *= 2
 
         xp_gain = int(base_xp * multiplier)
@@ -399,72 +562,90 @@ class Levels(commands.Cog):
         if len(message.content) > 100:
             xp_gain += 5
 
-        self.levels[user_id]["xp"] += xp_gain
-        self.levels[user_id]["last_message"] = datetime.utcnow().isoformat()
-        self.levels[user_id]["total_messages"] = self.levels[user_id].get(
-            "total_messages", 0) + 1
+        return xp_gain
+
+    async def process_message_xp(self, member: discord.Member, channel: discord.TextChannel, xp_gain: int, count: int = 1) -> int:
+        """Add message XP to a user and handle level ups, returns the new level"""
+        users = self.users
+        stats = self.stats_aggregates
+        row = users.ensure(member.id)
+
+        self.grant_xp(row, xp_gain, member.guild.id)
+        users.last_message[row] = int(time.time())
+        users.total_messages[row] += count
+        stats.add_messages(count, member.guild.id)
+
+        current_level = self.get_level_from_xp(users.xp[row])
+        stats.guild_active(member.guild.id, member.id,
+                           current_day(), users.level[row])
+        if current_level > users.level[row]:
+            self.set_level(row, current_level)
+            await self.level_up(member, channel, current_level)
+            await self.check_and_assign_role_rewards(member, current_level)
 
-        current_level = self.get_level_from_xp(self.levels[user_id]["xp"])
-        if current_level > self.levels[user_id]["level"]:
-            self.levels[user_id]["level"] = current_level
-            await self.level_up(message.author, message.channel, current_level)
-            await self.check_and_assign_role_rewards(message.author, current_level)
+        return current_level
 
     async def check_and_assign_role_rewards(self, member: discord.Member, level: int):
         """Check and assign role rewards for level ups"""
-        for req_level, role_name in LevelRewards.ROLES.items():
-            if level >= req_level:
-                role = discord.utils.get(member.guild.roles, name=role_name)
-                if role and role not in member.roles:
-                    try:
-                        await member.add_roles(role)
-                        await self.send_role_reward_notification(member, role)
-                    except discord.Forbidden:
-                        logger.error(f"Cannot assign role {
-                                     role_name} to {member}")
+        for role in self.role_resolver.reward_roles(member.guild, level):
+            if member.get_role(role.id) is None:
+                try:
+                    await member.add_roles(role)
+                    await self.send_role_reward_notification(member, role)
+                except discord.Forbidden:
+                    logger.error(f"Cannot assign role {role.name} to {member}")
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        self.role_resolver.role_changed(role)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.name != after.name:
+            self.role_resolver.role_changed(after, before.name)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        if self.role_resolver.role_deleted(role):
+            logger.info(f"Removed deleted role {role.id} from level roles of {role.guild.id}")
 
     async def send_role_reward_notification(self, member: discord.Member, role: discord.Role):
         """Send notification for new role rewards"""
-        embed = discord.Embed(
-            title="🎭 New Role Unlocked! 🎭",
-            description=f"Congratulations {
-                member.mention}! You've earned the {role.name} role!",
-            color=role.color
+        self.notifier.notify(
+            member,
+            "🎭 New Role Unlocked! 🎭",
+            f"Congratulations {member.mention}! You've earned the {role.name} role!",
+            role.color
         )
-        try:
-            await member.send(embed=embed)
-        except discord.Forbidden:
-            pass
 
     async def update_streak(self, user: discord.Member):
         """Update user's message streak"""
-        user_id = str(user.id)
-        now = datetime.utcnow()
-
-        if user_id not in self.streaks:
-            self.streaks[user_id] = {
-                "current_streak": 1,
-                "last_active": now.isoformat(),
-                "longest_streak": 1
-            }
+        users = self.users
+        row = users.ensure(user.id)
+        today = current_day()
+        last_active_day = users.last_active_day[row]
+
+        if last_active_day == today:
             return
 
-        last_active = datetime.fromisoformat(
-            self.streaks[user_id]["last_active"])
-        days_difference = (now - last_active).days
+        users.last_active_day[row] = today
+        self.stats_aggregates.user_active(last_active_day, today)
 
-        if days_difference == 1:
-            self.streaks[user_id]["current_streak"] += 1
-            self.streaks[user_id]["longest_streak"] = max(
-                self.streaks[user_id]["current_streak"],
-                self.streaks[user_id]["longest_streak"]
-            )
-        elif days_difference > 1:
-            self.streaks[user_id]["current_streak"] = 1
+        if not last_active_day:
+            users.current_streak[row] = 1
+            users.longest_streak[row] = max(1, users.longest_streak[row])
+            return
 
-        self.streaks[user_id]["last_active"] = now.isoformat()
+        if today - last_active_day == 1:
+            users.current_streak[row] += 1
+            users.longest_streak[row] = max(
+                users.current_streak[row],
+                users.longest_streak[row]
+            )
+        else:
+            users.current_streak[row] = 1
 
-        streak = self.streaks[user_id]["current_streak"]
+        streak = users.current_streak[row]
         if streak in [7, 30, 100, 365]:
             await self.reward_streak_milestone(user, streak)
 
@@ -478,39 +659,33 @@ class Levels(commands.Cog):
         }
 
         if streak in rewards:
-            user_id = str(user.id)
+            row = self.users.ensure(user.id)
             reward = rewards[streak]
 
-            self.levels[user_id]["xp"] += reward["xp"]
-            self.karma[user_id] = self.karma.get(user_id, 0) + reward["karma"]
+            self.grant_xp(row, reward["xp"])
+            self.users.karma[row] += reward["karma"]
 
-            embed = discord.Embed(
-                title="🎯 Streak Milestone Reached! 🎯",
-                description=f"Amazing {user.mention}! You've maintained a {
-                    streak}-day streak!",
-                color=discord.Color.gold()
+            self.notifier.notify(
+                user,
+                "🎯 Streak Milestone Reached! 🎯",
+                f"Amazing {user.mention}! You've maintained a {streak}-day streak!\n"
+                f"Rewards: {reward['xp']} XP, {reward['karma']} karma",
+                discord.Color.gold()
             )
-            embed.add_field(name="Rewards", value=f"XP: {
-                            reward['xp']}\nKarma: {reward['karma']}")
-
-            try:
-                await user.send(embed=embed)
-            except discord.Forbidden:
-                pass
 
     @commands.command()
     async def rank(self, ctx, member: discord.Member = None):
         """Display rank information for a user"""
         member = member or ctx.author
-        user_id = str(member.id)
+        users = self.users
+        row = users.row(member.id)
 
-        if user_id not in self.levels:
+        if row is None:
             await ctx.send(f"{member.mention} hasn't earned any XP yet!")
             return
 
-        level_data = self.levels[user_id]
-        current_level = level_data["level"]
-        current_xp = level_data["xp"]
+        current_level = users.level[row]
+        current_xp = users.xp[row]
         next_level_xp = self.get_level_xp(current_level)
 
         embed = discord.Embed(
@@ -522,15 +697,14 @@ class Levels(commands.Cog):
                         current_xp:,}/{next_level_xp:,}", inline=True)
         embed.add_field(
             name="Total Messages",
-            value=str(level_data.get("total_messages", 0)),
+            value=str(users.total_messages[row]),
             inline=True
         )
 
-        if user_id in self.streaks:
-            streak_data = self.streaks[user_id]
+        if users.last_active_day[row]:
             embed.add_field(
                 name="Current Streak",
-                value=f"{streak_data['current_streak']} days",
+                value=f"{users.current_streak[row]} days",
                 inline=True
             )
 
@@ -552,19 +726,20 @@ class Levels(commands.Cog):
         items_per_page = 10
         start_idx = (page - 1) * items_per_page
 
+        users = self.users
         if category == "xp":
-            data = [(uid, data["xp"]) for uid, data in self.levels.items()]
+            data = list(zip(users.ids, users.xp))
             title = "XP Leaderboard"
         elif category == "streak":
-            data = [(uid, data["current_streak"])
-                    for uid, data in self.streaks.items()]
+            data = [(uid, streak) for uid, streak in zip(
+                users.ids, users.current_streak) if streak]
             title = "Streak Leaderboard"
         elif category == "karma":
-            data = list(self.karma.items())
+            data = [(uid, karma) for uid, karma in zip(
+                users.ids, users.karma) if karma]
             title = "Karma Leaderboard"
         else:  # messages
-            data = [(uid, data["total_messages"])
-                    for uid, data in self.levels.items()]
+            data = list(zip(users.ids, users.total_messages))
             title = "Messages Leaderboard"
 
         sorted_data = sorted(data, key=lambda x: x[1], reverse=True)
@@ -580,7 +755,7 @@ class Levels(commands.Cog):
         )
 
         for i, (user_id, value) in enumerate(sorted_data[start_idx:start_idx + items_per_page], start=start_idx + 1):
-            member = ctx.guild.get_member(int(user_id))
+            member = ctx.guild.get_member(user_id)
             if member:
                 embed.add_field(
                     name=f"{i}. {member.name}",
@@ -600,20 +775,13 @@ class Levels(commands.Cog):
             await ctx.send("Amount must be positive!")
             return
 
-        user_id = str(member.id)
-        if user_id not in self.levels:
-            self.levels[user_id] = {
-                "xp": 0,
-                "level": 0,
-                "last_message": datetime.utcnow().isoformat(),
-                "total_messages": 0
-            }
-
-        self.levels[user_id]["xp"] += amount
-        current_level = self.get_level_from_xp(self.levels[user_id]["xp"])
+        users = self.users
+        row = users.ensure(member.id)
+        self.grant_xp(row, amount)
+        current_level = self.get_level_from_xp(users.xp[row])
 
-        if current_level > self.levels[user_id]["level"]:
-            self.levels[user_id]["level"] = current_level
+        if current_level > users.level[row]:
+            self.set_level(row, current_level)
             await self.level_up(member, ctx.channel, current_level)
             await self.check_and_assign_role_rewards(member, current_level)
 
@@ -627,36 +795,81 @@ class Levels(commands.Cog):
             await ctx.send("Amount must be positive!")
             return
 
-        user_id = str(member.id)
-        if user_id not in self.levels:
+        users = self.users
+        row = users.row(member.id)
+        if row is None:
             await ctx.send(f"{member.mention} has no XP to remove!")
             return
 
-        self.levels[user_id]["xp"] = max(
-            0, self.levels[user_id]["xp"] - amount)
-        new_level = self.get_level_from_xp(self.levels[user_id]["xp"])
-        self.levels[user_id]["level"] = new_level
+        self.grant_xp(row, -min(amount, users.xp[row]))
+        self.set_level(row, self.get_level_from_xp(users.xp[row]))
 
         await ctx.send(f"Removed {amount} XP from {member.mention}")
 
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def xpmultiplier(self, ctx, role: discord.Role, multiplier: float):
+        """Set the XP multiplier of a role, 1 removes it (Admin only)"""
+        if multiplier <= 0:
+            await ctx.send("Multiplier must be positive!")
+            return
+
+        self.role_resolver.set_multiplier(ctx.guild, role.id, multiplier)
+        if multiplier == 1:
+            await ctx.send(f"Removed the XP multiplier of {role.name}")
+        else:
+            await ctx.send(f"Members with {role.name} now earn {multiplier}x XP")
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def levelrole(self, ctx, level: int, role: discord.Role = None):
+        """Set the role rewarded at a level, omit the role to remove it (Admin only)"""
+        if level <= 0:
+            await ctx.send("Level must be positive!")
+            return
+
+        self.role_resolver.set_reward(
+            ctx.guild, level, role.id if role else None)
+        if role:
+            await ctx.send(f"Members reaching level {level} now get {role.name}")
+        else:
+            await ctx.send(f"Removed the role reward for level {level}")
+
+    @commands.command()
+    async def levelroles(self, ctx):
+        """Display the level role rewards and XP multipliers"""
+        roles = self.role_resolver.get(ctx.guild)
+        embed = discord.Embed(
+            title="🎭 Level Roles",
+            color=discord.Color.blue()
+        )
+
+        rewards = [f"Level {level}: <@&{role_id}>" for level,
+                   role_id in roles.rewards]
+        multipliers = [f"<@&{role_id}>: {multiplier}x" for role_id,
+                       multiplier in roles.multipliers.items()]
+        embed.add_field(name="Role Rewards",
+                        value="\n".join(rewards) or "None", inline=False)
+        embed.add_field(name="XP Multipliers",
+                        value="\n".join(multipliers) or "None", inline=False)
+        await ctx.send(embed=embed)
+
     @commands.command()
     async def daily(self, ctx):
         """View daily tasks"""
-        user_id = str(ctx.author.id)
-        if user_id not in self.tasks:
-            self.tasks[user_id] = self.generate_daily_tasks()
-
-        task_data = self.tasks[user_id]
+        tasks, progress, completed = self.task_engine.status(ctx.author.id)
         embed = discord.Embed(
             title="📋 Daily Tasks",
             description="Complete these tasks to earn rewards!",
             color=discord.Color.blue()
         )
 
-        for i, task in enumerate(task_data["tasks"], 1):
-            status = "✅" if task["completed"] else "❌"
-            description = f"Goal: {task['goal']} {
-                task['type']}\nReward: {task['reward']} XP"
+        for i, task in enumerate(tasks, 1):
+            status = "✅" if completed & (1 << (i - 1)) else "❌"
+            label = TASK_TYPES.get(task["type"], {}).get("label", task["type"])
+            done = min(progress.get(task["type"], 0), task["goal"])
+            description = (f"Progress: {done:,}/{task['goal']:,} {label}\n"
+                           f"Reward: {task['reward']} XP")
             embed.add_field(
                 name=f"Task {i} {status}",
                 value=description,
@@ -670,38 +883,210 @@ class Levels(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def reset_user(self, ctx, member: discord.Member):
         """Reset all data for a user (Admin only)"""
-        user_id = str(member.id)
-
-        self.levels.pop(user_id, None)
-        self.achievements.pop(user_id, None)
-        self.tasks.pop(user_id, None)
-        self.karma.pop(user_id, None)
-        self.streaks.pop(user_id, None)
-        self.boost_events.pop(user_id, None)
+        async with self.table_lock:
+            row = self.users.row(member.id)
+            if row is not None:
+                self.stats_aggregates.user_removed(member.id, row)
+                self.users.remove(member.id)
+        self.boost_events.pop(member.id, None)
 
         await self.save_all_data()
         await ctx.send(f"Reset all data for {member.mention}")
 
+    async def bulk_update_xp(self, ctx, description: str, rows: np.ndarray, update) -> int:
+        """Apply a vectorized XP update to ``rows`` and report progress.
+
+        ``update(xp, index)`` receives the XP of a chunk of rows and the slice
+        of ``rows`` it covers, and returns the new XP. Must be called with
+        ``table_lock`` held. Bulk updates recompute levels but do not send
+        level-up notifications. Returns the net XP change.
+        """
+        progress = await ctx.send(f"⏳ {description}: 0/{len(rows):,} users")
+        last_report = time.monotonic()
+        delta = 0
+
+        for start in range(0, len(rows), BULK_CHUNK_SIZE):
+            index = slice(start, start + BULK_CHUNK_SIZE)
+            delta += update_xp(self.users, rows[index],
+                               lambda xp: update(xp, index), self.get_level_xp)
+            if time.monotonic() - last_report >= 2:
+                await progress.edit(content=f"⏳ {description}: "
+                                    f"{min(start + BULK_CHUNK_SIZE, len(rows)):,}/{len(rows):,} users")
+                last_report = time.monotonic()
+            else:
+                await asyncio.sleep(0)
+
+        self.stats_aggregates.add_xp(delta, ctx.guild.id)
+        self.stats_aggregates.reconcile()
+        await progress.edit(content=f"✅ {description}: {len(rows):,} users updated ({delta:+,} XP)")
+        return delta
+
+    @commands.command()
+    @commands.is_owner()
+    async def grantxp(self, ctx, amount: int, role: discord.Role = None):
+        """Grant (or take, if negative) XP to a role or to everyone (Bot owner only)
+
+        XP is shared by every server a user is in, so this changes it everywhere.
+        """
+        if amount == 0:
+            await ctx.send("Amount must not be zero!")
+            return
+
+        members = role.members if role else ctx.guild.members
+        user_ids = [member.id for member in members if not member.bot]
+        target = role.name if role else "everyone"
+
+        async with self.table_lock:
+            rows = rows_for_ids(self.users, user_ids, create=amount > 0)
+            await self.bulk_update_xp(ctx, f"Granting {amount:,} XP to {target}", rows,
+                                      lambda xp, _: xp + amount)
+        await self.save_all_data()
+
+    @commands.command()
+    @commands.is_owner()
+    async def decayxp(self, ctx, percent: float):
+        """Remove a percentage of this server's members' XP (Bot owner only)
+
+        XP is shared by every server a user is in, so this changes it everywhere.
+        """
+        if not 0 < percent <= 100:
+            await ctx.send("Percent must be between 0 and 100!")
+            return
+
+        factor = 1 - percent / 100
+        async with self.table_lock:
+            rows = rows_for_ids(self.users, (m.id for m in ctx.guild.members))
+            await self.bulk_update_xp(ctx, f"Decaying XP by {percent}%", rows,
+                                      lambda xp, _: np.floor(xp * factor))
+        await self.save_all_data()
+
+    @commands.command()
+    @commands.is_owner()
+    async def seasonreset(self, ctx, name: str = None):
+        """Archive this server's standings and reset its members' XP (Bot owner only)
+
+        XP is shared by every server a user is in, so this resets it everywhere.
+        """
+        name = name or datetime.utcnow().strftime('%Y-%m-%d')
+        archive_file = f'{SEASONS_DIR}/{ctx.guild.id}_{name}.json'
+        if os.path.exists(archive_file):
+            await ctx.send(f"A season named `{name}` is already archived!")
+            return
+
+        os.makedirs(SEASONS_DIR, exist_ok=True)
+        async with self.table_lock:
+            rows = rows_for_ids(self.users, (m.id for m in ctx.guild.members))
+            await self.save_data({
+                "guild_id": ctx.guild.id,
+                "season": name,
+                "archived_at": int(time.time()),
+                "standings": standings(self.users, rows)
+            }, archive_file)
+            await self.bulk_update_xp(ctx, f"Resetting season `{name}`", rows,
+                                      lambda xp, _: np.zeros_like(xp))
+        await self.save_all_data()
+        await ctx.send(f"Season `{name}` archived with {len(rows):,} users")
+
+    @commands.command()
+    @commands.is_owner()
+    async def importxp(self, ctx, mode: str = "add"):
+        """Import XP from an attached CSV of user_id,xp rows (Bot owner only)
+
+        Use mode `add` to add the XP to existing values or `set` to replace them.
+        """
+        if mode not in ("add", "set"):
+            await ctx.send("Mode must be `add` or `set`!")
+            return
+        if not ctx.message.attachments:
+            await ctx.send("Attach a CSV file with `user_id,xp` rows!")
+            return
+
+        content = (await ctx.message.attachments[0].read()).decode('utf-8', errors='replace')
+        values: Dict[int, int] = {}
+        skipped = 0
+        for line in csv.reader(io.StringIO(content)):
+            try:
+                user_id, xp = int(line[0]), int(line[1])
+            except (ValueError, IndexError):
+                skipped += 1
+                continue
+            values[user_id] = values.get(user_id, 0) + xp if mode == "add" else xp
+
+        if not values:
+            await ctx.send("No valid rows found in the CSV!")
+            return
+
+        amounts = np.fromiter(values.values(), dtype=np.int64, count=len(values))
+        async with self.table_lock:
+            rows = rows_for_ids(self.users, values.keys(), create=True)
+            if mode == "add":
+                await self.bulk_update_xp(ctx, "Importing XP", rows,
+                                          lambda xp, index: xp + amounts[index])
+            else:
+                await self.bulk_update_xp(ctx, "Importing XP", rows,
+                                          lambda xp, index: amounts[index])
+        await self.save_all_data()
+        if skipped:
+            await ctx.send(f"Skipped {skipped:,} invalid CSV rows")
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def xpmetrics(self, ctx):
+        """Display XP ingestion pipeline metrics (Admin only)"""
+        metrics = self.get_metrics()
+        embed = discord.Embed(
+            title="📈 XP Pipeline Metrics",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Queue Depth",
+                        value=str(metrics["queue_depth"]), inline=False)
+        for name, key, unit in (("Batch Size", "batch_size", ""),
+                                ("Batch Latency", "batch_latency_ms", " ms")):
+            summary = metrics[key]
+            embed.add_field(
+                name=name,
+                value=(f"p50: {summary['p50']:.1f}{unit}\n"
+                       f"p99: {summary['p99']:.1f}{unit}\n"
+                       f"max: {summary['max']:.1f}{unit}"),
+                inline=True
+            )
+        embed.set_footer(text=f"{metrics['batch_size']['count']:,} batches processed")
+        await ctx.send(embed=embed)
+
     @commands.command()
     async def stats(self, ctx):
         """Display bot statistics"""
-        total_users = len(self.levels)
-        total_messages = sum(data.get("total_messages", 0)
-                             for data in self.levels.values())
-        total_xp = sum(data["xp"] for data in self.levels.values())
-
         embed = discord.Embed(
             title="📊 Bot Statistics",
             color=discord.Color.blue()
         )
-        embed.add_field(name="Total Users", value=str(
-            total_users), inline=True)
-        embed.add_field(name="Total Messages", value=f"{
-                        total_messages:,}", inline=True)
-        embed.add_field(name="Total XP", value=f"{total_xp:,}", inline=True)
+
+        scopes = [("Global", self.stats_aggregates.summary())]
+        if ctx.guild:
+            scopes.append(
+                (ctx.guild.name, self.stats_aggregates.summary(ctx.guild.id)))
+
+        for name, summary in scopes:
+            embed.add_field(
+                name=name,
+                value=(f"Users: {summary['users']:,}\n"
+                       f"Messages: {summary['total_messages']:,}\n"
+                       f"XP: {summary['total_xp']:,}\n"
+                       f"Active (1d/7d/30d): {summary['active_1d']:,}/"
+                       f"{summary['active_7d']:,}/{summary['active_30d']:,}"),
+                inline=True
+            )
 
         await ctx.send(embed=embed)
 
+    def get_stats(self) -> Optional[Dict]:
+        """Return the last published global Levels stats.
+
+        Safe to call from other threads, the live aggregates are only
+        read on the event loop.
+        """
+        return self.stats_snapshot
+
 
 async def setup(bot):
     await bot.add_cog(LevelsCog(bot))
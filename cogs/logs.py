@@ -2,6 +2,44 @@ import discord
 from discord.ext import commands
 import datetime
 import asyncio
+import io
+import os
+import time
+from typing import Dict, List, Optional
+from utils.audit_store import AuditStore
+from utils.log_batcher import LogBatcher
+from utils.message_cache import CachedMessage, MessageCache
+
+# Buffered log embeds are sent this often (seconds)
+LOG_FLUSH_INTERVAL = 5
+# Voice changes of a member are summarized once they stop for this long (seconds)
+VOICE_SETTLE_SECONDS = 15
+# Discord's limit for embed field values
+FIELD_LIMIT = 1024
+# Memory budget and per-channel cap of the message content cache
+MESSAGE_CACHE_BYTES = 32 * 1024 * 1024
+MESSAGE_CACHE_PER_CHANNEL = 2000
+
+AUDIT_DB_FILE = 'data/audit.db'
+# Logged events are kept this many days in the audit store
+AUDIT_RETENTION_DAYS = float(os.getenv('AUDIT_RETENTION_DAYS', 90))
+AUDIT_PRUNE_INTERVAL = 3600
+LOG_SEARCH_PAGE_SIZE = 10
+
+
+def truncate(text: str, limit: int = FIELD_LIMIT) -> str:
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+class VoiceActivity:
+    """Voice channel changes of one member waiting to be logged."""
+
+    __slots__ = ("member", "changes", "last_change")
+
+    def __init__(self, member: discord.Member):
+        self.member = member
+        self.changes: List[tuple] = []
+        self.last_change = time.monotonic()
 
 
 class Logs(commands.Cog):
@@ -9,72 +47,204 @@ class Logs(commands.Cog):
         self.bot = bot
         self.log_channel_id =  # Replace with your log channel ID
         self.ignored_channels = set()  # Add channel IDs here to ignore
-        self.message_cache = {}
+        self.message_cache = MessageCache(
+            MESSAGE_CACHE_BYTES, MESSAGE_CACHE_PER_CHANNEL)
+        self.log_channel: Optional[discord.TextChannel] = None
+        self.batcher = LogBatcher(bot.outbound)
+        self.voice_activity: Dict[int, VoiceActivity] = {}
+        os.makedirs('data', exist_ok=True)
+        self.audit_store = AuditStore(AUDIT_DB_FILE)
+        self.audit_events: List[tuple] = []
         # Usar asyncio.create_task en lugar de self.bot.loop.create_task
-        self.clear_cache_task = asyncio.create_task(self.clear_message_cache())
+        self.flush_task = asyncio.create_task(self.flush_logs())
+        self.prune_task = asyncio.create_task(self.prune_audit_log())
+
+    async def cog_unload(self):
+        self.flush_task.cancel()
+        self.prune_task.cancel()
+        self.flush_voice_activity(force=True)
+        self.batcher.flush_all()
+        await self.flush_audit_events()
+        self.audit_store.close()
+
+    def get_log_channel(self) -> Optional[discord.TextChannel]:
+        if self.log_channel is None:
+            self.log_channel = self.bot.get_channel(self.log_channel_id)
+            if not self.log_channel:
+                print(
+                    f"Warning: Log channel with ID {self.log_channel_id} not found.")
+        return self.log_channel
+
+    def log(self, embed: discord.Embed):
+        """Buffer an embed for the log channel"""
+        channel = self.get_log_channel()
+        if channel:
+            self.batcher.add(channel, embed)
+
+    def record(self, event_type: str, guild_id: Optional[int], channel_id: Optional[int] = None,
+               user_id: Optional[int] = None, content: Optional[str] = None, details: Optional[Dict] = None):
+        """Queue an event for the audit store"""
+        self.audit_events.append(
+            (time.time(), guild_id, channel_id, user_id, event_type, content, details))
+
+    async def flush_audit_events(self):
+        if self.audit_events:
+            events, self.audit_events = self.audit_events, []
+            await asyncio.to_thread(self.audit_store.write, events)
+
+    async def flush_logs(self):
+        while True:
+            await asyncio.sleep(LOG_FLUSH_INTERVAL)
+            try:
+                self.flush_voice_activity()
+                self.batcher.flush_all()
+                await self.flush_audit_events()
+            except Exception as e:
+                print(f"Error flushing logs: {e}")
+
+    async def prune_audit_log(self):
+        while True:
+            try:
+                deleted = await asyncio.to_thread(self.audit_store.prune, AUDIT_RETENTION_DAYS)
+                if deleted:
+                    print(f"Pruned {deleted} audit log events")
+            except Exception as e:
+                print(f"Error pruning audit log: {e}")
+            await asyncio.sleep(AUDIT_PRUNE_INTERVAL)
 
-    async def get_log_channel(self):
-        channel = self.bot.get_channel(self.log_channel_id)
-        if not channel:
-            print(
-                f"Warning: Log channel with ID {self.log_channel_id} not found.")
-        return channel
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        if channel.id == self.log_channel_id:
+            self.log_channel = None
+        self.message_cache.drop_channel(channel.id)
 
     @commands.Cog.listener()
-    async def on_message_delete(self, message):
-        if message.channel.id in self.ignored_channels:
-            return
+    async def on_message(self, message):
+        if message.guild and message.channel.id not in self.ignored_channels:
+            self.message_cache.add(message)
 
-        channel = await self.get_log_channel()
-        if not channel:
+    def cached_message(self, message_id: int, message=None) -> Optional[CachedMessage]:
+        """Return a message from our cache, or from discord.py's if we missed it"""
+        cached = self.message_cache.get(message_id)
+        if cached is None and message is not None:
+            cached = CachedMessage(message, None)
+        return cached
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        if payload.channel_id in self.ignored_channels or payload.guild_id is None:
             return
 
+        cached = self.cached_message(payload.message_id, payload.cached_message)
+        self.message_cache.pop(payload.message_id)
+        self.record("message_delete", payload.guild_id, payload.channel_id,
+                    cached.author_id if cached else None,
+                    cached.content if cached else None,
+                    {"message_id": payload.message_id,
+                     "attachments": cached.attachments if cached else []})
+
         embed = discord.Embed(
             title="Message Deleted",
-            description=f"In {message.channel.mention}",
+            description=f"In <#{payload.channel_id}>",
             color=discord.Color.red()
         )
-        embed.add_field(name="Content", value=message.content or "No content")
-        embed.set_author(name=message.author.name,
-                         icon_url=message.author.display_avatar.url)
         embed.timestamp = datetime.datetime.utcnow()
+        if cached is None:
+            embed.add_field(name="Content", value="Unknown (message not cached)")
+            embed.set_footer(text=f"Message ID: {payload.message_id}")
+            self.log(embed)
+            return
 
-        if message.attachments:
-            embed.add_field(name="Attachments", value="\n".join(
-                [a.url for a in message.attachments]))
+        embed.add_field(name="Content", value=truncate(
+            cached.content or "No content"))
+        embed.set_author(name=cached.author_name, icon_url=cached.avatar_url)
+        if cached.attachments:
+            embed.add_field(name="Attachments", value=truncate(
+                "\n".join(cached.attachments)))
 
-        await channel.send(embed=embed)
+        self.log(embed)
 
     @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        if before.channel.id in self.ignored_channels or before.content == after.content:
+    async def on_raw_bulk_message_delete(self, payload):
+        if payload.channel_id in self.ignored_channels:
             return
 
-        channel = await self.get_log_channel()
+        cached_messages = {message.id: message for message in payload.cached_messages}
+        lines = []
+        missing = 0
+        for message_id in sorted(payload.message_ids):
+            cached = self.cached_message(message_id, cached_messages.get(message_id))
+            self.message_cache.pop(message_id)
+            if cached is None:
+                missing += 1
+                continue
+            self.record("message_bulk_delete", payload.guild_id, payload.channel_id,
+                        cached.author_id, cached.content,
+                        {"message_id": message_id, "attachments": cached.attachments})
+            created_at = datetime.datetime.utcfromtimestamp(cached.created_at)
+            line = (f"[{created_at.strftime('%Y-%m-%d %H:%M:%S')}] "
+                    f"{cached.author_name} ({cached.author_id}): {cached.content}")
+            if cached.attachments:
+                line += " " + " ".join(cached.attachments)
+            lines.append(line)
+        if missing:
+            lines.append(f"{missing} messages were not cached")
+
+        channel = self.get_log_channel()
         if not channel:
             return
 
+        timestamp = datetime.datetime.utcnow()
+        archive = discord.File(
+            io.BytesIO("\n".join(lines).encode("utf-8")),
+            filename=f"deleted-{payload.channel_id}-{timestamp.strftime('%Y%m%d-%H%M%S')}.txt"
+        )
+        self.batcher.send_file(
+            channel, f"🗑️ {len(payload.message_ids)} messages deleted in <#{payload.channel_id}>", archive)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload):
+        if payload.channel_id in self.ignored_channels or payload.guild_id is None:
+            return
+
+        after = payload.data.get("content")
+        author = payload.data.get("author", {})
+        # Embed unfurls also fire edits, only real edits set edited_timestamp
+        if after is None or author.get("bot") or not payload.data.get("edited_timestamp"):
+            return
+
+        cached = self.cached_message(payload.message_id, payload.cached_message)
+        before = cached.content if cached else None
+        if before == after:
+            return
+        self.message_cache.update(payload.message_id, after)
+        self.record("message_edit", payload.guild_id, payload.channel_id,
+                    int(author["id"]) if "id" in author else None, after,
+                    {"message_id": payload.message_id, "before": before})
+
         embed = discord.Embed(
             title="Message Edited",
-            description=f"In {before.channel.mention}",
+            description=f"In <#{payload.channel_id}> ([jump](https://discord.com/channels/{
+                payload.guild_id}/{payload.channel_id}/{payload.message_id}))",
             color=discord.Color.blue()
         )
+        if before is None:
+            before = "Unknown (message not cached)"
         embed.add_field(
-            name="Before", value=before.content or "No content", inline=False)
+            name="Before", value=truncate(before or "No content"), inline=False)
         embed.add_field(
-            name="After", value=after.content or "No content", inline=False)
-        embed.set_author(name=before.author.name,
-                         icon_url=before.author.display_avatar.url)
+            name="After", value=truncate(after or "No content"), inline=False)
+        if cached:
+            embed.set_author(name=cached.author_name, icon_url=cached.avatar_url)
+        elif author:
+            embed.set_author(name=author.get("username", "Unknown"))
         embed.timestamp = datetime.datetime.utcnow()
 
-        await channel.send(embed=embed)
+        self.log(embed)
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
-        channel = await self.get_log_channel()
-        if not channel:
-            return
-
+        self.record("member_join", member.guild.id, user_id=member.id, content=str(member))
         embed = discord.Embed(
             title="Member Joined",
             description=f"{member.mention} joined the server",
@@ -85,14 +255,11 @@ class Logs(commands.Cog):
         embed.add_field(name="Account Created",
                         value=member.created_at.strftime("%Y-%m-%d %H:%M:%S"))
 
-        await channel.send(embed=embed)
+        self.log(embed)
 
     @commands.Cog.listener()
     async def on_member_remove(self, member):
-        channel = await self.get_log_channel()
-        if not channel:
-            return
-
+        self.record("member_remove", member.guild.id, user_id=member.id, content=str(member))
         embed = discord.Embed(
             title="Member Left",
             description=f"{member.mention} left the server",
@@ -103,7 +270,7 @@ class Logs(commands.Cog):
         embed.add_field(name="Joined At", value=member.joined_at.strftime(
             "%Y-%m-%d %H:%M:%S") if member.joined_at else "Unknown")
 
-        await channel.send(embed=embed)
+        self.log(embed)
 
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
@@ -111,15 +278,15 @@ class Logs(commands.Cog):
             await self.log_role_changes(before, after)
 
     async def log_role_changes(self, before, after):
-        channel = await self.get_log_channel()
-        if not channel:
-            return
-
         removed_roles = set(before.roles) - set(after.roles)
         added_roles = set(after.roles) - set(before.roles)
 
         if not (removed_roles or added_roles):
             return
+        self.record("member_roles", after.guild.id, user_id=after.id, details={
+            "added": [role.id for role in added_roles],
+            "removed": [role.id for role in removed_roles]
+        })
 
         embed = discord.Embed(
             title="Member Roles Updated",
@@ -130,45 +297,141 @@ class Logs(commands.Cog):
         embed.timestamp = datetime.datetime.utcnow()
 
         if removed_roles:
-            embed.add_field(name="Roles Removed", value=", ".join(
-                [role.name for role in removed_roles]), inline=False)
+            embed.add_field(name="Roles Removed", value=truncate(", ".join(
+                [role.name for role in removed_roles])), inline=False)
         if added_roles:
-            embed.add_field(name="Roles Added", value=", ".join(
-                [role.name for role in added_roles]), inline=False)
+            embed.add_field(name="Roles Added", value=truncate(", ".join(
+                [role.name for role in added_roles])), inline=False)
 
-        await channel.send(embed=embed)
+        self.log(embed)
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
-        channel = await self.get_log_channel()
-        if not channel:
+        if before.channel == after.channel:
             return
 
-        if before.channel != after.channel:
-            if after.channel:
-                action = f"joined {after.channel.name}"
-                color = discord.Color.green()
-            elif before.channel:
-                action = f"left {before.channel.name}"
-                color = discord.Color.red()
-            else:
-                return
-
+        if after.channel:
+            action = f"joined {after.channel.name}"
+        elif before.channel:
+            action = f"left {before.channel.name}"
+        else:
+            return
+        self.record("voice", member.guild.id, (after.channel or before.channel).id,
+                    member.id, action)
+
+        activity = self.voice_activity.get(member.id)
+        if activity is None:
+            activity = self.voice_activity[member.id] = VoiceActivity(member)
+        activity.changes.append((datetime.datetime.utcnow(), action, bool(after.channel)))
+        activity.last_change = time.monotonic()
+
+    def flush_voice_activity(self, force: bool = False):
+        """Log the voice changes of members that stopped switching channels.
+
+        Rapid join/leave flapping is collapsed into one summary embed.
+        """
+        now = time.monotonic()
+        for user_id, activity in list(self.voice_activity.items()):
+            if not force and now - activity.last_change < VOICE_SETTLE_SECONDS:
+                continue
+            del self.voice_activity[user_id]
+            self.log(self.voice_embed(activity))
+
+    def voice_embed(self, activity: VoiceActivity) -> discord.Embed:
+        member = activity.member
+        changes = activity.changes
+        color = discord.Color.green() if changes[-1][2] else discord.Color.red()
+
+        if len(changes) == 1:
             embed = discord.Embed(
                 title="Voice Channel Update",
-                description=f"{member.mention} {action}",
+                description=f"{member.mention} {changes[0][1]}",
                 color=color
             )
-            embed.set_author(name=member.name,
-                             icon_url=member.display_avatar.url)
-            embed.timestamp = datetime.datetime.utcnow()
+            embed.timestamp = changes[0][0]
+        else:
+            lines = [f"`{timestamp.strftime('%H:%M:%S')}` {action}"
+                     for timestamp, action, _ in changes[-10:]]
+            if len(changes) > 10:
+                lines.insert(0, f"... {len(changes) - 10} earlier changes")
+            duration = (changes[-1][0] - changes[0][0]).total_seconds()
+            embed = discord.Embed(
+                title="Voice Channel Activity",
+                description=f"{member.mention} changed voice channels {
+                    len(changes)} times in {duration:.0f}s",
+                color=color
+            )
+            embed.add_field(name="Changes", value=truncate(
+                "\n".join(lines)), inline=False)
+            embed.timestamp = changes[-1][0]
 
-            await channel.send(embed=embed)
+        embed.set_author(name=member.name,
+                         icon_url=member.display_avatar.url)
+        return embed
 
-    async def clear_message_cache(self):
-        while True:
-            await asyncio.sleep(3600)  # Clear cache every hour
-            self.message_cache.clear()
+    def get_metrics(self):
+        return {
+            **self.batcher.get_metrics(),
+            "message_cache": self.message_cache.get_metrics(),
+            "audit_events_pending": len(self.audit_events)
+        }
+
+    @commands.command()
+    @commands.has_permissions(view_audit_log=True)
+    async def logsearch(self, ctx, *, query: str = ""):
+        """Search the audit log
+
+        Filters: user:<@user|id> channel:<#channel|id> type:<event> days:<n> page:<n>,
+        any other words are searched in the message content.
+        Events: message_delete, message_bulk_delete, message_edit, member_join,
+        member_remove, member_roles, voice
+        """
+        filters = {"guild_id": ctx.guild.id, "page": 1, "per_page": LOG_SEARCH_PAGE_SIZE}
+        words = []
+        for token in query.split():
+            key, _, value = token.partition(":")
+            digits = "".join(c for c in value if c.isdigit())
+            if key == "user" and digits:
+                filters["user_id"] = int(digits)
+            elif key == "channel" and digits:
+                filters["channel_id"] = int(digits)
+            elif key == "type" and value:
+                filters["event_type"] = value
+            elif key == "days" and digits:
+                filters["since"] = time.time() - int(digits) * 86400
+            elif key == "page" and digits:
+                filters["page"] = int(digits)
+            else:
+                words.append(token)
+        if words:
+            filters["text"] = " ".join(words)
+
+        started = time.perf_counter()
+        await self.flush_audit_events()
+        result = await asyncio.to_thread(self.audit_store.search, **filters)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        embed = discord.Embed(
+            title=f"🔎 Audit Log (Page {result['page']})",
+            color=discord.Color.blue()
+        )
+        for event in result["results"]:
+            created_at = datetime.datetime.utcfromtimestamp(event["created_at"])
+            where = f" in <#{event['channel_id']}>" if event["channel_id"] else ""
+            who = f"<@{event['user_id']}>" if event["user_id"] else "Unknown user"
+            embed.add_field(
+                name=f"{event['event_type']} • {created_at.strftime('%Y-%m-%d %H:%M:%S')}",
+                value=truncate(f"{who}{where}\n{event['content'] or ''}", 300),
+                inline=False
+            )
+        if not result["results"]:
+            embed.description = "No matching events"
+        more = ""
+        if result["has_more"]:
+            base = " ".join(token for token in query.split() if not token.startswith("page:"))
+            more = f" • {ctx.prefix}logsearch {base} page:{result['page'] + 1} for more"
+        embed.set_footer(text=f"{elapsed:.0f} ms{more}")
+        await ctx.send(embed=embed)
 
     @commands.command()
     @commands.has_permissions(administrator=True)
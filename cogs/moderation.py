@@ -9,7 +9,19 @@ import random
 import logging
 from typing import Optional, Union, List, Dict
 import re
-from collections import defaultdict
+import time
+from collections import Counter, defaultdict
+from utils.automod_profiles import (GLOBAL_SETTINGS, RULES, AutoModProfile, AutoModProfiles,
+                                   ExemptionCache)
+from utils.bulk_jobs import BulkRunner
+from utils.duplicate_detector import DuplicateDetector
+from utils.outbound import Priority
+from utils.punishments import Punishment, PunishmentScheduler, parse_duration
+from utils.raid_detector import RaidDetector
+from utils.spam_detector import SpamDetector, SpamRule
+from utils.word_filter import WordFilter
+from utils.link_scanner import (ALLOW, DENY, SHORTENERS, LinkPolicies, ShortenerCache,
+                                 scan_invites, scan_links)
 
 WELCOME_CHANNEL_ID =  # ID channels here
 LEFT_CHANNEL_ID =  # ID channels here
@@ -17,6 +29,31 @@ BANNED_CHANNEL_ID =  # ID channels here
 UNBANNED_CHANNEL_ID =  # ID channels here
 WARNINGS_CHANNEL_ID =  # ID channels here
 
+BULK_JOBS_FILE = 'data/bulk_jobs.json'
+# Messages scanned per channel by a purge
+PURGE_SCAN_LIMIT = 1000
+MAX_BULK_TARGETS = 5000
+# Discord does not accept timeouts longer than 28 days
+MAX_TIMEOUT_MINUTES = 28 * 24 * 60
+MUTED_ROLES_FILE = 'data/muted_roles.json'
+# Uncached short links of a message resolved in the background, the rest count as is
+MAX_SHORT_LINK_LOOKUPS = 3
+# Quiet guilds only drop their expired duplicate and join history this often (seconds)
+DETECTOR_PRUNE_INTERVAL = 300
+PUNISHMENTS_FILE = 'data/punishments.json'
+QUARANTINE_FILE = 'data/quarantine.json'
+MUTED_ROLE_GUILD_CONCURRENCY = 3
+MUTED_ROLE_CHANNEL_CONCURRENCY = 5
+# Everything the muted role denies, set with one request per channel
+MUTED_OVERWRITE = discord.PermissionOverwrite(
+    send_messages=False,
+    send_messages_in_threads=False,
+    create_public_threads=False,
+    create_private_threads=False,
+    add_reactions=False,
+    speak=False
+)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,14 +63,30 @@ class AutoModConfig:
     def __init__(self):
         self.spam_threshold = 5
         self.spam_interval = 5
+        self.spam_long_threshold = 20
+        self.spam_long_interval = 60
+        self.channel_spam_threshold = 30
+        self.channel_spam_interval = 10
+        self.guild_spam_threshold = 100
+        self.guild_spam_interval = 10
+        self.spam_slowmode = 5  # seconds
+        self.duplicate_window = 60
+        self.duplicate_channels = 3
+        self.duplicate_users = 4
         self.raid_threshold = 10
         self.raid_interval = 30
+        self.raid_account_age_days = 7
+        self.raid_lockdown_minutes = 10
+        self.raid_slowmode = 10  # seconds
+        self.lockdown_concurrency = 5
         self.max_mentions = 5
         self.max_links = 3
+        self.block_invites = 0
         self.mute_duration = 5  # minutes
         self.warn_expire_days = 30
         self.max_warnings = 3
         self.auto_ban_threshold = 5
+        self.dry_run = 0  # log violations instead of acting on them
 
 
 class Moderation(commands.Cog):
@@ -51,14 +104,45 @@ class Moderation(commands.Cog):
         self.bot = bot
         self.config = AutoModConfig()
         self.warnings = defaultdict(list)
-        self.spam_control = defaultdict(list)
-        self.raid_detection = set()
+        self.profiles = AutoModProfiles()
+        self.plans = {}
+        self.exemptions = ExemptionCache()
+        self.rule_checks = {
+            "spam": self.check_spam,
+            "duplicates": self.check_duplicates,
+            "filter": self.filter_content,
+            "mentions": self.check_mentions,
+            "links": self.check_links
+        }
+        # Replays set these to feed recorded timestamps and collect violations
+        self.clock = time.monotonic
+        self.dry_run_log = None
+        self.slowed_channels = set()
+        self.raid_detection = set()  # Guilds in lockdown
+        self.lockdowns = {}
+        self.quarantine_queue = asyncio.Queue()
+        self.quarantine_workers = []
+        self.prune_task = None
+        # Guild ID -> IDs of the members a lockdown gave the muted role
+        self.quarantined = {}
+        self.quarantine_lock = asyncio.Lock()
         self.session = None
         self.muted_roles = {}
-        self.temp_bans = {}
+        # Guild ID -> {"role_id": ..., "channels": [channels done]}, a checkpoint of provisioning
+        self.muted_role_state = {}
+        self.muted_role_tasks = {}
+        self.muted_role_semaphore = asyncio.Semaphore(MUTED_ROLE_GUILD_CONCURRENCY)
+        self.muted_role_lock = asyncio.Lock()
+        self.punishments = PunishmentScheduler(PUNISHMENTS_FILE, self.lift_punishments)
         self.auto_mod_enabled = True
-        self.filtered_words = set()
+        self.word_filter = WordFilter()
+        self.link_policies = LinkPolicies()
+        self.shorteners = ShortenerCache()
         self.user_notes = defaultdict(list)
+        self.bulk = BulkRunner(BULK_JOBS_FILE, on_progress=self.report_job)
+        self.bulk.register("purge", self.bulk_purge, chunk_size=1, rate=(5, 1.0))
+        self.bulk.register("ban", self.bulk_ban, chunk_size=200, rate=(1, 2.0))
+        self.bulk.register("timeout", self.bulk_timeout, chunk_size=1, rate=(5, 1.0))
 
         # Create data directory if it doesn't exist
         os.makedirs('data', exist_ok=True)
@@ -71,16 +155,40 @@ class Moderation(commands.Cog):
         """Initialize the cog and create necessary directories."""
         self.session = aiohttp.ClientSession()
         os.makedirs('data', exist_ok=True)
-        await self.setup_muted_roles()
+        self.bulk.start()
+        self.punishments.start()
+        self.quarantine_workers = [
+            asyncio.create_task(self.quarantine_worker())
+            for _ in range(self.config.lockdown_concurrency)
+        ]
+        self.prune_task = asyncio.create_task(self.prune_detectors())
         logger.info("ModerationCog loaded successfully")
 
     async def cog_unload(self):
         """Cleanup when cog is unloaded."""
         if self.session:
             await self.session.close()
+        for worker in self.quarantine_workers:
+            worker.cancel()
+        if self.prune_task:
+            self.prune_task.cancel()
+        for task in self.muted_role_tasks.values():
+            task.cancel()
+        for lockdown in self.lockdowns.values():
+            if lockdown["task"]:
+                lockdown["task"].cancel()
+        await self.bulk.stop()
+        await self.punishments.stop()
         self.save_data()
         logger.info("ModerationCog unloaded successfully")
 
+    def initialize_data_files(self):
+        """Create the data files that do not exist yet."""
+        for filename in ('data/warnings.json', 'data/user_notes.json'):
+            if not os.path.exists(filename):
+                with open(filename, 'w') as f:
+                    json.dump({}, f)
+
     def load_data(self):
         """Load all moderation data from files."""
         try:
@@ -90,11 +198,27 @@ class Moderation(commands.Cog):
 
             if os.path.exists('data/filtered_words.json'):
                 with open('data/filtered_words.json', 'r') as f:
-                    self.filtered_words = set(json.load(f))
+                    self.word_filter = WordFilter.from_data(json.load(f))
+
+            if os.path.exists('data/automod_profiles.json'):
+                with open('data/automod_profiles.json', 'r') as f:
+                    self.profiles = AutoModProfiles(json.load(f))
+
+            if os.path.exists('data/link_policies.json'):
+                with open('data/link_policies.json', 'r') as f:
+                    self.link_policies = LinkPolicies(json.load(f))
 
             if os.path.exists('data/user_notes.json'):
                 with open('data/user_notes.json', 'r') as f:
                     self.user_notes = defaultdict(list, json.load(f))
+
+            if os.path.exists(MUTED_ROLES_FILE):
+                with open(MUTED_ROLES_FILE, 'r') as f:
+                    self.muted_role_state = json.load(f)
+
+            if os.path.exists(QUARANTINE_FILE):
+                with open(QUARANTINE_FILE, 'r') as f:
+                    self.quarantined = json.load(f)
         except Exception as e:
             logger.error(f"Error loading moderation data: {e}")
 
@@ -105,68 +229,261 @@ class Moderation(commands.Cog):
                 json.dump(dict(self.warnings), f, indent=4)
 
             with open('data/filtered_words.json', 'w') as f:
-                json.dump(list(self.filtered_words), f, indent=4)
+                json.dump(self.word_filter.to_data(), f, indent=4)
+
+            with open('data/automod_profiles.json', 'w') as f:
+                json.dump(self.profiles.to_data(), f, indent=4)
+
+            with open('data/link_policies.json', 'w') as f:
+                json.dump(self.link_policies.to_data(), f, indent=4)
 
             with open('data/user_notes.json', 'w') as f:
                 json.dump(dict(self.user_notes), f, indent=4)
         except Exception as e:
             logger.error(f"Error saving moderation data: {e}")
 
-    async def setup_muted_roles(self):
-        """Create or get muted roles for all guilds."""
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Provision muted roles once the guilds are known."""
+        self.setup_muted_roles(self.bot.guilds)
+        # Lockdowns do not survive a restart, their quarantines would never end
         for guild in self.bot.guilds:
-            role = discord.utils.get(guild.roles, name="Muted")
-            if not role:
+            if str(guild.id) in self.quarantined and guild.id not in self.lockdowns:
+                asyncio.create_task(self.release_quarantine(guild))
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        """Provision the muted role of a new guild."""
+        self.setup_muted_roles([guild])
+
+    def setup_muted_roles(self, guilds):
+        """Provision the muted role of guilds in the background."""
+        for guild in guilds:
+            if guild.id not in self.muted_role_tasks:
+                self.muted_role_tasks[guild.id] = asyncio.create_task(
+                    self.provision_muted_role(guild))
+
+    async def provision_muted_role(self, guild):
+        """Create or get the muted role of a guild and deny it in every channel.
+
+        Channels that already got the overwrite are checkpointed, so a
+        restart only handles the channels left.
+        """
+        try:
+            async with self.muted_role_semaphore:
+                await self._provision_muted_role(guild)
+        except Exception as e:
+            logger.error(f"Error provisioning muted role in {guild.id}: {e}")
+        finally:
+            self.muted_role_tasks.pop(guild.id, None)
+
+    async def _provision_muted_role(self, guild):
+        state = self.muted_role_state.get(str(guild.id))
+        role = guild.get_role(state["role_id"]) if state else None
+        role = role or discord.utils.get(guild.roles, name="Muted")
+        if not role:
+            try:
+                role = await guild.create_role(name="Muted", reason="Auto-moderation muted role")
+            except (discord.Forbidden, discord.HTTPException):
+                logger.error(f"Cannot create muted role in {guild.name}")
+                return
+        self.muted_roles[guild.id] = role
+
+        if not state or state["role_id"] != role.id:
+            state = self.muted_role_state[str(guild.id)] = {"role_id": role.id, "channels": []}
+        done = set(state["channels"])
+        channels = []
+        for channel in guild.channels:
+            if channel.id in done:
+                continue
+            if channel.overwrites_for(role).send_messages is False:
+                state["channels"].append(channel.id)
+            else:
+                channels.append(channel)
+        if not channels:
+            await self.save_muted_role_state()
+            return
+
+        semaphore = asyncio.Semaphore(MUTED_ROLE_CHANNEL_CONCURRENCY)
+
+        async def deny(channel):
+            async with semaphore:
                 try:
-                    role = await guild.create_role(
-                        name="Muted",
-                        reason="Auto-moderation muted role"
-                    )
-                    for channel in guild.channels:
-                        await channel.set_permissions(role, send_messages=False)
-                except discord.Forbidden:
-                    logger.error(f"Cannot create muted role in {guild.name}")
-            self.muted_roles[guild.id] = role
+                    await channel.set_permissions(role, overwrite=MUTED_OVERWRITE,
+                                                  reason="Auto-moderation muted role")
+                except (discord.Forbidden, discord.HTTPException) as e:
+                    logger.warning(f"Cannot set muted role overwrite in {channel.id}: {e}")
+                    return
+                state["channels"].append(channel.id)
+                if len(state["channels"]) % 25 == 0:
+                    await self.save_muted_role_state()
+
+        await asyncio.gather(*(deny(channel) for channel in channels))
+        await self.save_muted_role_state()
+        logger.info(f"Muted role provisioned in {guild.id} ({len(channels)} channels updated)")
+
+    def find_muted_role(self, guild):
+        """Return the muted role of a guild, also before provisioning got to it."""
+        role = self.muted_roles.get(guild.id)
+        if role is None:
+            state = self.muted_role_state.get(str(guild.id))
+            role = guild.get_role(state["role_id"]) if state else None
+            role = role or discord.utils.get(guild.roles, name="Muted")
+        return role
+
+    async def save_muted_role_state(self):
+        async with self.muted_role_lock:
+            content = json.dumps(self.muted_role_state)
+            await asyncio.to_thread(self._write_file, MUTED_ROLES_FILE, content)
+
+    @staticmethod
+    def _write_file(filename: str, content: str):
+        with open(filename, 'w') as f:
+            f.write(content)
 
     @commands.command()
     @commands.has_permissions(administrator=True)
-    async def automod(self, ctx, setting: str = None, value: str = None):
-        """Configure auto-moderation settings.
+    async def automod(self, ctx, setting: str = None, *, value: str = None):
+        """Configure auto-moderation settings of this server.
 
         View or modify auto-moderation parameters like spam thresholds,
-        maximum warnings, and punishment durations.
+        maximum warnings, and punishment durations, turn checks on and off
+        and exempt roles or channels. Settings not changed here use the
+        bot's defaults.
 
         Parameters:
         -----------
         setting: str
-            The setting to modify (optional)
+            The setting to modify, or enable, disable, exempt, unexempt or reset (optional)
         value: str
-            The new value for the setting (optional)
+            The new value, check, role or channel (optional)
 
         Examples:
         --------
         !automod
         !automod spam_threshold 5
-        !automod mute_duration 10
+        !automod disable links
+        !automod exempt @Trusted
+        !automod exempt #bot-commands
+        !automod reset mute_duration
         """
+        guild_id = ctx.guild.id
         if not setting:
             # Display current settings
+            plan = self.get_plan(guild_id)
+            overrides = (self.profiles.guilds.get(guild_id) or AutoModProfile()).settings
             embed = discord.Embed(
                 title="Auto-Moderation Settings",
                 color=discord.Color.blue()
             )
-            for attr, value in vars(self.config).items():
-                embed.add_field(name=attr, value=str(value))
+            for attr, value in vars(plan.config).items():
+                embed.add_field(name=attr + (" *" if attr in overrides else ""), value=str(value))
+            embed.add_field(name="Checks", value=", ".join(plan.rules) or "None", inline=False)
+            exempt = [f"<@&{role_id}>" for role_id in plan.exempt_roles]
+            exempt += [f"<#{channel_id}>" for channel_id in plan.exempt_channels]
+            embed.add_field(name="Exempt", value=", ".join(exempt) or "None", inline=False)
+            embed.set_footer(text="* changed for this server")
             return await ctx.send(embed=embed)
 
-        try:
-            if hasattr(self.config, setting):
-                setattr(self.config, setting, int(value))
-                await ctx.send(f"Updated {setting} to {value}")
+        profile = self.profiles.get(guild_id)
+        setting = setting.lower()
+        changed = ""
+        if setting in ("enable", "disable"):
+            if value not in RULES:
+                return await ctx.send(f"Invalid check, choose from: {', '.join(RULES)}")
+            if setting == "enable":
+                profile.disabled.discard(value)
             else:
-                await ctx.send("Invalid setting")
-        except ValueError:
-            await ctx.send("Invalid value")
+                profile.disabled.add(value)
+            reply = f"{setting.capitalize()}d {value} checks"
+        elif setting in ("exempt", "unexempt"):
+            target_id = int(re.sub(r"\D", "", value or "") or 0)
+            if ctx.guild.get_role(target_id):
+                targets = profile.exempt_roles
+            elif ctx.guild.get_channel(target_id):
+                targets = profile.exempt_channels
+            else:
+                return await ctx.send("Mention a role or a channel")
+            if setting == "exempt":
+                targets.add(target_id)
+            else:
+                targets.discard(target_id)
+            reply = f"Updated exemptions of {value}"
+        elif setting == "reset":
+            if value:
+                profile.settings.pop(value, None)
+                changed = value
+            else:
+                self.profiles.reset(guild_id)
+                changed = "spam duplicate raid"
+            reply = f"Reset {value or 'all settings'}"
+        elif setting in GLOBAL_SETTINGS:
+            return await ctx.send(f"{setting} applies to every server and cannot be changed here")
+        elif setting in vars(self.config):
+            try:
+                number = int(value)
+            except (TypeError, ValueError):
+                return await ctx.send("Invalid value")
+            if setting == "raid_lockdown_minutes" and number <= 0:
+                return await ctx.send("The lockdown duration must be at least 1 minute")
+            profile.settings[setting] = number
+            changed = setting
+            reply = f"Updated {setting} to {value}"
+        else:
+            return await ctx.send("Invalid setting")
+
+        self.compile_plan(guild_id, self.plans.get(guild_id), changed)
+        self.exemptions.invalidate_guild(guild_id)
+        self.save_data()
+        await ctx.send(reply)
+
+    def compile_plan(self, guild_id: int, previous=None, changed: str = ""):
+        """Compile a guild's profile, keeping the detectors whose settings did not change."""
+        profile = self.profiles.guilds.get(guild_id) or AutoModProfile()
+        plan = profile.compile(self.config)
+        plan.checks = tuple(self.rule_checks[rule] for rule in plan.rules)
+        if previous is not None and "spam" not in changed:
+            plan.spam_detector = previous.spam_detector
+        else:
+            plan.spam_detector = self.build_spam_detector(plan.config)
+        if previous is not None and "duplicate" not in changed:
+            plan.duplicate_detector = previous.duplicate_detector
+        else:
+            plan.duplicate_detector = self.build_duplicate_detector(plan.config)
+        if previous is not None and "raid" not in changed:
+            plan.raid_detector = previous.raid_detector
+        else:
+            plan.raid_detector = self.build_raid_detector(plan.config)
+        self.plans[guild_id] = plan
+        return plan
+
+    def get_plan(self, guild_id: int):
+        plan = self.plans.get(guild_id)
+        return plan if plan is not None else self.compile_plan(guild_id)
+
+    def is_exempt(self, member, plan) -> bool:
+        """Check whether a member skips automod, cached until their roles change."""
+        exempt = self.exemptions.get(member.guild.id, member.id)
+        if exempt is None:
+            exempt = (member.guild_permissions.administrator or
+                      not plan.exempt_roles.isdisjoint(role.id for role in member.roles))
+            self.exemptions.set(member.guild.id, member.id, exempt)
+        return exempt
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        """Drop the cached exemption of members whose roles changed."""
+        if before.roles != after.roles:
+            self.exemptions.invalidate(after.guild.id, after.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        if before.permissions != after.permissions:
+            self.exemptions.invalidate_guild(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.exemptions.invalidate_guild(role.guild.id)
 
     @commands.command()
     @commands.has_permissions(manage_messages=True)
@@ -211,17 +528,18 @@ class Moderation(commands.Cog):
         await ctx.send(embed=embed)
 
         # Auto-punishment system
-        if warning_count >= self.config.max_warnings:
+        if warning_count >= self.get_plan(ctx.guild.id).config.max_warnings:
             await self.handle_max_warnings(ctx, member)
 
     async def handle_max_warnings(self, ctx, member: discord.Member):
         """Handle actions when a member reaches maximum warnings."""
         warning_count = len(self.warnings[str(member.id)])
+        config = self.get_plan(ctx.guild.id).config
 
-        if warning_count >= self.config.auto_ban_threshold:
+        if warning_count >= config.auto_ban_threshold:
             await member.ban(reason=f"Exceeded maximum warnings ({warning_count})")
             action = "banned"
-        elif warning_count >= self.config.max_warnings:
+        elif warning_count >= config.max_warnings:
             duration = timedelta(days=1)
             await member.timeout(duration, reason=f"Exceeded warning threshold ({warning_count})")
             action = "timed out for 24 hours"
@@ -307,52 +625,379 @@ class Moderation(commands.Cog):
         if not message.guild:
             return
 
-        # Check permissions
-        if message.author.guild_permissions.administrator:
+        plan = self.get_plan(message.guild.id)
+        if not plan.checks or plan.is_exempt_channel(message.channel):
             return
 
-        # Spam detection
-        await self.check_spam(message)
+        # Check permissions
+        if self.is_exempt(message.author, plan):
+            return
 
-        # Content filtering
-        await self.filter_content(message)
+        for check in plan.checks:
+            await check(message, plan)
 
-        # Mention spam
-        if len(message.mentions) > self.config.max_mentions:
+    async def check_mentions(self, message, plan):
+        """Check for mention spam."""
+        if len(message.mentions) > plan.config.max_mentions:
             await self.handle_violation(message, "mention spam")
 
-        # Link spam
-        links = re.findall(
-            r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*(),]|%[0-9a-fA-F][0-9a-fA-F])+', message.content)
-        if len(links) > self.config.max_links:
+    async def check_links(self, message, plan):
+        """Check the links of a message against the guild's link policy."""
+        if plan.config.block_invites and scan_invites(message.content):
+            return await self.handle_violation(message, "invite link")
+
+        counted = 0
+        unresolved = []
+        for link in scan_links(message.content):
+            host = link.host
+            if host in SHORTENERS:
+                resolved = self.shorteners.get(link.url)
+                if resolved is not None:
+                    host = resolved
+                elif self.session and len(unresolved) < MAX_SHORT_LINK_LOOKUPS:
+                    unresolved.append(link.url)
+
+            policy = self.link_policies.lookup(message.guild.id, host)
+            if policy == DENY:
+                return await self.handle_violation(message, "blocked link")
+            if policy != ALLOW:
+                counted += 1
+
+        if counted > plan.config.max_links:
             await self.handle_violation(message, "link spam")
+        elif unresolved:
+            asyncio.create_task(self.check_short_links(message, unresolved))
 
-    async def check_spam(self, message):
+    async def check_short_links(self, message, urls: List[str]):
+        """Resolve short links off the message path and act if one leads to a blocked domain."""
+        try:
+            hosts = await asyncio.gather(*(self.shorteners.resolve(self.session, url) for url in urls))
+            if any(self.link_policies.lookup(message.guild.id, host) == DENY for host in hosts):
+                await self.handle_violation(message, "blocked link")
+        except Exception as e:
+            logger.warning(f"Error checking short links of message {message.id}: {e}")
+
+    def build_spam_detector(self, config) -> SpamDetector:
+        """Build the spam detector from an auto-moderation config."""
+        return SpamDetector([
+            SpamRule("user", config.spam_threshold, config.spam_interval),
+            SpamRule("user", config.spam_long_threshold, config.spam_long_interval),
+            SpamRule("channel", config.channel_spam_threshold, config.channel_spam_interval),
+            SpamRule("guild", config.guild_spam_threshold, config.guild_spam_interval),
+        ])
+
+    def build_duplicate_detector(self, config) -> DuplicateDetector:
+        """Build the near-duplicate detector from an auto-moderation config."""
+        return DuplicateDetector(window=config.duplicate_window)
+
+    async def check_spam(self, message, plan):
         """Check for message spam."""
-        user_id = str(message.author.id)
-        now = datetime.utcnow()
+        broken = plan.spam_detector.check(
+            message.guild.id, message.channel.id, message.author.id, now=self.clock())
+        if broken:
+            scopes = {rule.scope for rule in broken}
+            if ("channel" in scopes or "guild" in scopes) and \
+                    not self.is_dry_run(message, "message burst"):
+                logger.warning(f"Message burst in {message.guild.id}/{message.channel.id}: "
+                               f"{', '.join(map(repr, broken))}")
+                asyncio.create_task(self.slow_down(message.channel))
+            if "user" in scopes:
+                await self.handle_violation(message, "spam")
+
+    async def check_duplicates(self, message, plan):
+        """Check for copy-paste spam, from one account across channels or from many accounts."""
+        match = plan.duplicate_detector.check(
+            message.guild.id, message.channel.id, message.author.id, message.content,
+            now=self.clock())
+        if match is None:
+            return
+        if len(match.user_channels) >= plan.config.duplicate_channels:
+            await self.handle_violation(message, "cross-channel spam")
+        elif len(match.users) >= plan.config.duplicate_users:
+            logger.warning(f"Coordinated spam in {message.guild.id} from {len(match.users)} "
+                           f"accounts in {len(match.channels)} channels")
+            await self.handle_violation(message, "coordinated spam")
+
+    def get_metrics(self) -> Dict:
+        spam, duplicates = Counter(), Counter()
+        for plan in self.plans.values():
+            spam.update(plan.spam_detector.get_metrics())
+            duplicates.update(plan.duplicate_detector.get_metrics())
+        return {
+            "automod_plans": len(self.plans),
+            "spam_detector": dict(spam),
+            "duplicate_detector": dict(duplicates),
+            "lockdowns": len(self.raid_detection),
+            "quarantine_queue": self.quarantine_queue.qsize()
+        }
 
-        self.spam_control[user_id] = [
-            msg_time for msg_time in self.spam_control[user_id]
-            if (now - msg_time).seconds < self.config.spam_interval
-        ]
+    async def prune_detectors(self):
+        """Periodically expire the history of guilds that stopped receiving messages or joins."""
+        while True:
+            await asyncio.sleep(DETECTOR_PRUNE_INTERVAL)
+            try:
+                now = self.clock()
+                for plan in list(self.plans.values()):
+                    plan.duplicate_detector.prune(now)
+                    plan.raid_detector.prune()
+            except Exception as e:
+                logger.error(f"Error in prune_detectors: {e}")
+
+    async def slow_down(self, channel):
+        """Temporarily enable slowmode in a channel hit by distributed spam."""
+        if channel.id in self.slowed_channels or channel.slowmode_delay:
+            return
 
-        self.spam_control[user_id].append(now)
+        self.slowed_channels.add(channel.id)
+        config = self.get_plan(channel.guild.id).config
+        try:
+            await channel.edit(slowmode_delay=config.spam_slowmode,
+                               reason="Auto-mod: message burst")
+            await asyncio.sleep(config.mute_duration * 60)
+            if channel.slowmode_delay == config.spam_slowmode:
+                await channel.edit(slowmode_delay=0, reason="Auto-mod: message burst over")
+        except (discord.Forbidden, discord.HTTPException) as e:
+            logger.warning(f"Cannot change slowmode of {channel.id}: {e}")
+        finally:
+            self.slowed_channels.discard(channel.id)
+
+    def build_raid_detector(self, config) -> RaidDetector:
+        """Build the raid detector from an auto-moderation config."""
+        return RaidDetector(config.raid_threshold, config.raid_interval,
+                            new_account_days=config.raid_account_age_days)
 
-        if len(self.spam_control[user_id]) > self.config.spam_threshold:
-            await self.handle_violation(message, "spam")
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        """Track the join rate and quarantine joins during a raid."""
+        guild = member.guild
+        _, raided = self.get_plan(guild.id).raid_detector.record(member)
+
+        if self.punishments.get("mute", guild.id, member.id):
+            # Leaving and rejoining does not end a temporary mute
+            role = self.find_muted_role(guild)
+            if role:
+                try:
+                    await member.add_roles(role, reason="Temporary mute still active")
+                except (discord.Forbidden, discord.HTTPException) as e:
+                    logger.warning(f"Cannot restore mute of {member.id}: {e}")
+
+        if guild.id in self.raid_detection:
+            self.quarantine_queue.put_nowait(member)
+        elif raided:
+            # Mark the lockdown before yielding, joins arriving meanwhile are quarantined
+            self.raid_detection.add(guild.id)
+            asyncio.create_task(self.start_lockdown(guild, "Join raid detected", auto_end=True))
+
+    async def run_bounded(self, actions, description: str) -> List[bool]:
+        """Run coroutine factories with at most ``lockdown_concurrency`` in flight.
 
-    async def filter_content(self, message):
+        Returns whether each action succeeded.
+        """
+        semaphore = asyncio.Semaphore(self.config.lockdown_concurrency)
+
+        async def run(action):
+            async with semaphore:
+                try:
+                    await action()
+                    return True
+                except (discord.Forbidden, discord.HTTPException) as e:
+                    logger.warning(f"Action failed ({description}): {e}")
+                    return False
+
+        return await asyncio.gather(*(run(action) for action in actions))
+
+    async def quarantine_worker(self):
+        """Apply the muted role to members joining during a lockdown."""
+        while True:
+            member = await self.quarantine_queue.get()
+            try:
+                role = self.find_muted_role(member.guild)
+                if role and member.guild.id in self.raid_detection and role not in member.roles:
+                    await member.add_roles(role, reason="Raid lockdown quarantine")
+                    self.quarantined.setdefault(str(member.guild.id), []).append(member.id)
+                    await self.save_quarantine()
+            except (discord.Forbidden, discord.HTTPException) as e:
+                logger.warning(f"Cannot quarantine {member.id}: {e}")
+            except Exception as e:
+                logger.error(f"Error quarantining {member.id}: {e}")
+            finally:
+                self.quarantine_queue.task_done()
+
+    async def start_lockdown(self, guild, reason: str, auto_end: bool = False):
+        """Raise verification, slow down channels and quarantine recent joins.
+
+        With ``auto_end`` the lockdown ends once the raid is over, otherwise
+        it lasts until ``!lockdown off``.
+        """
+        self.raid_detection.add(guild.id)
+        if guild.id in self.lockdowns:
+            return
+        plan = self.get_plan(guild.id)
+        slowmode = plan.config.raid_slowmode
+        lockdown = self.lockdowns[guild.id] = {
+            "verification_level": guild.verification_level,
+            "slowmode": slowmode,
+            "slowmodes": {},
+            "task": asyncio.current_task()
+        }
+        logger.warning(f"Lockdown of {guild.id}: {reason}")
+
+        if guild.verification_level < discord.VerificationLevel.high:
+            try:
+                await guild.edit(verification_level=discord.VerificationLevel.high,
+                                 reason=f"Raid lockdown: {reason}")
+            except (discord.Forbidden, discord.HTTPException) as e:
+                logger.warning(f"Cannot raise verification level of {guild.id}: {e}")
+
+        channels = [channel for channel in guild.text_channels
+                    if channel.slowmode_delay < slowmode]
+        for channel in channels:
+            lockdown["slowmodes"][channel.id] = channel.slowmode_delay
+
+        def slow(channel):
+            return lambda: channel.edit(slowmode_delay=slowmode, reason="Raid lockdown")
+        await self.run_bounded([slow(channel) for channel in channels], "slowmode")
+
+        for member_id in plan.raid_detector.recent_members(guild.id):
+            member = guild.get_member(member_id)
+            if member:
+                self.quarantine_queue.put_nowait(member)
+
+        if guild.system_channel:
+            embed = discord.Embed(
+                title="Server Lockdown",
+                description=f"{reason}. New members are quarantined and slowmode is enabled.",
+                color=discord.Color.red()
+            )
+            self.bot.outbound.enqueue(guild.system_channel, embed=embed,
+                                      priority=Priority.MODERATION)
+
+        lockdown["task"] = asyncio.create_task(self.lockdown_timer(guild)) if auto_end else None
+
+    async def lockdown_timer(self, guild):
+        """End a lockdown once joins stayed below the raid threshold long enough."""
+        while True:
+            plan = self.get_plan(guild.id)
+            # Profiles saved before the value was checked may hold 0
+            await asyncio.sleep(max(plan.config.raid_lockdown_minutes, 1) * 60)
+            if not plan.raid_detector.still_raided(guild.id):
+                break
+        self.lockdowns[guild.id]["task"] = None
+        await self.end_lockdown(guild)
+
+    async def end_lockdown(self, guild):
+        """Restore the settings changed by a lockdown."""
+        lockdown = self.lockdowns.pop(guild.id, None)
+        self.raid_detection.discard(guild.id)
+        if lockdown is None:
+            return
+        if lockdown["task"]:
+            lockdown["task"].cancel()
+
+        try:
+            if guild.verification_level != lockdown["verification_level"]:
+                await guild.edit(verification_level=lockdown["verification_level"],
+                                 reason="Raid lockdown over")
+        except (discord.Forbidden, discord.HTTPException) as e:
+            logger.warning(f"Cannot restore verification level of {guild.id}: {e}")
+
+        def restore(channel, delay):
+            return lambda: channel.edit(slowmode_delay=delay, reason="Raid lockdown over")
+        actions = []
+        for channel_id, delay in lockdown["slowmodes"].items():
+            channel = guild.get_channel(channel_id)
+            # Leave channels a moderator changed during the lockdown alone
+            if channel and channel.slowmode_delay == lockdown["slowmode"]:
+                actions.append(restore(channel, delay))
+        await self.run_bounded(actions, "restore slowmode")
+        await self.release_quarantine(guild)
+        logger.info(f"Lockdown of {guild.id} ended")
+
+    async def release_quarantine(self, guild):
+        """Remove the muted role from the members a lockdown quarantined.
+
+        Members muted by a moderator in the meantime stay muted.
+        """
+        member_ids = self.quarantined.pop(str(guild.id), [])
+        role = self.find_muted_role(guild)
+
+        def release(member):
+            return lambda: member.remove_roles(role, reason="Raid lockdown over")
+        actions = []
+        for member_id in member_ids:
+            member = guild.get_member(member_id)
+            if (member and role and role in member.roles and
+                    not self.punishments.get("mute", guild.id, member_id)):
+                actions.append(release(member))
+        await self.run_bounded(actions, "release quarantine")
+        await self.save_quarantine()
+        if actions:
+            logger.info(f"Released {len(actions)} quarantined members of {guild.id}")
+
+    async def save_quarantine(self):
+        async with self.quarantine_lock:
+            content = json.dumps(self.quarantined)
+            await asyncio.to_thread(self._write_file, QUARANTINE_FILE, content)
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def lockdown(self, ctx, state: str = "on"):
+        """Start or end a raid lockdown of the server.
+
+        A lockdown raises the verification level, enables slowmode in all
+        text channels and gives new members the muted role. Lockdowns
+        started by raid detection end by themselves once joins calm down.
+
+        Parameters:
+        -----------
+        state: str
+            "on" to start the lockdown, "off" to end it
+
+        Examples:
+        --------
+        !lockdown
+        !lockdown off
+        """
+        if state.lower() == "off":
+            if ctx.guild.id not in self.raid_detection:
+                return await ctx.send("The server is not in lockdown.")
+            await self.end_lockdown(ctx.guild)
+            return await ctx.send("Lockdown ended.")
+
+        if ctx.guild.id in self.lockdowns:
+            return await ctx.send("The server is already in lockdown.")
+        await ctx.send("Starting lockdown...")
+        await self.start_lockdown(ctx.guild, f"Lockdown started by {ctx.author}")
+
+    async def filter_content(self, message, plan):
         """Filter message content for prohibited words."""
-        if any(word in message.content.lower() for word in self.filtered_words):
+        if self.word_filter.match(message.guild.id, message.content):
+            if self.is_dry_run(message, "filtered word"):
+                return
             await message.delete()
-            await message.channel.send(
+            self.bot.outbound.enqueue(
+                message.channel,
                 f"{message.author.mention} your message was removed for containing prohibited content.",
-                delete_after=5
+                delete_after=5,
+                priority=Priority.MODERATION
             )
 
+    def is_dry_run(self, message, violation_type: str) -> bool:
+        """Record a violation instead of acting on it in dry-run mode."""
+        if self.dry_run_log is not None:
+            self.dry_run_log.append((message, violation_type))
+            return True
+        if self.get_plan(message.guild.id).config.dry_run:
+            logger.info(f"Dry run: {violation_type} by {message.author.id} "
+                        f"in {message.guild.id}/{message.channel.id}")
+            return True
+        return False
+
     async def handle_violation(self, message, violation_type):
         """Handle auto-moderation violations."""
+        if self.is_dry_run(message, violation_type):
+            return
+
         try:
             await message.delete()
         except discord.Forbidden:
@@ -368,7 +1013,7 @@ class Moderation(commands.Cog):
 
         # Apply timeout
         try:
-            duration = timedelta(minutes=self.config.mute_duration)
+            duration = timedelta(minutes=self.get_plan(message.guild.id).config.mute_duration)
             await message.author.timeout(duration, reason=f"Auto-mod: {violation_type}")
 
             embed = discord.Embed(
@@ -377,7 +1022,8 @@ class Moderation(commands.Cog):
                     violation_type}.",
                 color=discord.Color.red()
             )
-            await message.channel.send(embed=embed)
+            self.bot.outbound.enqueue(
+                message.channel, embed=embed, priority=Priority.MODERATION)
         except discord.Forbidden:
             logger.warning(f"Cannot timeout user {message.author.id}")
 
@@ -386,8 +1032,10 @@ class Moderation(commands.Cog):
     async def addfilter(self, ctx, word: str):
         """Add a word to the content filter.
 
-        Adds a word to the auto-moderation filter. Messages containing
-        filtered words will be automatically removed.
+        Adds a word to this server's auto-moderation filter. Messages
+        containing filtered words will be automatically removed. Words
+        only match whole words, look-alike letters and leetspeak included.
+        Start or end a word with * to also match longer words.
 
         Parameters:
         -----------
@@ -397,8 +1045,9 @@ class Moderation(commands.Cog):
         Examples:
         --------
         !addfilter badword
+        !addfilter badword*
         """
-        self.filtered_words.add(word.lower())
+        self.word_filter.add(ctx.guild.id, word)
         self.save_data()
         await ctx.send(f"Added '{word}' to filter", delete_after=5)
         await ctx.message.delete()
@@ -420,12 +1069,482 @@ class Moderation(commands.Cog):
         --------
         !removefilter word
         """
-        if word.lower() in self.filtered_words:
-            self.filtered_words.remove(word.lower())
+        if self.word_filter.remove(ctx.guild.id, word):
             self.save_data()
             await ctx.send(f"Removed '{word}' from filter", delete_after=5)
+        elif self.word_filter.is_global(word):
+            await ctx.send(f"'{word}' is on the global filter, only the bot owner can remove it",
+                           delete_after=5)
         await ctx.message.delete()
 
+    @commands.command()
+    @commands.is_owner()
+    async def addglobalfilter(self, ctx, word: str):
+        """Add a word to the filter of every server (Bot owner only)."""
+        self.word_filter.add_global(word)
+        self.save_data()
+        await ctx.send(f"Added '{word}' to the global filter", delete_after=5)
+        await ctx.message.delete()
+
+    @commands.command()
+    @commands.is_owner()
+    async def removeglobalfilter(self, ctx, word: str):
+        """Remove a word from the filter of every server (Bot owner only)."""
+        if self.word_filter.remove_global(word):
+            self.save_data()
+            await ctx.send(f"Removed '{word}' from the global filter", delete_after=5)
+        await ctx.message.delete()
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def allowdomain(self, ctx, domain: str):
+        """Allow links to a domain and its subdomains.
+
+        Allowed links do not count towards the link limit and override
+        a blocked parent domain.
+
+        Examples:
+        --------
+        !allowdomain youtube.com
+        """
+        self.link_policies.set(ctx.guild.id, domain, ALLOW)
+        self.save_data()
+        await ctx.send(f"Links to {domain} are now allowed")
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def denydomain(self, ctx, domain: str):
+        """Block links to a domain and its subdomains.
+
+        Examples:
+        --------
+        !denydomain example.com
+        """
+        self.link_policies.set(ctx.guild.id, domain, DENY)
+        self.save_data()
+        await ctx.send(f"Links to {domain} are now blocked")
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def removedomain(self, ctx, domain: str):
+        """Remove a domain from the allow and block lists.
+
+        Examples:
+        --------
+        !removedomain example.com
+        """
+        if self.link_policies.remove(ctx.guild.id, domain):
+            self.save_data()
+            await ctx.send(f"Removed the link policy of {domain}")
+        else:
+            await ctx.send(f"{domain} has no link policy")
+
+    @commands.command()
+    @commands.has_permissions(manage_messages=True)
+    async def linkpolicy(self, ctx):
+        """Show the allowed and blocked domains of this server."""
+        domains = self.link_policies.domains(ctx.guild.id)
+        embed = discord.Embed(
+            title="Link Policy",
+            color=discord.Color.blue()
+        )
+        for name, policy in (("Allowed", ALLOW), ("Blocked", DENY)):
+            listed = sorted(domain for domain, p in domains.items() if p == policy)
+            embed.add_field(name=name, value="\n".join(listed)[:1024] or "None", inline=False)
+        embed.add_field(name="Invites",
+                        value="Blocked" if self.get_plan(ctx.guild.id).config.block_invites else "Allowed", inline=False)
+        await ctx.send(embed=embed)
+
+    def can_act_on(self, ctx, member) -> bool:
+        """Check that a bulk action may target a member."""
+        if not isinstance(member, discord.Member):
+            return True
+        return not (member == ctx.author or member == ctx.guild.me or
+                    member.guild_permissions.manage_messages or
+                    member.top_role >= ctx.author.top_role)
+
+    def resolve_targets(self, ctx, targets: str) -> List[int]:
+        """Return the member IDs in ``targets``, or the members who joined recently.
+
+        ``targets`` is either a list of mentions and IDs, or "joined
+        <minutes>" for everyone who joined within the last minutes.
+        Raises ValueError when the minutes are not a number.
+        """
+        words = targets.split()
+        if words and words[0].lower() == "joined":
+            minutes = int(words[1]) if len(words) > 1 else 10
+            since = discord.utils.utcnow() - timedelta(minutes=minutes)
+            members = [member for member in ctx.guild.members
+                       if member.joined_at and member.joined_at >= since]
+        else:
+            ids = dict.fromkeys(int(id_) for id_ in re.findall(r"\d{15,20}", targets))
+            members = [ctx.guild.get_member(id_) or discord.Object(id=id_) for id_ in ids]
+        return [member.id for member in members if self.can_act_on(ctx, member)]
+
+    async def start_job(self, ctx, kind: str, targets: List[int], **options):
+        """Submit a bulk job and post the message its progress is shown in."""
+        if not targets:
+            return await ctx.send("No targets found.")
+        if len(targets) > MAX_BULK_TARGETS:
+            return await ctx.send(f"Too many targets, the limit is {MAX_BULK_TARGETS}.")
+        message = await ctx.send(f"Starting {kind} of {len(targets)} targets...")
+        job = self.bulk.submit(kind, ctx.guild.id, ctx.channel.id, targets, options, message.id)
+        await message.edit(content=job.describe())
+
+    async def report_job(self, job):
+        """Update the progress message of a bulk job."""
+        channel = self.bot.get_channel(job.channel_id)
+        if channel is None:
+            return
+        text = job.describe()
+        if "deleted" in job.options:
+            text += f", {job.options['deleted']} messages deleted"
+        if job.message_id:
+            await channel.get_partial_message(job.message_id).edit(content=text)
+        else:
+            job.message_id = (await channel.send(text)).id
+
+    async def bulk_purge(self, job, channel_ids: List[int]) -> int:
+        """Purge the messages matching a job's filters from channels."""
+        await self.bot.wait_until_ready()
+        guild = self.bot.get_guild(job.guild_id)
+        options = job.options
+        user_id = options.get("user_id")
+        pattern = re.compile(options["pattern"], re.IGNORECASE) if options.get("pattern") else None
+        after = datetime.fromisoformat(options["after"]) if options.get("after") else None
+        before = datetime.fromisoformat(options["before"]) if options.get("before") else None
+
+        def check(message):
+            if user_id and message.author.id != user_id:
+                return False
+            return not pattern or pattern.search(message.content) is not None
+
+        succeeded = 0
+        for channel_id in channel_ids:
+            channel = guild.get_channel(channel_id) if guild else None
+            if channel is None:
+                continue
+            try:
+                deleted = await channel.purge(limit=PURGE_SCAN_LIMIT, check=check, after=after,
+                                              before=before, reason=f"Bulk job {job.id}")
+            except (discord.Forbidden, discord.HTTPException) as e:
+                logger.warning(f"Cannot purge {channel_id}: {e}")
+                continue
+            options["deleted"] = options.get("deleted", 0) + len(deleted)
+            succeeded += 1
+        return succeeded
+
+    async def bulk_ban(self, job, user_ids: List[int]) -> int:
+        """Ban up to 200 users with one request."""
+        await self.bot.wait_until_ready()
+        guild = self.bot.get_guild(job.guild_id)
+        if guild is None:
+            return 0
+        result = await guild.bulk_ban(
+            [discord.Object(id=user_id) for user_id in user_ids],
+            reason=job.options.get("reason"),
+            delete_message_seconds=job.options.get("delete_seconds", 0)
+        )
+        return len(result.banned)
+
+    async def bulk_timeout(self, job, member_ids: List[int]) -> int:
+        """Time out members of a job."""
+        await self.bot.wait_until_ready()
+        guild = self.bot.get_guild(job.guild_id)
+        duration = timedelta(minutes=job.options["minutes"])
+        succeeded = 0
+        for member_id in member_ids:
+            member = guild.get_member(member_id) if guild else None
+            if member is None:
+                continue
+            try:
+                await member.timeout(duration, reason=job.options.get("reason"))
+                succeeded += 1
+            except (discord.Forbidden, discord.HTTPException) as e:
+                logger.warning(f"Cannot timeout {member_id}: {e}")
+        return succeeded
+
+    @commands.group(invoke_without_command=True)
+    @commands.has_permissions(manage_messages=True)
+    async def purge(self, ctx, minutes: int, until: int = 0):
+        """Delete the messages of a time range in this channel.
+
+        Parameters:
+        -----------
+        minutes: int
+            How many minutes back the range starts
+        until: int
+            How many minutes back the range ends (optional)
+
+        Examples:
+        --------
+        !purge 10
+        !purge 60 30
+        !purge user @user 120
+        !purge match 30 discord\\.gg/\\w+
+        """
+        now = discord.utils.utcnow()
+        await self.start_job(ctx, "purge", [ctx.channel.id],
+                             after=(now - timedelta(minutes=minutes)).isoformat(),
+                             before=(now - timedelta(minutes=until)).isoformat())
+
+    @purge.command(name="user")
+    @commands.has_permissions(manage_messages=True)
+    async def purge_user(self, ctx, member: discord.User, minutes: int = 60):
+        """Delete a user's recent messages in every channel."""
+        after = discord.utils.utcnow() - timedelta(minutes=minutes)
+        channels = [channel.id for channel in ctx.guild.text_channels
+                    if channel.last_message_id and
+                    discord.utils.snowflake_time(channel.last_message_id) >= after]
+        await self.start_job(ctx, "purge", channels, user_id=member.id,
+                             after=after.isoformat())
+
+    @purge.command(name="match")
+    @commands.has_permissions(manage_messages=True)
+    async def purge_match(self, ctx, minutes: int, *, pattern: str):
+        """Delete recent messages matching a regular expression in this channel."""
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            return await ctx.send(f"Invalid pattern: {e}")
+        after = discord.utils.utcnow() - timedelta(minutes=minutes)
+        await self.start_job(ctx, "purge", [ctx.channel.id], pattern=pattern,
+                             after=after.isoformat())
+
+    @commands.command()
+    @commands.has_permissions(ban_members=True)
+    async def massban(self, ctx, *, targets: str):
+        """Ban many users at once.
+
+        Moderators and members with a role at or above yours are skipped.
+
+        Parameters:
+        -----------
+        targets: str
+            Mentions or IDs, or "joined <minutes>" for recent joins
+
+        Examples:
+        --------
+        !massban @user1 @user2 123456789012345678
+        !massban joined 10
+        """
+        try:
+            members = self.resolve_targets(ctx, targets)
+        except (ValueError, OverflowError):
+            return await ctx.send("Usage: !massban <mentions or IDs> or !massban joined <minutes>")
+        await self.start_job(ctx, "ban", members,
+                             reason=f"Mass ban by {ctx.author}", delete_seconds=3600)
+
+    @commands.command()
+    @commands.has_permissions(moderate_members=True)
+    async def masstimeout(self, ctx, minutes: int, *, targets: str):
+        """Time out many members at once.
+
+        Parameters:
+        -----------
+        minutes: int
+            Duration of the timeout, at most 40320 (28 days)
+        targets: str
+            Mentions or IDs, or "joined <minutes>" for recent joins
+
+        Examples:
+        --------
+        !masstimeout 60 @user1 @user2
+        !masstimeout 30 joined 5
+        """
+        if not 1 <= minutes <= MAX_TIMEOUT_MINUTES:
+            return await ctx.send(f"Minutes must be between 1 and {MAX_TIMEOUT_MINUTES}.")
+        try:
+            members = self.resolve_targets(ctx, targets)
+        except (ValueError, OverflowError):
+            return await ctx.send("Usage: !masstimeout <minutes> <mentions or IDs> "
+                                  "or !masstimeout <minutes> joined <minutes>")
+        await self.start_job(ctx, "timeout", members,
+                             minutes=minutes, reason=f"Mass timeout by {ctx.author}")
+
+    @commands.command()
+    @commands.has_permissions(manage_messages=True)
+    async def jobs(self, ctx):
+        """Show the running bulk moderation jobs."""
+        jobs = self.bulk.guild_jobs(ctx.guild.id)
+        if not jobs:
+            return await ctx.send("No bulk jobs running.")
+        await ctx.send("\n".join(job.describe() for job in jobs))
+
+    @commands.command()
+    @commands.has_permissions(manage_messages=True)
+    async def canceljob(self, ctx, job_id: str):
+        """Cancel a bulk moderation job."""
+        job = self.bulk.jobs.get(job_id)
+        if job is None or job.guild_id != ctx.guild.id:
+            return await ctx.send("No running job with that ID.")
+        await self.bulk.cancel(job_id)
+        await ctx.send(f"Cancelled {job.describe()}")
+
+    async def punish(self, ctx, kind: str, member, duration: str, reason: str):
+        """Parse a duration and schedule the end of a punishment."""
+        try:
+            delta = parse_duration(duration)
+        except ValueError:
+            await ctx.send("Invalid duration, use for example 30m, 12h or 7d.")
+            return None
+        punishment = Punishment(kind, ctx.guild.id, member.id,
+                                time.time() + delta.total_seconds(), reason, ctx.author.id)
+        await self.punishments.schedule(punishment)
+        return punishment
+
+    async def lift_punishments(self, punishments: List[Punishment]) -> List[Punishment]:
+        """Unban and unmute the members whose punishments expired.
+
+        Returns the punishments that could not be lifted yet, the
+        scheduler retries them later.
+        """
+        await self.bot.wait_until_ready()
+
+        def unban(guild, user_id):
+            async def action():
+                try:
+                    await guild.unban(discord.Object(id=user_id), reason="Temporary ban expired")
+                except discord.NotFound:
+                    pass  # Already unbanned
+            return action
+
+        def unmute(member, role):
+            return lambda: member.remove_roles(role, reason="Temporary mute expired")
+
+        failed = []
+        lifts = []
+        for punishment in punishments:
+            guild = self.bot.get_guild(punishment.guild_id)
+            if guild is None:
+                # The bot left the guild, there is nothing to lift
+                continue
+            if guild.unavailable:
+                failed.append(punishment)
+            elif punishment.kind == "ban":
+                lifts.append((punishment, unban(guild, punishment.user_id)))
+            else:
+                member = guild.get_member(punishment.user_id)
+                role = self.find_muted_role(guild)
+                # Members who left get no role back when they rejoin, the mute is over
+                if member and role and role in member.roles:
+                    lifts.append((punishment, unmute(member, role)))
+
+        results = await self.run_bounded([action for _, action in lifts], "lift punishment")
+        failed += [punishment for (punishment, _), lifted in zip(lifts, results) if not lifted]
+        if any(results):
+            logger.info(f"Lifted {sum(results)} expired punishments")
+        return failed
+
+    @commands.command()
+    @commands.has_permissions(ban_members=True)
+    async def tempban(self, ctx, member: discord.Member, duration: str, *, reason: str = "No reason given"):
+        """Ban a member for a limited time.
+
+        The ban is lifted automatically, also after a restart.
+
+        Parameters:
+        -----------
+        member: discord.Member
+            The member to ban
+        duration: str
+            How long the ban lasts, like 30m, 12h or 1d12h
+        reason: str
+            The reason for the ban
+
+        Examples:
+        --------
+        !tempban @user 7d Repeated harassment
+        !tempban @user 12h
+        """
+        if not self.can_act_on(ctx, member):
+            return await ctx.send("You cannot ban this member.")
+        punishment = await self.punish(ctx, "ban", member, duration, reason)
+        if punishment is None:
+            return
+        try:
+            await member.ban(reason=f"Temporary ban by {ctx.author}: {reason}")
+        except (discord.Forbidden, discord.HTTPException):
+            await self.punishments.cancel("ban", ctx.guild.id, member.id)
+            return await ctx.send("I cannot ban this member.")
+
+        embed = discord.Embed(title="Member Temporarily Banned", color=discord.Color.red())
+        embed.add_field(name="Member", value=member.mention)
+        embed.add_field(name="Reason", value=reason)
+        embed.add_field(name="Until", value=f"<t:{int(punishment.expires)}:F>")
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    @commands.has_permissions(manage_roles=True)
+    async def tempmute(self, ctx, member: discord.Member, duration: str, *, reason: str = "No reason given"):
+        """Mute a member for a limited time.
+
+        Uses the muted role instead of a Discord timeout, so the mute is
+        not limited to 28 days and is restored if the member rejoins.
+
+        Parameters:
+        -----------
+        member: discord.Member
+            The member to mute
+        duration: str
+            How long the mute lasts, like 30m, 12h or 1d12h
+        reason: str
+            The reason for the mute
+
+        Examples:
+        --------
+        !tempmute @user 2h Spamming in chat
+        !tempmute @user 30d
+        """
+        if not self.can_act_on(ctx, member):
+            return await ctx.send("You cannot mute this member.")
+        role = self.find_muted_role(ctx.guild)
+        if role is None:
+            return await ctx.send("The muted role is not set up yet.")
+        punishment = await self.punish(ctx, "mute", member, duration, reason)
+        if punishment is None:
+            return
+        try:
+            await member.add_roles(role, reason=f"Temporary mute by {ctx.author}: {reason}")
+        except (discord.Forbidden, discord.HTTPException):
+            await self.punishments.cancel("mute", ctx.guild.id, member.id)
+            return await ctx.send("I cannot mute this member.")
+
+        embed = discord.Embed(title="Member Temporarily Muted", color=discord.Color.orange())
+        embed.add_field(name="Member", value=member.mention)
+        embed.add_field(name="Reason", value=reason)
+        embed.add_field(name="Until", value=f"<t:{int(punishment.expires)}:F>")
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    @commands.has_permissions(manage_roles=True)
+    async def unmute(self, ctx, member: discord.Member):
+        """Lift a member's mute before it expires."""
+        await self.punishments.cancel("mute", ctx.guild.id, member.id)
+        role = self.find_muted_role(ctx.guild)
+        if role is None or role not in member.roles:
+            return await ctx.send(f"{member.mention} is not muted.")
+        await member.remove_roles(role, reason=f"Unmuted by {ctx.author}")
+        await ctx.send(f"{member.mention} has been unmuted.")
+
+    @commands.command(name="punishments")
+    @commands.has_permissions(manage_messages=True)
+    async def list_punishments(self, ctx):
+        """Show the temporary bans and mutes of the server."""
+        punishments = self.punishments.guild_punishments(ctx.guild.id)
+        if not punishments:
+            return await ctx.send("No temporary punishments.")
+        lines = [f"{punishment.kind} <@{punishment.user_id}> until <t:{int(punishment.expires)}:R>"
+                 for punishment in punishments[:25]]
+        if len(punishments) > 25:
+            lines.append(f"... and {len(punishments) - 25} more")
+        await ctx.send("\n".join(lines))
+
+    @commands.Cog.listener()
+    async def on_member_unban(self, guild, user):
+        """Forget the temporary ban of users unbanned by hand."""
+        await self.punishments.cancel("ban", guild.id, user.id)
+
     @commands.command()
     @commands.has_permissions(manage_messages=True)
     async def note(self, ctx, member: discord.Member, *, content: str):
@@ -1,9 +1,9 @@
 from spotipy.oauth2 import SpotifyClientCredentials
 import spotipy
 import random
-from aiohttp import ClientSession
+from aiohttp import ClientSession, ClientTimeout
+from concurrent.futures import ThreadPoolExecutor
 import re
-import urllib.request
 import urllib.parse
 from dotenv import load_dotenv
 import os
@@ -11,6 +11,7 @@ import yt_dlp
 import asyncio
 from discord.ext import commands
 import discord
+from utils.media_cache import MediaCache
 type = "nodejs"
 project = "Discord Music Bot"
 file = "music_cog.py"
@@ -22,6 +23,14 @@ youtube_base_url = 'https://www.youtube.com/'
 youtube_results_url = youtube_base_url + 'results?'
 youtube_watch_url = youtube_base_url + 'watch?v='
 
+# yt-dlp blocks, so extractions run on their own bounded thread pool
+EXTRACT_WORKERS = 5
+EXTRACT_TIMEOUT = 15
+# An extraction makes a few requests, each one has to give up well within EXTRACT_TIMEOUT
+EXTRACT_SOCKET_TIMEOUT = 5
+SEARCH_TIMEOUT = 10
+SEARCH_RESULTS = 5
+
 yt_dl_options = {
     "format": "bestaudio/best",
     "restrictfilenames": True,
@@ -38,6 +47,10 @@ yt_dl_options = {
     "extract_flat": True,
     "skip_download": True,
     "no_check_certificate": True,
+    # Without these a hung connection keeps its extraction thread forever
+    "socket_timeout": EXTRACT_SOCKET_TIMEOUT,
+    "retries": 1,
+    "extractor_retries": 1,
 }
 
 ffmpeg_options = {
@@ -47,6 +60,10 @@ ffmpeg_options = {
 
 ytdl = yt_dlp.YoutubeDL(yt_dl_options)
 
+extract_executor = ThreadPoolExecutor(
+    max_workers=EXTRACT_WORKERS, thread_name_prefix="ytdl")
+MEDIA_CACHE_FILE = 'data/media_cache.db'
+
 
 class Music(commands.Cog):
     def __init__(self, bot):
@@ -57,6 +74,9 @@ class Music(commands.Cog):
         self.loop = {}
         self.playlists = {}
         self.loading_playlists = set()
+        self.session = None
+        os.makedirs('data', exist_ok=True)
+        self.media_cache = MediaCache(MEDIA_CACHE_FILE)
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15',
@@ -67,6 +87,18 @@ class Music(commands.Cog):
             client_secret=os.getenv('SPOTIFY_CLIENT_SECRET')
         ))
 
+    async def cog_load(self):
+        self.session = ClientSession(timeout=ClientTimeout(total=SEARCH_TIMEOUT))
+        await asyncio.to_thread(self.media_cache.prune)
+
+    async def cog_unload(self):
+        if self.session:
+            await self.session.close()
+        self.media_cache.close()
+
+    def get_metrics(self):
+        return {"media_cache": self.media_cache.get_metrics()}
+
     async def get_random_image(self):
         safe_categories = ['smile', 'wave', 'thumbsup', 'dance']
         category = random.choice(safe_categories)
@@ -105,12 +137,11 @@ class Music(commands.Cog):
 
     async def play_song(self, ctx, song):
         try:
-            loop = asyncio.get_event_loop()
-            data = await loop.run_in_executor(None, lambda: ytdl.extract_info(song['url'], download=False))
-            if data is None:
+            media = await self.media_cache.resolve(song['url'], self.extract_info, stream=True)
+            if media is None:
                 await self.send_embed(ctx, "Error", f"Could not retrieve data for the song: {song['title']}", discord.Color.red())
                 return
-            song_url = data.get('url')
+            song_url = media.stream_url
             if song_url is None:
                 await self.send_embed(ctx, "Error", f"Could not get playable URL for the song: {song['title']}", discord.Color.red())
                 return
@@ -130,42 +161,99 @@ class Music(commands.Cog):
         except Exception as e:
             await self.handle_youtube_error(ctx, e)
 
+    async def extract_info(self, url):
+        """Run a yt-dlp extraction on the extraction pool, giving up after EXTRACT_TIMEOUT."""
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(
+            loop.run_in_executor(extract_executor, lambda: ytdl.extract_info(url, download=False)),
+            EXTRACT_TIMEOUT)
+
     async def get_youtube_results(self, query):
         search_query = urllib.parse.urlencode({'search_query': query})
-        content = urllib.request.urlopen(youtube_results_url + search_query)
-        search_results = re.findall(
-            r'/watch\?v=(.{11})', content.read().decode())
-        return search_results[:5]
+        headers = {'User-Agent': random.choice(self.user_agents)}
+        async with self.session.get(youtube_results_url + search_query, headers=headers) as resp:
+            content = await resp.text()
+        # Every result is linked several times on the page
+        search_results = dict.fromkeys(re.findall(r'/watch\?v=(.{11})', content))
+        return list(search_results)[:SEARCH_RESULTS]
 
     async def get_video_info(self, video_id):
         url = youtube_watch_url + video_id
-        loop = asyncio.get_event_loop()
-        data = await loop.run_in_executor(None, lambda: ytdl.extract_info(url, download=False))
+        media = await self.media_cache.resolve(url, self.extract_info)
+        if media is None:
+            raise ValueError(f"No data for video {video_id}")
         return {
             'url': url,
-            'title': data['title'],
-            'duration': data['duration'],
-            'uploader': data['uploader']
+            'title': media.title,
+            'duration': media.duration,
+            'uploader': media.uploader
         }
 
-    async def process_song_selection(self, ctx, videos):
+    async def resolve_videos(self, video_ids, on_result=None):
+        """Look up the info of videos concurrently, in search order.
+
+        ``on_result`` is awaited with the index and info of each video as
+        soon as it arrives. Videos that fail or time out are left out.
+        """
+        videos = [None] * len(video_ids)
+
+        async def resolve(index, video_id):
+            try:
+                videos[index] = await self.get_video_info(video_id)
+            except Exception as e:
+                print(f"Error getting info of {video_id}: {e!r}")
+                return
+            if on_result:
+                await on_result(index, videos[index])
+
+        await asyncio.gather(*(resolve(i, video_id) for i, video_id in enumerate(video_ids)))
+        return [video for video in videos if video]
+
+    @staticmethod
+    def describe_video(video):
+        return f"{video['title']} - {video['uploader']} ({video['duration']} seconds)"
+
+    async def search_videos(self, ctx, video_ids):
+        """Resolve search results, showing each one as soon as it is known."""
+        lines = ["Loading..."] * len(video_ids)
+        embed = await self.create_embed("Search Results", "\n".join(lines))
+        message = await ctx.send(embed=embed)
+        edit_lock = asyncio.Lock()
+
+        async def show(index, video):
+            lines[index] = self.describe_video(video)
+            async with edit_lock:
+                embed.description = "\n".join(lines)
+                try:
+                    await message.edit(embed=embed)
+                except discord.HTTPException:
+                    pass
+
+        videos = await self.resolve_videos(video_ids, show)
+        return message, embed, videos
+
+    async def process_song_selection(self, ctx, videos, message=None, embed=None):
         description = "\n".join([
-            f"{i}. {video['title']} - {video['uploader']
-                                       } ({video['duration']} seconds)"
+            f"{i}. {self.describe_video(video)}"
             for i, video in enumerate(videos, 1)
         ])
         description += "\n0. Go back"
-        embed = await self.create_embed("Search Results", description)
-        embed.set_footer(
-            text="Please choose a video by entering a number from 0 to 5.")
-        await ctx.send(embed=embed)
+        footer = f"Please choose a video by entering a number from 0 to {len(videos)}."
+        if message is None:
+            embed = await self.create_embed("Search Results", description)
+            embed.set_footer(text=footer)
+            await ctx.send(embed=embed)
+        else:
+            embed.description = description
+            embed.set_footer(text=footer)
+            await message.edit(embed=embed)
 
         def check(m):
             return (
                 m.author == ctx.author and
                 m.channel == ctx.channel and
                 m.content.isdigit() and
-                0 <= int(m.content) <= 5
+                0 <= int(m.content) <= len(videos)
             )
 
         try:
@@ -284,12 +372,12 @@ class Music(commands.Cog):
             await self.send_embed(ctx, "No Results", "No results found.", discord.Color.red())
             return
 
-        videos = []
-        for video_id in search_results:
-            video_info = await self.get_video_info(video_id)
-            videos.append(video_info)
+        message, embed, videos = await self.search_videos(ctx, search_results)
+        if not videos:
+            await self.send_embed(ctx, "Error", "Could not load any of the results.", discord.Color.red())
+            return
 
-        chosen_video = await self.process_song_selection(ctx, videos)
+        chosen_video = await self.process_song_selection(ctx, videos, message, embed)
         if chosen_video is None:
             return
 
@@ -3,6 +3,9 @@ from discord.ext import commands
 import aiohttp
 import asyncio
 from datetime import datetime
+from typing import Dict, List
+from utils.join_burst import BurstDetector
+from utils.outbound import Priority
 
 WELCOME_CHANNEL_ID =  # ID channels here
 LEFT_CHANNEL_ID =  # ID channels here
@@ -10,6 +13,16 @@ BANNED_CHANNEL_ID =  # ID channels here
 UNBANNED_CHANNEL_ID =  # ID channels here
 WARNINGS_CHANNEL_ID =  # ID channels here
 
+# A guild with this many joins within the window gets aggregated welcomes
+JOIN_BURST_THRESHOLD = 5
+JOIN_BURST_WINDOW = 10
+# Per-member welcomes resume after this many seconds below the threshold
+JOIN_BURST_COOLDOWN = 30
+# Aggregated welcomes are sent this often (seconds)
+WELCOME_FLUSH_INTERVAL = 10
+# Mentions per aggregated welcome embed, well within the description limit
+MENTIONS_PER_EMBED = 100
+
 
 class Welcome(commands.Cog):
     def __init__(self, bot):
@@ -17,8 +30,13 @@ class Welcome(commands.Cog):
         self.session = aiohttp.ClientSession()
         self.image_cache = {}
         self.cache_expiry = {}
+        self.join_bursts = BurstDetector(
+            JOIN_BURST_WINDOW, JOIN_BURST_THRESHOLD, JOIN_BURST_COOLDOWN)
+        self.pending_welcomes: Dict[int, List[discord.Member]] = {}
+        self.flush_task = asyncio.create_task(self.flush_welcomes())
 
     def cog_unload(self):
+        self.flush_task.cancel()
         asyncio.create_task(self.session.close())
 
     async def fetch_random_anime_image(self):
@@ -51,18 +69,19 @@ class Welcome(commands.Cog):
     async def send_embed(self, channel_id, embed):
         channel = self.bot.get_channel(channel_id)
         if channel is not None:
-            try:
-                await channel.send(embed=embed)
-            except discord.Forbidden:
-                print(
-                    f"Failed to send message - insufficient permissions in channel {channel.name}")
-            except discord.HTTPException as e:
-                print(f"Failed to send message - HTTPException: {e}")
+            self.bot.outbound.enqueue(
+                channel, embed=embed, priority=Priority.DECORATIVE)
         else:
             print(f"Channel with ID '{channel_id}' not found")
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
+        if self.join_bursts.record(member.guild.id):
+            self.pending_welcomes.setdefault(member.guild.id, []).append(member)
+            return
+        await self.welcome_member(member)
+
+    async def welcome_member(self, member):
         image_url = await self.fetch_random_anime_image()
         embed = await self.create_embed(
             title=f"Welcome to the server, {member.display_name}!",
@@ -80,6 +99,32 @@ class Welcome(commands.Cog):
             name="Server Rules", value="Please read our server rules in the #rules channel.", inline=False)
         await self.send_embed(WELCOME_CHANNEL_ID, embed)
 
+    async def flush_welcomes(self):
+        """Send the aggregated welcomes of guilds in a join burst"""
+        while True:
+            await asyncio.sleep(WELCOME_FLUSH_INTERVAL)
+            self.join_bursts.prune()
+            pending, self.pending_welcomes = self.pending_welcomes, {}
+            for members in pending.values():
+                try:
+                    await self.welcome_members(members)
+                except Exception as e:
+                    print(f"Failed to send aggregated welcome: {e}")
+
+    async def welcome_members(self, members):
+        image_url = await self.fetch_random_anime_image()
+        for start in range(0, len(members), MENTIONS_PER_EMBED):
+            chunk = members[start:start + MENTIONS_PER_EMBED]
+            embed = await self.create_embed(
+                title=f"Welcome to these {len(chunk)} new members!",
+                description=" ".join(member.mention for member in chunk),
+                color=discord.Color.green(),
+                image_url=image_url if start == 0 else None
+            )
+            embed.add_field(name="Getting Started",
+                            value="Type `!help` to see all commands and please read our server rules in the #rules channel.", inline=False)
+            await self.send_embed(WELCOME_CHANNEL_ID, embed)
+
     @commands.Cog.listener()
     async def on_member_remove(self, member):
         image_url = await self.fetch_random_anime_image()
@@ -144,7 +189,7 @@ class Welcome(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def welcome_test(self, ctx):
         """Test the welcome message"""
-        await self.on_member_join(ctx.author)
+        await self.welcome_member(ctx.author)
 
     @commands.command()
     @commands.has_permissions(administrator=True)
@@ -10,6 +10,7 @@ from cogs.user import User
 from cogs.moderation import Moderation
 from utils.error_handler import ErrorHandler
 from utils.config_manager import ConfigManager
+from utils.outbound import OutboundDispatcher
 from cogs.music import Music
 from cogs.IA_S import IA_S
 from cogs.levels import Levels
@@ -69,6 +70,9 @@ ROLE_PERMISSIONS = {
 # Default cogs available to everyone
 DEFAULT_COGS = [Games, Music, Tickets, Reminders, Help]
 
+# The metrics read by the webserver thread are republished this often (seconds)
+METRICS_PUBLISH_INTERVAL = 10
+
 
 class RoleBasedBot(commands.Bot):
     def __init__(self, *args, **kwargs):
@@ -76,7 +80,36 @@ class RoleBasedBot(commands.Bot):
         self.role_permissions = ROLE_PERMISSIONS
         self.cog_permissions: Dict[str, Set[str]] = {}
         self.config_manager = ConfigManager('config.json')
+        self.outbound = OutboundDispatcher()
         self.start_time = None
+        self.metrics_snapshot: Dict = {}
+        self.publish_task = None
+
+    async def setup_hook(self):
+        self.outbound.start()
+        self.publish_task = asyncio.create_task(self.publish_metrics())
+
+    async def close(self):
+        if self.publish_task:
+            self.publish_task.cancel()
+        self.outbound.stop()
+        await super().close()
+
+    async def publish_metrics(self):
+        """Periodically collect the metrics of the cogs into a snapshot the webserver can read."""
+        while True:
+            try:
+                data = {
+                    name: cog.get_metrics()
+                    for name, cog in self.cogs.items()
+                    if hasattr(cog, 'get_metrics')
+                }
+                data["outbound"] = self.outbound.get_metrics()
+                # Replaced, never mutated, so the webserver always sees a complete snapshot
+                self.metrics_snapshot = data
+            except Exception as e:
+                logger.error(f"Error in publish_metrics: {e}")
+            await asyncio.sleep(METRICS_PUBLISH_INTERVAL)
 
     async def get_user_level(self, user_id: int) -> int:
         """Get user level from Levels."""
@@ -84,8 +117,7 @@ class RoleBasedBot(commands.Bot):
             return 0
 
         levels_cog = self.get_cog("Levels")
-        user_data = levels_cog.levels.get(str(user_id), {})
-        return user_data.get("level", 0)
+        return levels_cog.get_level(user_id)
 
     def get_highest_role(self, member: discord.Member) -> str:
         """Get the highest permission role for a member."""
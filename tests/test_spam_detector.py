@@ -0,0 +1,22 @@
+from utils.spam_detector import SpamDetector, SpamRule
+
+
+def test_limit_messages_from_time_zero_are_not_a_burst():
+    detector = SpamDetector([SpamRule("user", 5, 5)])
+    for second in range(5):
+        assert detector.check(1, 2, 3, now=float(second)) == []
+
+
+def test_one_message_over_the_limit_is_a_burst():
+    detector = SpamDetector([SpamRule("user", 5, 5)])
+    for second in range(5):
+        detector.check(1, 2, 3, now=second * 0.5)
+    assert detector.check(1, 2, 3, now=2.5)
+
+
+def test_burst_counts_from_zero_after_being_reported():
+    detector = SpamDetector([SpamRule("user", 5, 5)])
+    for second in range(6):
+        detector.check(1, 2, 3, now=second * 0.1)
+    for second in range(6, 11):
+        assert detector.check(1, 2, 3, now=second * 0.1) == []
@@ -0,0 +1,141 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    guild_id INTEGER,
+    channel_id INTEGER,
+    user_id INTEGER,
+    event_type TEXT NOT NULL,
+    content TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_time ON events (created_at);
+CREATE INDEX IF NOT EXISTS idx_events_guild ON events (guild_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_events_user ON events (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_events_channel ON events (channel_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_events_type ON events (event_type, created_at);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+    content, content='events', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS events_ai AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS events_ad AFTER DELETE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+# (created_at, guild_id, channel_id, user_id, event_type, content, details)
+AuditEvent = Tuple[float, Optional[int], Optional[int], Optional[int], str, Optional[str], Optional[Dict]]
+
+
+class AuditStore:
+    """Append-only SQLite store of logged events.
+
+    Events are indexed by guild, user, channel, event type and time, and
+    their content by an FTS5 index when SQLite was built with it (a LIKE
+    scan is used otherwise). The methods block, so the bot calls them
+    through ``asyncio.to_thread``; a lock serializes access between the
+    bot and the webserver threads.
+    """
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        try:
+            self.db.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            logger.warning("SQLite has no FTS5, audit log search falls back to LIKE")
+            self.fts = False
+        self.db.commit()
+
+    def write(self, events: Sequence[AuditEvent]):
+        rows = [(created_at, guild_id, channel_id, user_id, event_type, content,
+                 json.dumps(details) if details else None)
+                for created_at, guild_id, channel_id, user_id, event_type, content, details in events]
+        with self.lock:
+            self.db.executemany(
+                "INSERT INTO events (created_at, guild_id, channel_id, user_id, event_type, content, details)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.commit()
+
+    def search(self, guild_id: Optional[int] = None, user_id: Optional[int] = None,
+               channel_id: Optional[int] = None, event_type: Optional[str] = None,
+               since: Optional[float] = None, until: Optional[float] = None,
+               text: Optional[str] = None, page: int = 1, per_page: int = 10) -> Dict:
+        """Return one page of matching events, newest first."""
+        clauses = []
+        params: List = []
+        for column, value in (("guild_id", guild_id), ("user_id", user_id),
+                              ("channel_id", channel_id), ("event_type", event_type)):
+            if value is not None:
+                clauses.append(f"events.{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("events.created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("events.created_at < ?")
+            params.append(until)
+
+        source = "events"
+        if text:
+            if self.fts:
+                source = "events JOIN events_fts ON events_fts.rowid = events.id"
+                clauses.append("events_fts MATCH ?")
+                # Quote the terms so user input cannot use FTS query syntax
+                params.append(" ".join('"' + term.replace('"', '""') + '"' for term in text.split()))
+            else:
+                clauses.append("events.content LIKE ?")
+                params.append(f"%{text}%")
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        page = max(page, 1)
+        per_page = max(per_page, 1)
+        params += [per_page + 1, (page - 1) * per_page]
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT events.* FROM {source} {where}"
+                " ORDER BY events.created_at DESC LIMIT ? OFFSET ?", params).fetchall()
+
+        results = []
+        for row in rows[:per_page]:
+            event = dict(row)
+            event["details"] = json.loads(event["details"]) if event["details"] else None
+            results.append(event)
+        return {"page": page, "per_page": per_page,
+                "has_more": len(rows) > per_page, "results": results}
+
+    def prune(self, retention_days: float, batch_size: int = 10000) -> int:
+        """Delete events older than the retention period, in small batches."""
+        cutoff = time.time() - retention_days * 86400
+        deleted = 0
+        while True:
+            with self.lock:
+                cursor = self.db.execute(
+                    "DELETE FROM events WHERE id IN"
+                    " (SELECT id FROM events WHERE created_at < ? LIMIT ?)", (cutoff, batch_size))
+                self.db.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return deleted
+
+    def close(self):
+        with self.lock:
+            self.db.close()
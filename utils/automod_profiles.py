@@ -0,0 +1,128 @@
+import copy
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional
+
+# Checks a guild can turn off, in the order messages go through them
+RULES = ("spam", "duplicates", "filter", "mentions", "links")
+# Config fields that size bot-wide workers, a guild cannot override them
+GLOBAL_SETTINGS = ("lockdown_concurrency",)
+
+
+class AutoModProfile:
+    """A guild's overrides of the automod defaults."""
+
+    def __init__(self, settings: Dict[str, int] = None, disabled: List[str] = None,
+                 exempt_roles: List[int] = None, exempt_channels: List[int] = None):
+        self.settings = dict(settings or {})
+        self.disabled = set(disabled or [])
+        self.exempt_roles = set(exempt_roles or [])
+        self.exempt_channels = set(exempt_channels or [])
+
+    def to_data(self) -> Dict:
+        return {
+            "settings": self.settings,
+            "disabled": sorted(self.disabled),
+            "exempt_roles": sorted(self.exempt_roles),
+            "exempt_channels": sorted(self.exempt_channels)
+        }
+
+    @classmethod
+    def from_data(cls, data: Dict) -> "AutoModProfile":
+        return cls(data.get("settings"), data.get("disabled"),
+                   data.get("exempt_roles"), data.get("exempt_channels"))
+
+    def compile(self, defaults) -> "AutoModPlan":
+        config = copy.copy(defaults)
+        # Only the config's own fields are tunable, unknown keys are left over from older versions
+        fields = vars(defaults)
+        for name, value in self.settings.items():
+            if name in fields and name not in GLOBAL_SETTINGS and isinstance(value, int):
+                setattr(config, name, value)
+        return AutoModPlan(
+            config,
+            tuple(rule for rule in RULES if rule not in self.disabled),
+            frozenset(self.exempt_roles),
+            frozenset(self.exempt_channels)
+        )
+
+
+class AutoModPlan:
+    """A profile compiled for checking messages.
+
+    Holds the merged config, the enabled rules in order and the exempt
+    role and channel IDs as frozensets. The cog attaches the check of each
+    rule and its detectors, which are built from the merged config.
+    """
+
+    __slots__ = ("config", "rules", "checks", "exempt_roles", "exempt_channels",
+                 "spam_detector", "duplicate_detector", "raid_detector")
+
+    def __init__(self, config, rules, exempt_roles: FrozenSet[int], exempt_channels: FrozenSet[int]):
+        self.config = config
+        self.rules = rules
+        self.checks = ()
+        self.exempt_roles = exempt_roles
+        self.exempt_channels = exempt_channels
+        self.spam_detector = None
+        self.duplicate_detector = None
+        self.raid_detector = None
+
+    def is_exempt_channel(self, channel) -> bool:
+        if not self.exempt_channels:
+            return False
+        return (channel.id in self.exempt_channels or
+                getattr(channel, "category_id", None) in self.exempt_channels or
+                getattr(channel, "parent_id", None) in self.exempt_channels)
+
+
+class AutoModProfiles:
+    """Per-guild automod profiles, persisted as ``{guild_id: profile}``."""
+
+    def __init__(self, data: Dict[str, Dict] = None):
+        self.guilds: Dict[int, AutoModProfile] = {
+            int(guild_id): AutoModProfile.from_data(profile)
+            for guild_id, profile in (data or {}).items()
+        }
+
+    def to_data(self) -> Dict[str, Dict]:
+        return {str(guild_id): profile.to_data() for guild_id, profile in self.guilds.items()}
+
+    def get(self, guild_id: int) -> AutoModProfile:
+        profile = self.guilds.get(guild_id)
+        if profile is None:
+            profile = self.guilds[guild_id] = AutoModProfile()
+        return profile
+
+    def reset(self, guild_id: int):
+        self.guilds.pop(guild_id, None)
+
+
+class ExemptionCache:
+    """LRU of whether members are exempt from automod.
+
+    Entries are keyed by the guild's generation, so invalidating a whole
+    guild is O(1) and its stale entries age out of the LRU.
+    """
+
+    def __init__(self, size: int = 50000):
+        self.size = size
+        self.entries: OrderedDict = OrderedDict()
+        self.generations: Dict[int, int] = {}
+
+    def get(self, guild_id: int, user_id: int) -> Optional[bool]:
+        key = (guild_id, self.generations.get(guild_id, 0), user_id)
+        exempt = self.entries.get(key)
+        if exempt is not None:
+            self.entries.move_to_end(key)
+        return exempt
+
+    def set(self, guild_id: int, user_id: int, exempt: bool):
+        self.entries[(guild_id, self.generations.get(guild_id, 0), user_id)] = exempt
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, guild_id: int, user_id: int):
+        self.entries.pop((guild_id, self.generations.get(guild_id, 0), user_id), None)
+
+    def invalidate_guild(self, guild_id: int):
+        self.generations[guild_id] = self.generations.get(guild_id, 0) + 1
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+import os
+import secrets
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.outbound import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress reports and state saves of a running job
+PROGRESS_INTERVAL = 3.0
+SAVE_INTERVAL = 1.0
+
+Handler = Callable[["BulkJob", List[int]], Awaitable[int]]
+
+
+class BulkJob:
+    """A bulk moderation action over a list of targets.
+
+    Targets stay pending until the chunk they are in has been processed,
+    so a job interrupted by a restart resumes where it stopped.
+    """
+
+    def __init__(self, job_id: str, kind: str, guild_id: int, channel_id: int,
+                 targets: List[int], options: Dict = None, message_id: Optional[int] = None,
+                 total: Optional[int] = None, done: int = 0, failed: int = 0,
+                 created: Optional[float] = None):
+        self.id = job_id
+        self.kind = kind
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.pending: Dict[int, None] = dict.fromkeys(targets)
+        self.options = options or {}
+        self.message_id = message_id
+        self.total = len(self.pending) if total is None else total
+        self.done = done
+        self.failed = failed
+        self.created = time.time() if created is None else created
+        self.cancelled = False
+        self.reported = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.cancelled or not self.pending
+
+    def describe(self) -> str:
+        state = "cancelled" if self.cancelled else "done" if not self.pending else "running"
+        text = f"`{self.id}` {self.kind}: {self.done}/{self.total} {state}"
+        if self.failed:
+            text += f", {self.failed} failed"
+        return text
+
+    def to_data(self) -> Dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "guild_id": self.guild_id,
+            "channel_id": self.channel_id,
+            "targets": list(self.pending),
+            "options": self.options,
+            "message_id": self.message_id,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "created": self.created
+        }
+
+    @classmethod
+    def from_data(cls, data: Dict) -> "BulkJob":
+        return cls(data["id"], data["kind"], data["guild_id"], data["channel_id"],
+                   data["targets"], data.get("options"), data.get("message_id"),
+                   data.get("total"), data.get("done", 0), data.get("failed", 0),
+                   data.get("created"))
+
+
+class BulkRunner:
+    """Runs bulk jobs on a fixed pool of workers.
+
+    Jobs are split into chunks of their kind's ``chunk_size``. Each guild
+    gets a token bucket per kind, so one job cannot hit Discord's rate
+    limits while other guilds wait, and at most ``workers`` chunks are in
+    flight at once. Unfinished jobs are saved to ``path`` and resumed by
+    ``start``.
+    """
+
+    def __init__(self, path: str, workers: int = 4,
+                 on_progress: Optional[Callable[[BulkJob], Awaitable]] = None):
+        self.path = path
+        self.worker_count = workers
+        self.on_progress = on_progress
+        self.handlers: Dict[str, Tuple[Handler, int, Tuple[int, float]]] = {}
+        self.jobs: Dict[str, BulkJob] = {}
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.buckets: Dict[Tuple[str, int], TokenBucket] = {}
+        self.workers: List[asyncio.Task] = []
+        self.save_lock = asyncio.Lock()
+        self.saved = 0.0
+
+    def register(self, kind: str, handler: Handler, chunk_size: int = 1,
+                 rate: Tuple[int, float] = (5, 1.0)):
+        """Register the coroutine processing chunks of a job kind.
+
+        The handler returns how many targets of the chunk succeeded.
+        """
+        self.handlers[kind] = (handler, chunk_size, rate)
+
+    def start(self):
+        """Start the workers and resume the jobs saved by a previous run."""
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    for data in json.load(f):
+                        job = BulkJob.from_data(data)
+                        if job.kind in self.handlers and job.pending:
+                            self.jobs[job.id] = job
+                            self._schedule(job)
+            except (json.JSONDecodeError, KeyError) as e:
+                logger.error(f"Error loading bulk jobs: {e}")
+        if self.jobs:
+            logger.info(f"Resuming {len(self.jobs)} bulk jobs")
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        await self.save()
+
+    def submit(self, kind: str, guild_id: int, channel_id: int, targets: List[int],
+               options: Dict = None, message_id: Optional[int] = None) -> BulkJob:
+        job = BulkJob(secrets.token_hex(3), kind, guild_id, channel_id, targets,
+                      options, message_id)
+        self.jobs[job.id] = job
+        self._schedule(job)
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[BulkJob]:
+        """Cancel a job, its chunks already in flight still complete."""
+        job = self.jobs.pop(job_id, None)
+        if job is None:
+            return None
+        job.cancelled = True
+        await self.save()
+        return job
+
+    def guild_jobs(self, guild_id: int) -> List[BulkJob]:
+        return [job for job in self.jobs.values() if job.guild_id == guild_id]
+
+    def _schedule(self, job: BulkJob):
+        chunk_size = self.handlers[job.kind][1]
+        targets = list(job.pending)
+        for start in range(0, len(targets), chunk_size):
+            self.queue.put_nowait((job, targets[start:start + chunk_size]))
+
+    async def _acquire(self, job: BulkJob):
+        key = (job.kind, job.guild_id)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(*self.handlers[job.kind][2])
+        while True:
+            delay = bucket.wait_time(time.monotonic())
+            if not delay:
+                bucket.take()
+                return
+            await asyncio.sleep(delay)
+
+    async def _worker(self):
+        while True:
+            job, chunk = await self.queue.get()
+            try:
+                if job.cancelled:
+                    continue
+                await self._acquire(job)
+                try:
+                    succeeded = await self.handlers[job.kind][0](job, chunk)
+                except Exception as e:
+                    logger.error(f"Bulk job {job.id} chunk failed: {e}")
+                    succeeded = 0
+                for target in chunk:
+                    job.pending.pop(target, None)
+                job.done += len(chunk)
+                job.failed += len(chunk) - succeeded
+                await self._report(job)
+            finally:
+                self.queue.task_done()
+
+    async def _report(self, job: BulkJob):
+        now = time.monotonic()
+        if job.finished:
+            self.jobs.pop(job.id, None)
+        if job.finished or now - self.saved >= SAVE_INTERVAL:
+            await self.save()
+        if self.on_progress and (job.finished or now - job.reported >= PROGRESS_INTERVAL):
+            job.reported = now
+            try:
+                await self.on_progress(job)
+            except Exception as e:
+                logger.warning(f"Cannot report progress of bulk job {job.id}: {e}")
+
+    async def save(self):
+        """Save the unfinished jobs."""
+        async with self.save_lock:
+            self.saved = time.monotonic()
+            data = [job.to_data() for job in self.jobs.values() if not job.finished]
+            content = json.dumps(data)
+            await asyncio.to_thread(self._write, content)
+
+    def _write(self, content: str):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(content)
+        os.replace(temp_path, self.path)
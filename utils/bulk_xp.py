@@ -0,0 +1,75 @@
+from array import array
+from typing import Callable, Iterable
+
+import numpy as np
+
+
+def column_view(column: array) -> np.ndarray:
+    """Return a writable NumPy view over a ``UserTable`` column.
+
+    The view pins the column's buffer, so it must be dropped before the
+    table can grow again (in particular, before any ``await``).
+    """
+    if not len(column):
+        return np.zeros(0, dtype=column.typecode)
+    return np.frombuffer(column, dtype=column.typecode)
+
+
+def level_thresholds(get_level_xp: Callable[[int], int], max_xp: int) -> np.ndarray:
+    """Return the cumulative XP needed to complete each level up to ``max_xp``."""
+    thresholds = []
+    total = 0
+    level = 0
+    while total <= max_xp:
+        total += get_level_xp(level)
+        thresholds.append(total)
+        level += 1
+    return np.array(thresholds, dtype=np.int64)
+
+
+def levels_for_xp(xp: np.ndarray, get_level_xp: Callable[[int], int]) -> np.ndarray:
+    """Vectorized ``Levels.get_level_from_xp``."""
+    if not len(xp):
+        return np.zeros(0, dtype=np.int64)
+    thresholds = level_thresholds(get_level_xp, int(xp.max()))
+    return np.searchsorted(thresholds, xp, side="right")
+
+
+def rows_for_ids(table, user_ids: Iterable[int], create: bool = False) -> np.ndarray:
+    """Map user IDs to table rows, optionally creating missing rows."""
+    if create:
+        return np.fromiter((table.ensure(user_id) for user_id in user_ids), dtype=np.int64)
+    index = table.index
+    return np.fromiter((index[user_id] for user_id in user_ids if user_id in index), dtype=np.int64)
+
+
+def update_xp(table, rows: np.ndarray, update: Callable[[np.ndarray], np.ndarray],
+              get_level_xp: Callable[[int], int]) -> int:
+    """Replace the XP of ``rows`` with ``update(xp)`` and recompute their levels.
+
+    Runs synchronously on NumPy views of the table, so no other code can
+    touch the table while it runs. Returns the net XP change.
+    """
+    xp = column_view(table.xp)
+    level = column_view(table.level)
+    old_xp = xp[rows]
+    new_xp = np.maximum(update(old_xp), 0).astype(np.int64)
+    xp[rows] = new_xp
+    level[rows] = levels_for_xp(new_xp, get_level_xp)
+    return int(new_xp.sum() - old_xp.sum())
+
+
+def standings(table, rows: np.ndarray) -> list:
+    """Return the rows sorted by XP as a list of dicts, for season archives."""
+    order = rows[np.argsort(-column_view(table.xp)[rows], kind="stable")]
+    columns = zip(
+        column_view(table.ids)[order].tolist(),
+        column_view(table.xp)[order].tolist(),
+        column_view(table.level)[order].tolist(),
+        column_view(table.total_messages)[order].tolist()
+    )
+    return [
+        {"rank": rank, "user_id": user_id, "xp": xp,
+            "level": level, "total_messages": messages}
+        for rank, (user_id, xp, level, messages) in enumerate(columns, 1)
+    ]
@@ -0,0 +1,128 @@
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+SECONDS_PER_DAY = 86400
+
+# Task types that can be rolled for a day. "goal" and "reward" are the
+# inclusive ranges the daily values are drawn from.
+TASK_TYPES = {
+    "messages": {"goal": (10, 50), "reward": (100, 500), "label": "messages"},
+    "xp": {"goal": (500, 2000), "reward": (200, 1000), "label": "XP"},
+    "voice_minutes": {"goal": (15, 60), "reward": (200, 800), "label": "voice minutes"},
+    "reactions": {"goal": (5, 25), "reward": (100, 400), "label": "reactions"},
+}
+
+
+def current_day(now: Optional[float] = None) -> int:
+    """Return the UTC day number (days since the epoch) for a timestamp."""
+    return int(time.time() if now is None else now) // SECONDS_PER_DAY
+
+
+class DailyTaskEngine:
+    """Per-day task counters for every user.
+
+    Progress lives in the ``task_*`` columns of a ``UserTable``. The current
+    UTC day and the timestamp of the next rollover are computed once per day,
+    so recording progress is a counter increment followed by a couple of
+    integer comparisons. Users are moved onto new tasks in a single batch by
+    ``rollover``.
+
+    Tasks are generated from an RNG seeded with the day and the user ID, so
+    only the counters and a completion bitmask have to be stored.
+    """
+
+    def __init__(self, table, tasks_per_day: int = 3):
+        self.tasks_per_day = min(tasks_per_day, len(TASK_TYPES))
+        self.day = 0
+        self.next_rollover = 0
+        self._tasks: Dict[int, List[Dict]] = {}
+        self.bind(table)
+        self.set_day(current_day())
+
+    def bind(self, table):
+        """Use ``table`` for task progress."""
+        self.table = table
+        self._counters = {metric: getattr(table, f"task_{metric}")
+                          for metric in TASK_TYPES}
+
+    def set_day(self, day: int):
+        """Set the active day and precompute the next day boundary."""
+        self.day = day
+        self.next_rollover = (day + 1) * SECONDS_PER_DAY
+        self._tasks.clear()
+
+    def seconds_until_rollover(self) -> float:
+        return max(0.0, self.next_rollover - time.time())
+
+    def generate(self, user_id: int) -> List[Dict]:
+        """Generate the tasks of the active day for a user."""
+        rng = random.Random(f"{self.day}:{user_id}")
+        tasks = []
+        for task_type in rng.sample(list(TASK_TYPES), self.tasks_per_day):
+            spec = TASK_TYPES[task_type]
+            tasks.append({
+                "type": task_type,
+                "goal": rng.randint(*spec["goal"]),
+                "reward": rng.randint(*spec["reward"])
+            })
+        return tasks
+
+    def tasks_for(self, user_id: int) -> List[Dict]:
+        """Return today's tasks for a user."""
+        tasks = self._tasks.get(user_id)
+        if tasks is None:
+            tasks = self._tasks[user_id] = self.generate(user_id)
+        return tasks
+
+    def sync(self, row: int):
+        """Reset the counters of a row whose tasks are from a previous day."""
+        table = self.table
+        if table.task_day[row] != self.day:
+            table.task_day[row] = self.day
+            table.task_done[row] = 0
+            for column in self._counters.values():
+                column[row] = 0
+
+    def status(self, user_id: int) -> Tuple[List[Dict], Dict[str, int], int]:
+        """Return today's tasks, counters and completion bitmask for a user."""
+        row = self.table.ensure(user_id)
+        self.sync(row)
+        progress = {metric: column[row]
+                    for metric, column in self._counters.items()}
+        return self.tasks_for(user_id), progress, self.table.task_done[row]
+
+    def record(self, user_id: int, metric: str, amount: int = 1) -> List[Dict]:
+        """Add ``amount`` to today's ``metric`` counter for a user.
+
+        Returns the tasks that were completed by this update.
+        """
+        row = self.table.ensure(user_id)
+        self.sync(row)
+        column = self._counters[metric]
+        value = column[row] + amount
+        column[row] = value
+
+        done = self.table.task_done[row]
+        completed = []
+        for slot, task in enumerate(self.tasks_for(user_id)):
+            bit = 1 << slot
+            if task["type"] == metric and not done & bit and value >= task["goal"]:
+                done |= bit
+                completed.append(task)
+        if completed:
+            self.table.task_done[row] = done
+        return completed
+
+    def rollover(self, day: Optional[int] = None) -> int:
+        """Move every user onto the tasks of ``day`` in one batch.
+
+        Returns the number of users that were rolled over.
+        """
+        self.set_day(current_day() if day is None else day)
+        table = self.table
+        table.fill("task_day", self.day)
+        table.fill("task_done")
+        for metric in TASK_TYPES:
+            table.fill(f"task_{metric}")
+        return len(table)
@@ -0,0 +1,182 @@
+import time
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from utils.word_filter import normalize
+
+SHINGLE_SIZE = 4
+# Longer messages are fingerprinted by their start, spam repeats anyway
+MAX_LENGTH = 400
+NUM_HASHES = 32
+# Texts with Jaccard similarity s share a band with probability 1 - (1 - s^ROWS)^BANDS
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+# Comparing against the latest matching posts is enough to find who posted
+MAX_CANDIDATES = 64
+
+_rng = np.random.default_rng(0x5EED)
+MULTIPLIERS = _rng.integers(1, 2 ** 63, NUM_HASHES, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+OFFSETS = _rng.integers(0, 2 ** 63, NUM_HASHES, dtype=np.uint64)
+HASH_MASK = (1 << 64) - 1
+
+
+def shingles(text: str) -> np.ndarray:
+    """Return the hashes of the character shingles of normalized ``text``."""
+    text = " ".join(normalize(text[:MAX_LENGTH]).split())
+    if len(text) < SHINGLE_SIZE:
+        return np.zeros(0, dtype=np.uint64)
+    return np.fromiter(
+        {hash(text[i:i + SHINGLE_SIZE]) & HASH_MASK
+         for i in range(len(text) - SHINGLE_SIZE + 1)},
+        dtype=np.uint64)
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """Return the MinHash signature of ``text``.
+
+    The share of equal values in two signatures estimates the Jaccard
+    similarity of the texts' shingles. Returns None for texts shorter
+    than a shingle.
+    """
+    hashes = shingles(text)
+    if not len(hashes):
+        return None
+    # Multiply-add permutations, wrapping around at 64 bits
+    return (hashes[:, None] * MULTIPLIERS + OFFSETS).min(axis=0)
+
+
+def band_keys(signature: np.ndarray):
+    return [(band, signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+class Post(NamedTuple):
+    time: float
+    signature: np.ndarray
+    keys: list
+    user_id: int
+    channel_id: int
+
+
+class DuplicateMatch(NamedTuple):
+    """Users and channels that posted content near-identical to a message."""
+    users: Set[int]
+    channels: Set[int]
+    user_channels: Set[int]
+
+
+class GuildIndex:
+    """Recent signatures of one guild, bucketed by LSH bands.
+
+    Only posts sharing a band with a signature are compared to it.
+    """
+
+    __slots__ = ("posts", "buckets")
+
+    def __init__(self):
+        self.posts: Deque[Post] = deque()
+        self.buckets: Dict[Tuple[int, bytes], Deque[Post]] = {}
+
+    def add(self, post: Post):
+        self.posts.append(post)
+        for key in post.keys:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = deque()
+            bucket.append(post)
+
+    def pop_oldest(self):
+        post = self.posts.popleft()
+        # Posts are added in order, so the oldest is first in its buckets
+        for key in post.keys:
+            bucket = self.buckets[key]
+            bucket.popleft()
+            if not bucket:
+                del self.buckets[key]
+
+    def candidates(self, keys) -> List[Post]:
+        found = {}
+        for key in keys:
+            for post in islice(reversed(self.buckets.get(key, ())), MAX_CANDIDATES):
+                found[id(post)] = post
+            if len(found) >= MAX_CANDIDATES:
+                break
+        return list(found.values())
+
+
+class DuplicateDetector:
+    """Near-duplicate message detection across channels and accounts.
+
+    Keeps the MinHash signatures of each guild's messages from the last
+    ``window`` seconds, at most ``max_posts`` per guild. A message matches
+    earlier posts with an estimated similarity of at least ``similarity``.
+    """
+
+    def __init__(self, window: float = 60.0, similarity: float = 0.5, max_posts: int = 2000,
+                 min_length: int = 20):
+        self.window = window
+        self.min_equal = int(np.ceil(similarity * NUM_HASHES))
+        self.max_posts = max_posts
+        self.min_length = min_length
+        self.guilds: Dict[int, GuildIndex] = {}
+        self.checks = 0
+        self.matches = 0
+
+    def _expire(self, index: GuildIndex, now: float):
+        cutoff = now - self.window
+        while index.posts and (index.posts[0].time < cutoff or
+                               len(index.posts) >= self.max_posts):
+            index.pop_oldest()
+
+    def check(self, guild_id: int, channel_id: int, user_id: int, content: str,
+              now: Optional[float] = None) -> Optional[DuplicateMatch]:
+        """Record a message, returns who posted near-identical content recently."""
+        if len(content) < self.min_length:
+            return None
+        signature = minhash(content)
+        if signature is None:
+            return None
+
+        now = time.monotonic() if now is None else now
+        index = self.guilds.get(guild_id)
+        if index is None:
+            index = self.guilds[guild_id] = GuildIndex()
+        self._expire(index, now)
+
+        keys = band_keys(signature)
+        users = {user_id}
+        channels = {channel_id}
+        user_channels = {channel_id}
+        candidates = index.candidates(keys)
+        if candidates:
+            equal = (np.stack([post.signature for post in candidates]) == signature).sum(axis=1)
+            for post, count in zip(candidates, equal.tolist()):
+                if count < self.min_equal:
+                    continue
+                users.add(post.user_id)
+                channels.add(post.channel_id)
+                if post.user_id == user_id:
+                    user_channels.add(post.channel_id)
+        index.add(Post(now, signature, keys, user_id, channel_id))
+
+        self.checks += 1
+        if len(users) == 1 and len(channels) == 1:
+            return None
+        self.matches += 1
+        return DuplicateMatch(users, channels, user_channels)
+
+    def prune(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        for guild_id, index in list(self.guilds.items()):
+            self._expire(index, now)
+            if not index.posts:
+                del self.guilds[guild_id]
+
+    def get_metrics(self) -> Dict:
+        return {
+            "indexed_posts": sum(len(index.posts) for index in self.guilds.values()),
+            "checks": self.checks,
+            "matches": self.matches
+        }
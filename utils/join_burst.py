@@ -0,0 +1,60 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class BurstDetector:
+    """Per-guild sliding window of event times.
+
+    A guild is in a burst once ``threshold`` events happened within
+    ``window`` seconds, and stays in it until the rate has been below the
+    threshold for ``cooldown`` seconds, so it does not flip back and forth
+    at the edge of the threshold.
+    """
+
+    def __init__(self, window: float = 10.0, threshold: int = 5, cooldown: float = 30.0):
+        self.window = window
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.events: Dict[int, Deque[float]] = {}
+        self.burst_until: Dict[int, float] = {}
+
+    def _trim(self, guild_id: int, now: float) -> Deque[float]:
+        times = self.events.get(guild_id)
+        if times is None:
+            times = self.events[guild_id] = deque()
+        cutoff = now - self.window
+        while times and times[0] < cutoff:
+            times.popleft()
+        return times
+
+    def record(self, guild_id: int, now: Optional[float] = None) -> bool:
+        """Record an event, returns True if the guild is in a burst."""
+        now = time.monotonic() if now is None else now
+        times = self._trim(guild_id, now)
+        times.append(now)
+        if len(times) >= self.threshold:
+            self.burst_until[guild_id] = now + self.cooldown
+        return self.in_burst(guild_id, now)
+
+    def in_burst(self, guild_id: int, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        until = self.burst_until.get(guild_id)
+        if until is None:
+            return False
+        if until <= now:
+            del self.burst_until[guild_id]
+            return False
+        return True
+
+    def rate(self, guild_id: int, now: Optional[float] = None) -> int:
+        """Return the number of events in the current window."""
+        now = time.monotonic() if now is None else now
+        return len(self._trim(guild_id, now))
+
+    def prune(self, now: Optional[float] = None):
+        """Drop guilds without recent events."""
+        now = time.monotonic() if now is None else now
+        for guild_id in list(self.events):
+            if not self._trim(guild_id, now) and not self.in_burst(guild_id, now):
+                del self.events[guild_id]
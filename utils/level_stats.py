@@ -0,0 +1,193 @@
+from collections import Counter
+from typing import Dict, List, Optional
+
+from utils.daily_tasks import current_day
+
+ACTIVE_WINDOWS = (1, 7, 30)
+
+
+class ScopeStats:
+    """Running totals of one scope (the whole bot or a single guild).
+
+    ``levels`` only counts users above level 0 and ``active_days`` counts
+    users by the UTC day they were last active, so both can be updated by
+    moving a single count when a user changes.
+    """
+
+    __slots__ = ("total_messages", "total_xp", "levels", "active_days")
+
+    def __init__(self):
+        self.total_messages = 0
+        self.total_xp = 0
+        self.levels: Counter = Counter()
+        self.active_days: Counter = Counter()
+
+    def move_level(self, old: int, new: int):
+        _move(self.levels, old, new)
+
+    def move_day(self, old: int, new: int):
+        _move(self.active_days, old, new)
+
+    def active(self, today: int, days: int) -> int:
+        return sum(self.active_days.get(today - i, 0) for i in range(days))
+
+    def summary(self, users: int, today: int) -> Dict:
+        levels = dict(self.levels)
+        levels[0] = users - sum(levels.values())
+        summary = {
+            "users": users,
+            "total_messages": self.total_messages,
+            "total_xp": self.total_xp,
+            "level_distribution": dict(sorted(levels.items()))
+        }
+        for days in ACTIVE_WINDOWS:
+            summary[f"active_{days}d"] = self.active(today, days)
+        return summary
+
+
+def _move(counter: Counter, old: int, new: int):
+    if old == new:
+        return
+    if old:
+        counter[old] -= 1
+        if counter[old] <= 0:
+            del counter[old]
+    if new:
+        counter[new] += 1
+
+
+class LevelStats:
+    """Incrementally maintained aggregates of the Levels user table.
+
+    Global totals are kept next to the ``UserTable`` and per-guild totals
+    are kept for every guild a user earned message XP in. The Levels cog
+    reports every change, so summaries are O(1) in the number of users;
+    ``reconcile`` recounts everything that can be derived from the table
+    to catch drift.
+    """
+
+    def __init__(self, users):
+        self.users = users
+        self.total = ScopeStats()
+        self.guilds: Dict[int, ScopeStats] = {}
+        # guild_id -> {user_id: last UTC day the user was active in the guild}
+        self.members: Dict[int, Dict[int, int]] = {}
+        self.user_guilds: Dict[int, List[int]] = {}
+
+    def guild(self, guild_id: int) -> ScopeStats:
+        scope = self.guilds.get(guild_id)
+        if scope is None:
+            scope = self.guilds[guild_id] = ScopeStats()
+            self.members[guild_id] = {}
+        return scope
+
+    def add_xp(self, amount: int, guild_id: Optional[int] = None):
+        self.total.total_xp += amount
+        if guild_id is not None:
+            self.guild(guild_id).total_xp += amount
+
+    def add_messages(self, count: int, guild_id: int):
+        self.total.total_messages += count
+        self.guild(guild_id).total_messages += count
+
+    def level_changed(self, user_id: int, old: int, new: int):
+        self.total.move_level(old, new)
+        for guild_id in self.user_guilds.get(user_id, ()):
+            self.guilds[guild_id].move_level(old, new)
+
+    def user_active(self, old_day: int, new_day: int):
+        self.total.move_day(old_day, new_day)
+
+    def guild_active(self, guild_id: int, user_id: int, day: int, level: int):
+        """Record that a user was active in a guild on ``day``."""
+        scope = self.guild(guild_id)
+        members = self.members[guild_id]
+        old_day = members.get(user_id)
+        if old_day == day:
+            return
+
+        if old_day is None:
+            self.user_guilds.setdefault(user_id, []).append(guild_id)
+            scope.move_level(0, level)
+        members[user_id] = day
+        scope.move_day(old_day or 0, day)
+
+    def user_removed(self, user_id: int, row: int):
+        """Remove the contribution of a user that is about to leave the table."""
+        users = self.users
+        self.total.total_xp -= users.xp[row]
+        self.total.total_messages -= users.total_messages[row]
+        self.total.move_level(users.level[row], 0)
+        self.total.move_day(users.last_active_day[row], 0)
+
+        for guild_id in self.user_guilds.pop(user_id, ()):
+            scope = self.guilds[guild_id]
+            scope.move_level(users.level[row], 0)
+            scope.move_day(self.members[guild_id].pop(user_id, 0), 0)
+
+    def summary(self, guild_id: Optional[int] = None) -> Dict:
+        today = current_day()
+        if guild_id is None:
+            return self.total.summary(len(self.users), today)
+        scope = self.guilds.get(guild_id) or ScopeStats()
+        return scope.summary(len(self.members.get(guild_id, ())), today)
+
+    def reconcile(self) -> Dict[str, int]:
+        """Recount everything derivable from the user table.
+
+        Returns the drift that was corrected for each global total.
+        """
+        users = self.users
+        total = ScopeStats()
+        total.total_xp = sum(users.xp)
+        total.total_messages = sum(users.total_messages)
+        total.levels = Counter(level for level in users.level if level)
+        total.active_days = Counter(day for day in users.last_active_day if day)
+
+        drift = {
+            "total_xp": total.total_xp - self.total.total_xp,
+            "total_messages": total.total_messages - self.total.total_messages,
+            "levels": sum((total.levels - self.total.levels).values()) +
+            sum((self.total.levels - total.levels).values()),
+            "active_days": sum((total.active_days - self.total.active_days).values()) +
+            sum((self.total.active_days - total.active_days).values()),
+        }
+        self.total = total
+
+        self.user_guilds = {}
+        for guild_id, members in self.members.items():
+            scope = self.guilds[guild_id]
+            scope.levels = Counter()
+            scope.active_days = Counter(day for day in members.values() if day)
+            for user_id in list(members):
+                row = users.row(user_id)
+                if row is None:
+                    del members[user_id]
+                    continue
+                if users.level[row]:
+                    scope.levels[users.level[row]] += 1
+                self.user_guilds.setdefault(user_id, []).append(guild_id)
+        return drift
+
+    def snapshot(self) -> Dict:
+        """Return the per-guild data that cannot be derived from the table."""
+        return {
+            str(guild_id): {
+                "total_messages": scope.total_messages,
+                "total_xp": scope.total_xp,
+                "members": {str(user_id): day for user_id, day in self.members[guild_id].items()}
+            }
+            for guild_id, scope in self.guilds.items()
+        }
+
+    @classmethod
+    def from_snapshot(cls, users, data: Dict) -> "LevelStats":
+        stats = cls(users)
+        for guild_id, guild_data in data.items():
+            scope = stats.guild(int(guild_id))
+            scope.total_messages = guild_data.get("total_messages", 0)
+            scope.total_xp = guild_data.get("total_xp", 0)
+            stats.members[int(guild_id)] = {
+                int(user_id): day for user_id, day in guild_data.get("members", {}).items()}
+        stats.reconcile()
+        return stats
@@ -0,0 +1,243 @@
+import asyncio
+import ipaddress
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+import aiohttp
+
+# Scheme, then the host part up to the first path, query or fragment character
+URL_PATTERN = re.compile(r"https?://([^\s/?#<>\"'`|]+)[^\s<>\"'`|]*", re.IGNORECASE)
+INVITE_PATTERN = re.compile(
+    r"(?:https?://)?(?:www\.)?(?:discord(?:app)?\.com/invite|discord\.gg)/([\w-]+)", re.IGNORECASE)
+
+SHORTENERS = frozenset({
+    "bit.ly", "tinyurl.com", "t.co", "goo.gl", "is.gd", "ow.ly", "buff.ly",
+    "cutt.ly", "rebrand.ly", "shorturl.at", "rb.gy", "t.ly", "tiny.cc",
+})
+
+ALLOW = "allow"
+DENY = "deny"
+
+# Shorteners pointing to other shorteners are followed this many hops
+MAX_REDIRECTS = 5
+
+
+class Link:
+    __slots__ = ("url", "host")
+
+    def __init__(self, url: str, host: str):
+        self.url = url
+        self.host = host
+
+
+def extract_host(netloc: str) -> str:
+    host = netloc.rpartition("@")[2]
+    if not host.startswith("["):
+        host = host.partition(":")[0]
+    return host.rstrip(".").lower()
+
+
+def scan_links(text: str) -> List[Link]:
+    """Return the http(s) links in a message."""
+    # Most messages have no links, skip the regex for them
+    if "http" not in text and "HTTP" not in text:
+        return []
+    # Trailing punctuation usually belongs to the sentence, not the link
+    return [Link(match.group(0).rstrip(".,;:!?)]}"), extract_host(match.group(1)))
+            for match in URL_PATTERN.finditer(text)]
+
+
+async def is_public_host(host: str) -> bool:
+    """Check that every address ``host`` resolves to is publicly routable."""
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None)
+    except OSError:
+        return False
+    try:
+        # IPv6 link-local addresses come with a %scope suffix
+        return bool(infos) and all(ipaddress.ip_address(info[4][0].partition("%")[0]).is_global
+                                   for info in infos)
+    except ValueError:
+        return False
+
+
+def scan_invites(text: str) -> List[str]:
+    """Return the Discord invite codes in a message."""
+    if "discord" not in text.lower():
+        return []
+    return INVITE_PATTERN.findall(text)
+
+
+class DomainTrie:
+    """Domain policies stored by reversed labels.
+
+    A policy for ``example.com`` also covers ``cdn.example.com``, and the
+    most specific domain with a policy wins.
+    """
+
+    def __init__(self):
+        self.root: Dict = {}
+
+    def add(self, domain: str, policy: str):
+        node = self.root
+        for label in reversed(domain.lower().strip(".").split(".")):
+            node = node.setdefault(label, {})
+        node[None] = policy
+
+    def remove(self, domain: str) -> bool:
+        path = [self.root]
+        for label in reversed(domain.lower().strip(".").split(".")):
+            node = path[-1].get(label)
+            if node is None:
+                return False
+            path.append(node)
+        if path[-1].pop(None, None) is None:
+            return False
+
+        labels = list(reversed(domain.lower().strip(".").split(".")))
+        for depth in range(len(labels), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][labels[depth - 1]]
+        return True
+
+    def lookup(self, host: str) -> Optional[str]:
+        node = self.root
+        policy = None
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            policy = node.get(None, policy)
+        return policy
+
+    def domains(self) -> Dict[str, str]:
+        result = {}
+        stack = [(self.root, [])]
+        while stack:
+            node, labels = stack.pop()
+            for label, child in node.items():
+                if label is None:
+                    result[".".join(reversed(labels))] = child
+                else:
+                    stack.append((child, labels + [label]))
+        return result
+
+
+class LinkPolicies:
+    """Per-guild allow and deny lists of domains.
+
+    Persisted as ``{guild_id: {"allow": [...], "deny": [...]}}``.
+    """
+
+    def __init__(self, data: Dict[str, Dict[str, List[str]]] = None):
+        self.guilds: Dict[int, DomainTrie] = {}
+        for guild_id, lists in (data or {}).items():
+            for policy in (ALLOW, DENY):
+                for domain in lists.get(policy, []):
+                    self.set(int(guild_id), domain, policy)
+
+    def to_data(self) -> Dict[str, Dict[str, List[str]]]:
+        data = {}
+        for guild_id, trie in self.guilds.items():
+            domains = trie.domains()
+            if domains:
+                data[str(guild_id)] = {
+                    policy: sorted(d for d, p in domains.items() if p == policy)
+                    for policy in (ALLOW, DENY)
+                }
+        return data
+
+    def set(self, guild_id: int, domain: str, policy: str):
+        trie = self.guilds.get(guild_id)
+        if trie is None:
+            trie = self.guilds[guild_id] = DomainTrie()
+        trie.add(domain, policy)
+
+    def remove(self, guild_id: int, domain: str) -> bool:
+        trie = self.guilds.get(guild_id)
+        return trie is not None and trie.remove(domain)
+
+    def lookup(self, guild_id: int, host: str) -> Optional[str]:
+        trie = self.guilds.get(guild_id)
+        return trie.lookup(host) if trie else None
+
+    def domains(self, guild_id: int) -> Dict[str, str]:
+        trie = self.guilds.get(guild_id)
+        return trie.domains() if trie else {}
+
+
+class ShortenerCache:
+    """Resolves shortened links to the host they redirect to.
+
+    Results, including failures, are cached in an LRU for ``ttl`` seconds,
+    concurrent lookups of the same link share one request and at most
+    ``concurrency`` requests run at once. Redirects are read from the
+    Location header rather than followed, and only known shorteners with
+    public addresses are ever requested, so links cannot make the bot
+    reach internal hosts.
+    """
+
+    def __init__(self, size: int = 5000, ttl: float = 24 * 3600, timeout: float = 3.0,
+                 concurrency: int = 10):
+        self.size = size
+        self.ttl = ttl
+        self.timeout = timeout
+        self.cache: OrderedDict = OrderedDict()
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    def get(self, url: str) -> Optional[str]:
+        entry = self.cache.get(url)
+        if entry is None:
+            return None
+        host, expires = entry
+        if expires < time.monotonic():
+            del self.cache[url]
+            return None
+        self.cache.move_to_end(url)
+        return host
+
+    async def resolve(self, session: aiohttp.ClientSession, url: str) -> str:
+        """Return the final host of ``url``, or its own host if it cannot be followed."""
+        host = self.get(url)
+        if host is not None:
+            return host
+
+        future = self.pending.get(url)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = self.pending[url] = asyncio.get_running_loop().create_future()
+        try:
+            async with self.semaphore:
+                host = await self._follow(session, url)
+            self.cache[url] = (host, time.monotonic() + self.ttl)
+            if len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+            future.set_result(host)
+            return host
+        finally:
+            if not future.done():
+                future.cancel()
+            del self.pending[url]
+
+    async def _follow(self, session: aiohttp.ClientSession, url: str) -> str:
+        host = extract_host(URL_PATTERN.match(url).group(1))
+        try:
+            for _ in range(MAX_REDIRECTS):
+                if host not in SHORTENERS or not await is_public_host(host):
+                    return host
+                async with session.head(url, allow_redirects=False,
+                                        timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+                    location = response.headers.get("Location")
+                match = URL_PATTERN.match(urljoin(url, location)) if location else None
+                if match is None:
+                    return host
+                url, host = match.group(0), extract_host(match.group(1))
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        return host
@@ -0,0 +1,63 @@
+from typing import Dict, List, Tuple
+
+import discord
+
+from utils.outbound import MAX_EMBED_CHARS, MAX_EMBEDS, OutboundDispatcher, Priority
+
+
+class LogBatcher:
+    """Buffers log embeds per channel and sends them as multi-embed messages.
+
+    A channel's buffer is sent as soon as it holds ``MAX_EMBEDS`` embeds or
+    the next embed would go over Discord's embed character limit, and
+    otherwise whenever ``flush_all`` is called.
+    """
+
+    def __init__(self, outbound: OutboundDispatcher, priority: Priority = Priority.NOTIFICATION):
+        self.outbound = outbound
+        self.priority = priority
+        # channel_id -> (channel, embeds, embed characters)
+        self.pending: Dict[int, Tuple[discord.abc.Messageable, List[discord.Embed], int]] = {}
+        self.events_logged = 0
+        self.messages_sent = 0
+
+    def add(self, channel: discord.abc.Messageable, embed: discord.Embed):
+        size = len(embed)
+        entry = self.pending.get(channel.id)
+        if entry is not None and entry[2] + size > MAX_EMBED_CHARS:
+            self.flush(channel.id)
+            entry = None
+
+        if entry is None:
+            self.pending[channel.id] = (channel, [embed], size)
+        else:
+            self.pending[channel.id] = (channel, entry[1] + [embed], entry[2] + size)
+        self.events_logged += 1
+
+        if len(self.pending[channel.id][1]) >= MAX_EMBEDS:
+            self.flush(channel.id)
+
+    def send_file(self, channel: discord.abc.Messageable, content: str, file: discord.File):
+        """Send a file after everything already buffered for the channel."""
+        self.flush(channel.id)
+        self.outbound.enqueue(channel, content, file=file, priority=self.priority)
+        self.events_logged += 1
+        self.messages_sent += 1
+
+    def flush(self, channel_id: int):
+        entry = self.pending.pop(channel_id, None)
+        if entry is not None:
+            channel, embeds, _ = entry
+            self.outbound.enqueue(channel, embeds=embeds, priority=self.priority)
+            self.messages_sent += 1
+
+    def flush_all(self):
+        for channel_id in list(self.pending):
+            self.flush(channel_id)
+
+    def get_metrics(self) -> Dict:
+        return {
+            "events_logged": self.events_logged,
+            "messages_sent": self.messages_sent,
+            "pending_embeds": sum(len(embeds) for _, embeds, _ in self.pending.values())
+        }
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    key TEXT PRIMARY KEY,
+    title TEXT,
+    duration REAL,
+    uploader TEXT,
+    stream_url TEXT,
+    stream_expires REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_media_updated ON media (updated_at);
+"""
+
+# Titles and uploaders rarely change, durations never do
+METADATA_TTL = 30 * 86400
+# For stream URLs that do not say when they expire
+STREAM_TTL = 3600
+# A stream URL has to outlive the track by this much to be used
+STREAM_MARGIN = 300
+
+VIDEO_ID_PATTERN = re.compile(r"(?:[?&]v=|youtu\.be/|/shorts/)([\w-]{11})")
+EXPIRE_PATTERN = re.compile(r"[?&/]expire[=/](\d+)")
+
+
+def media_key(url: str) -> str:
+    """Return the video ID of a YouTube URL, or the URL itself."""
+    match = VIDEO_ID_PATTERN.search(url)
+    return match.group(1) if match else url
+
+
+def stream_expiry(url: str, now: float) -> float:
+    """Return when a stream URL expires, from its ``expire`` parameter."""
+    match = EXPIRE_PATTERN.search(url)
+    return float(match.group(1)) if match else now + STREAM_TTL
+
+
+class CachedMedia:
+    """The metadata of a video and its last resolved stream URL."""
+
+    __slots__ = ("key", "title", "duration", "uploader", "stream_url", "stream_expires",
+                 "updated_at")
+
+    def __init__(self, key: str, title: str, duration: Optional[float], uploader: Optional[str],
+                 stream_url: Optional[str], stream_expires: Optional[float], updated_at: float):
+        self.key = key
+        self.title = title
+        self.duration = duration
+        self.uploader = uploader
+        self.stream_url = stream_url
+        self.stream_expires = stream_expires
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_info(cls, key: str, data: Dict, now: float) -> "CachedMedia":
+        stream_url = data.get('url')
+        return cls(key, data.get('title'), data.get('duration'), data.get('uploader'),
+                   stream_url, stream_expiry(stream_url, now) if stream_url else None, now)
+
+    def fresh(self, now: float) -> bool:
+        return now - self.updated_at < METADATA_TTL
+
+    def playable(self, now: float) -> bool:
+        """Whether the stream URL stays valid until the track has played."""
+        if not self.stream_url:
+            return False
+        return self.stream_expires - now > (self.duration or 0) + STREAM_MARGIN
+
+
+class MediaCache:
+    """Two-tier cache of yt-dlp extractions.
+
+    Lookups hit an in-memory LRU of ``size`` entries first, then a SQLite
+    table, and extract only when the metadata is older than
+    ``METADATA_TTL`` or a stream URL is needed and the cached one expires
+    too soon. Concurrent lookups of the same video share one extraction.
+    SQLite is accessed through ``asyncio.to_thread``.
+    """
+
+    def __init__(self, path: str, size: int = 512):
+        self.size = size
+        self.entries: OrderedDict = OrderedDict()
+        self.pending: Dict[str, asyncio.Task] = {}
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _remember(self, entry: CachedMedia):
+        self.entries[entry.key] = entry
+        self.entries.move_to_end(entry.key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[CachedMedia]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT key, title, duration, uploader, stream_url, stream_expires, updated_at"
+                " FROM media WHERE key = ?", (key,)).fetchone()
+        return CachedMedia(*row) if row else None
+
+    def _store(self, entry: CachedMedia):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO media"
+                " (key, title, duration, uploader, stream_url, stream_expires, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (entry.key, entry.title, entry.duration, entry.uploader, entry.stream_url,
+                 entry.stream_expires, entry.updated_at))
+            self.db.commit()
+
+    async def get(self, key: str) -> Optional[CachedMedia]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry
+        loaded = await asyncio.to_thread(self._load, key)
+        # An extraction may have finished while the row was loading
+        entry = self.entries.get(key)
+        if loaded is not None and (entry is None or loaded.updated_at > entry.updated_at):
+            entry = loaded
+        if entry is not None:
+            self._remember(entry)
+        return entry
+
+    async def resolve(self, url: str, extract: Callable[[str], Awaitable[Optional[Dict]]],
+                      stream: bool = False) -> Optional[CachedMedia]:
+        """Return the cached media of ``url``, extracting it with ``extract`` if needed.
+
+        With ``stream`` the entry has a stream URL that is still valid for
+        the length of the track. Returns None when the extraction found
+        nothing.
+        """
+        key = media_key(url)
+        now = time.time()
+        entry = await self.get(key)
+        if entry is not None and entry.fresh(now) and (not stream or entry.playable(now)):
+            self.hits += 1
+            return entry
+
+        task = self.pending.get(key)
+        if task is None:
+            self.misses += 1
+            task = self.pending[key] = asyncio.create_task(self._extract(key, url, extract))
+            task.add_done_callback(lambda _: self.pending.pop(key, None))
+        else:
+            self.coalesced += 1
+        # A caller giving up must not cancel the extraction others wait for
+        return await asyncio.shield(task)
+
+    async def _extract(self, key: str, url: str,
+                       extract: Callable[[str], Awaitable[Optional[Dict]]]) -> Optional[CachedMedia]:
+        data = await extract(url)
+        if data is None:
+            return None
+        entry = CachedMedia.from_info(key, data, time.time())
+        self._remember(entry)
+        try:
+            await asyncio.to_thread(self._store, entry)
+        except sqlite3.Error as e:
+            logger.warning(f"Cannot store media cache entry {key}: {e}")
+        return entry
+
+    def prune(self) -> int:
+        """Delete entries whose metadata is too old to be used."""
+        with self.lock:
+            cursor = self.db.execute("DELETE FROM media WHERE updated_at < ?",
+                                     (time.time() - METADATA_TTL,))
+            self.db.commit()
+        return cursor.rowcount
+
+    def get_metrics(self) -> Dict:
+        return {
+            "cached": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "extracting": len(self.pending)
+        }
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,136 @@
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import discord
+
+# Rough per-entry overhead of the entry object and the index dicts (bytes)
+ENTRY_OVERHEAD = 250
+
+
+class CachedMessage:
+    """The parts of a message needed to log its deletion or edit."""
+
+    __slots__ = ("message_id", "channel_id", "author_id", "author_name",
+                 "avatar_url", "attachments", "created_at", "_content",
+                 "compressed", "size")
+
+    def __init__(self, message: discord.Message, compress_threshold: Optional[int]):
+        self.message_id = message.id
+        self.channel_id = message.channel.id
+        self.author_id = message.author.id
+        self.author_name = str(message.author)
+        self.avatar_url = message.author.display_avatar.url
+        self.attachments: List[str] = [a.url for a in message.attachments]
+        self.created_at = message.created_at.timestamp()
+        self.compressed = False
+        self.set_content(message.content, compress_threshold)
+
+    def set_content(self, content: str, compress_threshold: Optional[int]):
+        data = content.encode("utf-8")
+        self.compressed = False
+        if compress_threshold is not None and len(data) >= compress_threshold:
+            packed = zlib.compress(data)
+            if len(packed) < len(data):
+                data = packed
+                self.compressed = True
+        self._content = data
+        self.size = (ENTRY_OVERHEAD + len(data) + len(self.author_name) + len(self.avatar_url) +
+                     sum(len(url) for url in self.attachments))
+
+    @property
+    def content(self) -> str:
+        data = zlib.decompress(self._content) if self.compressed else self._content
+        return data.decode("utf-8")
+
+
+class MessageCache:
+    """LRU cache of recent message content with a byte budget.
+
+    Each channel keeps at most ``per_channel`` messages, so one busy channel
+    cannot push every other channel out of the cache, and the least
+    recently used messages are evicted once the cache holds more than
+    ``max_bytes``. Content of at least ``compress_threshold`` bytes is
+    stored zlib compressed, ``None`` disables compression.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, per_channel: int = 2000,
+                 compress_threshold: Optional[int] = 256):
+        self.max_bytes = max_bytes
+        self.per_channel = per_channel
+        self.compress_threshold = compress_threshold
+        self.entries: OrderedDict = OrderedDict()
+        self.channels: Dict[int, OrderedDict] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, message: discord.Message):
+        self.pop(message.id)
+        entry = CachedMessage(message, self.compress_threshold)
+        self.entries[entry.message_id] = entry
+        channel = self.channels.get(entry.channel_id)
+        if channel is None:
+            channel = self.channels[entry.channel_id] = OrderedDict()
+        channel[entry.message_id] = None
+        self.bytes += entry.size
+
+        if len(channel) > self.per_channel:
+            self._evict(next(iter(channel)))
+        self._shrink()
+
+    def get(self, message_id: int) -> Optional[CachedMessage]:
+        entry = self.entries.get(message_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(message_id)
+        return entry
+
+    def update(self, message_id: int, content: str):
+        """Replace the content of a cached message after an edit."""
+        entry = self.entries.get(message_id)
+        if entry is not None:
+            self.bytes -= entry.size
+            entry.set_content(content, self.compress_threshold)
+            self.bytes += entry.size
+            self.entries.move_to_end(message_id)
+            self._shrink()
+
+    def pop(self, message_id: int) -> Optional[CachedMessage]:
+        entry = self.entries.pop(message_id, None)
+        if entry is not None:
+            self.bytes -= entry.size
+            channel = self.channels[entry.channel_id]
+            del channel[message_id]
+            if not channel:
+                del self.channels[entry.channel_id]
+        return entry
+
+    def _evict(self, message_id: int):
+        self.pop(message_id)
+        self.evictions += 1
+
+    def _shrink(self):
+        """Evict the least recently used messages until the cache fits its byte budget."""
+        while self.bytes > self.max_bytes:
+            self._evict(next(iter(self.entries)))
+
+    def drop_channel(self, channel_id: int):
+        for message_id in list(self.channels.get(channel_id, ())):
+            self.pop(message_id)
+
+    def get_metrics(self) -> Dict:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "channels": len(self.channels),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,40 @@
+from collections import deque
+from typing import Dict
+
+
+class RollingStats:
+    """Rolling window of numeric samples with percentile summaries.
+
+    Only the last ``window`` samples are kept, so memory stays bounded no
+    matter how long the bot runs. ``count`` and ``total`` cover every sample
+    ever added.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, pct: float) -> float:
+        """Return the ``pct`` percentile (0-100) of the current window."""
+        samples = sorted(self.samples)
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(len(samples) * pct / 100))
+        return samples[index]
+
+    def summary(self) -> Dict[str, float]:
+        samples = list(self.samples)
+        return {
+            "count": self.count,
+            "last": samples[-1] if samples else 0.0,
+            "avg": sum(samples) / len(samples) if samples else 0.0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": max(samples) if samples else 0.0,
+        }
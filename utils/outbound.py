@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from enum import IntEnum
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+import discord
+
+from utils.metrics import RollingStats
+
+logger = logging.getLogger(__name__)
+
+# Discord allows at most 10 embeds and 6000 embed characters per message
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+# Idle channel buckets are dropped this often (seconds)
+PRUNE_INTERVAL = 60
+# Sends in flight at once, at most one per channel
+MAX_IN_FLIGHT = 16
+
+
+class Priority(IntEnum):
+    """Send order of outbound messages, lowest value first."""
+    MODERATION = 0
+    REPLY = 1
+    NOTIFICATION = 2
+    DECORATIVE = 3
+
+
+class TokenBucket:
+    """Allows ``capacity`` sends per ``period`` seconds, refilled continuously."""
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def wait_time(self, now: float) -> float:
+        """Return the seconds until a token is available."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        return self.wait_time(now) == 0 and self.tokens >= self.capacity
+
+
+class OutboundMessage:
+    """A message waiting in the dispatcher."""
+
+    __slots__ = ("channel", "content", "kwargs", "priority", "future", "enqueued")
+
+    def __init__(self, channel: discord.abc.Messageable, content: Optional[str],
+                 kwargs: Dict, priority: Priority, future: Optional[asyncio.Future]):
+        self.channel = channel
+        self.content = content
+        self.kwargs = kwargs
+        self.priority = priority
+        self.future = future
+        self.enqueued = time.monotonic()
+
+    @property
+    def mergeable(self) -> bool:
+        """Embed-only messages can be merged into one multi-embed message."""
+        return self.content is None and list(self.kwargs) == ["embeds"]
+
+
+class OutboundDispatcher:
+    """Central queue for messages sent by the cogs.
+
+    Messages are sent in priority order through per-channel and per-route
+    token buckets that mirror Discord's send limits, so a burst of
+    decorative embeds cannot delay moderation notices and a rate limited
+    channel does not hold up the others. Consecutive embed-only messages
+    of the same priority for the same channel are merged into a single
+    multi-embed message. discord.py still handles the real rate limit
+    headers, the buckets only keep the bot from running into them.
+
+    Up to ``MAX_IN_FLIGHT`` sends run concurrently, one per channel so
+    each channel keeps its order, and a send that discord.py retries
+    after a 429 only holds up its own channel.
+    """
+
+    # 5 messages per 5 seconds per channel
+    CHANNEL_LIMIT = (5, 5.0)
+    # Global limit for guild channels, DMs are throttled harder by Discord
+    ROUTE_LIMITS = {"guild": (50, 1.0), "dm": (10, 10.0)}
+
+    def __init__(self):
+        self.queues: List[OrderedDict] = [OrderedDict() for _ in Priority]
+        self.depth = [0] * len(Priority)
+        self.channel_buckets: Dict[int, TokenBucket] = {}
+        self.route_buckets = {route: TokenBucket(*limit)
+                              for route, limit in self.ROUTE_LIMITS.items()}
+        self.wait_times = [RollingStats() for _ in Priority]
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+        self.in_flight: Set[int] = set()
+        self.sends: Set[asyncio.Task] = set()
+        self.last_prune = time.monotonic()
+        self.sent = 0
+        self.merged = 0
+        self.failed = 0
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        for send in self.sends:
+            send.cancel()
+
+    def enqueue(self, channel: discord.abc.Messageable, content: Optional[str] = None, *,
+                priority: Priority = Priority.NOTIFICATION, **kwargs) -> OutboundMessage:
+        """Queue a message without waiting for it, failures are logged."""
+        return self._enqueue(channel, content, priority, kwargs, None)
+
+    async def send(self, channel: discord.abc.Messageable, content: Optional[str] = None, *,
+                   priority: Priority = Priority.REPLY, **kwargs) -> discord.Message:
+        """Queue a message and wait until it is sent.
+
+        Raises whatever ``channel.send`` raised. Merged messages all return
+        the same ``discord.Message``.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(channel, content, priority, kwargs, future)
+        return await future
+
+    def _enqueue(self, channel, content, priority, kwargs, future) -> OutboundMessage:
+        if "embed" in kwargs:
+            embed = kwargs.pop("embed")
+            kwargs["embeds"] = [embed] if embed is not None else []
+        message = OutboundMessage(channel, content, kwargs, Priority(priority), future)
+
+        queues = self.queues[message.priority]
+        pending = queues.get(channel.id)
+        if pending is None:
+            pending = queues[channel.id] = deque()
+        pending.append(message)
+        self.depth[message.priority] += 1
+        self.wakeup.set()
+        return message
+
+    def _route(self, channel) -> str:
+        if isinstance(channel, (discord.DMChannel, discord.abc.User)):
+            return "dm"
+        return "guild"
+
+    def _next(self) -> Tuple[Optional[List[OutboundMessage]], Optional[float]]:
+        """Take the next sendable batch, or return how long to wait for one."""
+        now = time.monotonic()
+        soonest = None
+        for queues in self.queues:
+            for channel_id, pending in queues.items():
+                if channel_id in self.in_flight:
+                    continue
+                bucket = self.channel_buckets.get(channel_id)
+                if bucket is None:
+                    bucket = self.channel_buckets[channel_id] = TokenBucket(*self.CHANNEL_LIMIT)
+                route = self.route_buckets[self._route(pending[0].channel)]
+                wait = max(bucket.wait_time(now), route.wait_time(now))
+                if wait:
+                    soonest = wait if soonest is None else min(soonest, wait)
+                    continue
+
+                bucket.take()
+                route.take()
+                batch = self._take(pending)
+                if pending:
+                    queues.move_to_end(channel_id)
+                else:
+                    del queues[channel_id]
+                return batch, None
+        return None, soonest
+
+    def _take(self, pending: Deque[OutboundMessage]) -> List[OutboundMessage]:
+        batch = [pending.popleft()]
+        if batch[0].mergeable:
+            embeds = len(batch[0].kwargs["embeds"])
+            chars = sum(len(embed) for embed in batch[0].kwargs["embeds"])
+            while pending and pending[0].mergeable:
+                next_embeds = pending[0].kwargs["embeds"]
+                next_chars = sum(len(embed) for embed in next_embeds)
+                if embeds + len(next_embeds) > MAX_EMBEDS or chars + next_chars > MAX_EMBED_CHARS:
+                    break
+                batch.append(pending.popleft())
+                embeds += len(next_embeds)
+                chars += next_chars
+        self.depth[batch[0].priority] -= len(batch)
+        return batch
+
+    async def run(self):
+        while True:
+            await self.slots.acquire()
+            batch, wait = self._next()
+            if batch is None:
+                self.slots.release()
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            channel_id = batch[0].channel.id
+            self.in_flight.add(channel_id)
+            send = asyncio.create_task(self._deliver(batch))
+            self.sends.add(send)
+            send.add_done_callback(lambda task, channel_id=channel_id: self._sent(task, channel_id))
+            if time.monotonic() - self.last_prune > PRUNE_INTERVAL:
+                self._prune()
+
+    def _sent(self, task: asyncio.Task, channel_id: int):
+        self.sends.discard(task)
+        self.in_flight.discard(channel_id)
+        self.slots.release()
+        # The channel may have more messages queued
+        self.wakeup.set()
+
+    async def _deliver(self, batch: List[OutboundMessage]):
+        first = batch[0]
+        if len(batch) == 1:
+            kwargs = first.kwargs
+        else:
+            kwargs = {"embeds": [embed for message in batch for embed in message.kwargs["embeds"]]}
+            self.merged += len(batch) - 1
+
+        now = time.monotonic()
+        for message in batch:
+            self.wait_times[message.priority].add((now - message.enqueued) * 1000)
+
+        try:
+            result = await first.channel.send(first.content, **kwargs)
+        except Exception as e:
+            self.failed += 1
+            if not all(message.future for message in batch):
+                logger.error(f"Error sending queued message to {first.channel}: {e}")
+            for message in batch:
+                if message.future and not message.future.done():
+                    message.future.set_exception(e)
+            return
+
+        self.sent += 1
+        for message in batch:
+            if message.future and not message.future.done():
+                message.future.set_result(result)
+
+    def _prune(self):
+        """Drop the buckets of channels that have been idle long enough to refill."""
+        now = time.monotonic()
+        waiting = {channel_id for queues in self.queues for channel_id in queues}
+        self.channel_buckets = {
+            channel_id: bucket for channel_id, bucket in self.channel_buckets.items()
+            if channel_id in waiting or not bucket.is_full(now)
+        }
+        self.last_prune = now
+
+    def get_metrics(self) -> Dict:
+        return {
+            "queue_depth": sum(self.depth),
+            "queue_depth_by_priority": {priority.name.lower(): self.depth[priority]
+                                        for priority in Priority},
+            "channels_waiting": sum(len(queues) for queues in self.queues),
+            "in_flight": len(self.in_flight),
+            "sent": self.sent,
+            "merged": self.merged,
+            "failed": self.failed,
+            "wait_ms": {priority.name.lower(): self.wait_times[priority].summary()
+                        for priority in Priority}
+        }
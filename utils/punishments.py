@@ -0,0 +1,208 @@
+import asyncio
+import heapq
+import json
+import logging
+import os
+import re
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DURATION_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+DURATION_PATTERN = re.compile(r"(\d+)([smhdw])")
+
+Key = Tuple[str, int, int]
+
+# Lifts that failed are retried after RETRY_DELAY seconds, doubling up to MAX_RETRY_DELAY
+RETRY_DELAY = 30
+MAX_RETRY_DELAY = 3600
+
+
+def parse_duration(text: str) -> timedelta:
+    """Parse durations like ``30m``, ``12h`` or ``1d12h``."""
+    text = text.lower()
+    matches = DURATION_PATTERN.findall(text)
+    if not matches or DURATION_PATTERN.sub("", text).strip():
+        raise ValueError(f"Invalid duration: {text}")
+    delta = timedelta()
+    for value, unit in matches:
+        delta += timedelta(**{DURATION_UNITS[unit]: int(value)})
+    return delta
+
+
+class Punishment:
+    """A ban or mute lifted at ``expires``, an epoch timestamp.
+
+    ``due`` is when lifting it is next attempted, later than ``expires``
+    after failed attempts.
+    """
+
+    __slots__ = ("kind", "guild_id", "user_id", "expires", "reason", "moderator_id",
+                 "due", "attempts")
+
+    def __init__(self, kind: str, guild_id: int, user_id: int, expires: float,
+                 reason: str = "", moderator_id: Optional[int] = None):
+        self.kind = kind
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.expires = expires
+        self.reason = reason
+        self.moderator_id = moderator_id
+        self.due = expires
+        self.attempts = 0
+
+    @property
+    def key(self) -> Key:
+        return self.kind, self.guild_id, self.user_id
+
+    def to_data(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "guild_id": self.guild_id,
+            "user_id": self.user_id,
+            "expires": self.expires,
+            "reason": self.reason,
+            "moderator_id": self.moderator_id
+        }
+
+    @classmethod
+    def from_data(cls, data: Dict) -> "Punishment":
+        return cls(data["kind"], data["guild_id"], data["user_id"], data["expires"],
+                   data.get("reason", ""), data.get("moderator_id"))
+
+
+class PunishmentScheduler:
+    """Lifts timed punishments when they expire.
+
+    Expirations sit in a min-heap and a single task sleeps until the
+    earliest one, so pending punishments cost nothing until they are due.
+    Scheduling an earlier expiry wakes the task to sleep again. Replaced
+    and cancelled punishments stay in the heap and are skipped when
+    popped. Everything due at once, such as what expired while the bot
+    was offline, is passed to ``on_expire`` in one batch.
+
+    ``on_expire`` returns the punishments it could not lift. They stay
+    saved and are retried with a growing delay, a punishment is only
+    forgotten once it has been lifted.
+    """
+
+    def __init__(self, path: str,
+                 on_expire: Callable[[List[Punishment]], Awaitable[List[Punishment]]]):
+        self.path = path
+        self.on_expire = on_expire
+        self.active: Dict[Key, Punishment] = {}
+        self.heap: List[Tuple[float, Key]] = []
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.save_lock = asyncio.Lock()
+
+    def start(self):
+        """Load the saved punishments and start waiting for the next expiry."""
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    for data in json.load(f):
+                        punishment = Punishment.from_data(data)
+                        self.active[punishment.key] = punishment
+            except (json.JSONDecodeError, KeyError) as e:
+                logger.error(f"Error loading punishments: {e}")
+        self.heap = [(punishment.due, key) for key, punishment in self.active.items()]
+        heapq.heapify(self.heap)
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await self.save()
+
+    def get(self, kind: str, guild_id: int, user_id: int) -> Optional[Punishment]:
+        return self.active.get((kind, guild_id, user_id))
+
+    def guild_punishments(self, guild_id: int) -> List[Punishment]:
+        return sorted((punishment for punishment in self.active.values()
+                       if punishment.guild_id == guild_id), key=lambda p: p.expires)
+
+    async def schedule(self, punishment: Punishment):
+        """Add a punishment, replacing the same kind of punishment of the user."""
+        self.active[punishment.key] = punishment
+        self._push(punishment)
+        await self.save()
+
+    async def cancel(self, kind: str, guild_id: int, user_id: int) -> Optional[Punishment]:
+        """Drop a punishment without lifting it."""
+        punishment = self.active.pop((kind, guild_id, user_id), None)
+        if punishment is not None:
+            await self.save()
+        return punishment
+
+    def _push(self, punishment: Punishment):
+        if not self.heap or punishment.due < self.heap[0][0]:
+            self.wakeup.set()
+        heapq.heappush(self.heap, (punishment.due, punishment.key))
+
+    def pop_due(self, now: float) -> List[Punishment]:
+        """Return the punishments due by ``now``, they stay active until lifted."""
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            time_due, key = heapq.heappop(self.heap)
+            punishment = self.active.get(key)
+            # Stale entry of a cancelled or rescheduled punishment
+            if punishment is None or punishment.due != time_due:
+                continue
+            due.append(punishment)
+        if len(self.heap) > 2 * len(self.active) + 64:
+            self.heap = [(punishment.due, key) for key, punishment in self.active.items()]
+            heapq.heapify(self.heap)
+        return due
+
+    def _finish(self, due: List[Punishment], failed: List[Punishment]):
+        failed = {id(punishment) for punishment in failed}
+        for punishment in due:
+            # Cancelled or replaced while it was being lifted
+            if self.active.get(punishment.key) is not punishment:
+                continue
+            if id(punishment) not in failed:
+                del self.active[punishment.key]
+                continue
+            punishment.attempts += 1
+            punishment.due = time.time() + min(
+                RETRY_DELAY * 2 ** (punishment.attempts - 1), MAX_RETRY_DELAY)
+            self._push(punishment)
+
+    async def _run(self):
+        while True:
+            self.wakeup.clear()
+            due = self.pop_due(time.time())
+            if due:
+                try:
+                    failed = await self.on_expire(due)
+                except Exception as e:
+                    logger.error(f"Error lifting {len(due)} punishments: {e}")
+                    failed = due
+                if failed:
+                    logger.warning(f"Cannot lift {len(failed)} punishments yet, retrying later")
+                self._finish(due, failed)
+                await self.save()
+                continue
+
+            timeout = self.heap[0][0] - time.time() if self.heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def save(self):
+        async with self.save_lock:
+            content = json.dumps([punishment.to_data() for punishment in self.active.values()])
+            await asyncio.to_thread(self._write, content)
+
+    def _write(self, content: str):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(content)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,121 @@
+import re
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Joins scoring at least this much count as suspicious
+SUSPICIOUS_SCORE = 3
+
+SKELETON_PATTERN = re.compile(r"[\d\W_]+")
+
+
+def name_skeleton(name: str) -> str:
+    """Reduce a name to its letters, so "raider_123" and "Raider.77" collide."""
+    return SKELETON_PATTERN.sub("", name.casefold())[:16]
+
+
+class GuildJoins:
+    """Joins of one guild within the detection window."""
+
+    __slots__ = ("joins", "names", "avatars", "suspicious")
+
+    def __init__(self):
+        # (time, member_id, name skeleton, avatar key, suspicious)
+        self.joins: Deque[Tuple[float, int, str, Optional[str], bool]] = deque()
+        self.names: Counter = Counter()
+        self.avatars: Counter = Counter()
+        self.suspicious = 0
+
+
+class RaidDetector:
+    """Sliding-window join rate and suspicion scoring per guild.
+
+    A guild is raided once ``threshold`` members joined within ``window``
+    seconds, or half as many suspicious accounts did. Accounts are scored
+    by age, by having no avatar, and by sharing a name skeleton or avatar
+    with ``cluster_size`` recent joins. Recording a join is O(1).
+    """
+
+    def __init__(self, threshold: int = 10, window: float = 30.0,
+                 new_account_days: float = 7, cluster_size: int = 3):
+        self.threshold = threshold
+        self.window = window
+        self.new_account_days = new_account_days
+        self.cluster_size = cluster_size
+        self.guilds: Dict[int, GuildJoins] = {}
+
+    def _expire(self, guild: GuildJoins, now: float):
+        cutoff = now - self.window
+        joins = guild.joins
+        while joins and joins[0][0] < cutoff:
+            _, _, skeleton, avatar, suspicious = joins.popleft()
+            _decrement(guild.names, skeleton)
+            if avatar:
+                _decrement(guild.avatars, avatar)
+            guild.suspicious -= suspicious
+
+    def score(self, member, guild: GuildJoins, skeleton: str, avatar: Optional[str]) -> int:
+        score = 0
+        age_days = (datetime.now(timezone.utc) - member.created_at).total_seconds() / 86400
+        if age_days < 1:
+            score += 2
+        elif age_days < self.new_account_days:
+            score += 1
+        if avatar is None:
+            score += 1
+        if skeleton and guild.names[skeleton] + 1 >= self.cluster_size:
+            score += 2
+        if avatar and guild.avatars[avatar] + 1 >= self.cluster_size:
+            score += 2
+        return score
+
+    def record(self, member, now: Optional[float] = None) -> Tuple[int, bool]:
+        """Record a join, returns its suspicion score and whether the guild is raided."""
+        now = time.monotonic() if now is None else now
+        guild = self.guilds.get(member.guild.id)
+        if guild is None:
+            guild = self.guilds[member.guild.id] = GuildJoins()
+        self._expire(guild, now)
+
+        skeleton = name_skeleton(member.name)
+        avatar = member.avatar.key if member.avatar else None
+        score = self.score(member, guild, skeleton, avatar)
+        suspicious = score >= SUSPICIOUS_SCORE
+
+        guild.joins.append((now, member.id, skeleton, avatar, suspicious))
+        guild.names[skeleton] += 1
+        if avatar:
+            guild.avatars[avatar] += 1
+        guild.suspicious += suspicious
+
+        return score, self.is_raided(guild)
+
+    def is_raided(self, guild: GuildJoins) -> bool:
+        return (len(guild.joins) >= self.threshold or
+                guild.suspicious >= max(self.threshold // 2, 2))
+
+    def still_raided(self, guild_id: int, now: Optional[float] = None) -> bool:
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            return False
+        self._expire(guild, time.monotonic() if now is None else now)
+        return self.is_raided(guild)
+
+    def recent_members(self, guild_id: int) -> List[int]:
+        """Return the IDs of the members that joined within the window."""
+        guild = self.guilds.get(guild_id)
+        return [join[1] for join in guild.joins] if guild else []
+
+    def prune(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        for guild_id, guild in list(self.guilds.items()):
+            self._expire(guild, now)
+            if not guild.joins:
+                del self.guilds[guild_id]
+
+
+def _decrement(counter: Counter, key):
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
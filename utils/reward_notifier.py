@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import discord
+
+from utils.outbound import OutboundDispatcher, Priority
+
+logger = logging.getLogger(__name__)
+
+
+class Digest:
+    """Reward events of one user waiting to be sent."""
+
+    __slots__ = ("member", "channel", "events", "image")
+
+    def __init__(self, member: discord.Member):
+        self.member = member
+        self.channel: Optional[discord.abc.Messageable] = None
+        self.events: List[Tuple[str, str, discord.Color]] = []
+        self.image = False
+
+
+class RewardNotifier:
+    """Coalesces reward notifications into one message per user.
+
+    Every event of a user within ``window`` seconds is merged into a single
+    digest embed. Digests with a public event (a level up) go to the channel
+    the event happened in, the rest are sent by DM, falling back to a cached
+    announcement channel of the guild when the user has DMs closed. Digests
+    are handed to the bot's ``OutboundDispatcher`` from one queue at no more
+    than ``rate`` messages per second.
+    """
+
+    def __init__(self, outbound: OutboundDispatcher, window: float = 3.0, rate: float = 5.0,
+                 image_provider: Optional[Callable[[], Awaitable[str]]] = None,
+                 cache_size: int = 10000, dm_closed_ttl: float = 6 * 3600):
+        self.outbound = outbound
+        self.window = window
+        self.send_interval = 1 / rate
+        self.image_provider = image_provider
+        self.cache_size = cache_size
+        self.dm_closed_ttl = dm_closed_ttl
+        self.pending: Dict[int, Digest] = {}
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.dm_channels: OrderedDict = OrderedDict()
+        self.dm_closed: OrderedDict = OrderedDict()
+        self.announce_channels: Dict[int, int] = {}
+        self.sender_task: Optional[asyncio.Task] = None
+        self.events_received = 0
+        self.messages_sent = 0
+        self.dm_fallbacks = 0
+
+    def start(self):
+        if self.sender_task is None:
+            self.sender_task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.sender_task:
+            self.sender_task.cancel()
+            self.sender_task = None
+
+    def notify(self, member: discord.Member, title: str, text: str,
+               color: discord.Color = None, channel: discord.abc.Messageable = None,
+               image: bool = False):
+        """Queue a reward event for ``member``.
+
+        Passing ``channel`` makes the digest public in that channel.
+        """
+        digest = self.pending.get(member.id)
+        if digest is None:
+            digest = self.pending[member.id] = Digest(member)
+            asyncio.get_running_loop().call_later(
+                self.window, self._flush, member.id)
+
+        digest.events.append((title, text, color or discord.Color.gold()))
+        if channel is not None:
+            digest.channel = channel
+        digest.image = digest.image or image
+        self.events_received += 1
+
+    def _flush(self, user_id: int):
+        digest = self.pending.pop(user_id, None)
+        if digest is not None:
+            self.queue.put_nowait(digest)
+
+    async def run(self):
+        while True:
+            digest = await self.queue.get()
+            try:
+                await self.deliver(digest)
+            except Exception as e:
+                logger.error(f"Error sending reward digest: {e}")
+            await asyncio.sleep(self.send_interval)
+
+    async def build_embed(self, digest: Digest) -> discord.Embed:
+        if len(digest.events) == 1:
+            title, text, color = digest.events[0]
+            embed = discord.Embed(title=title, description=text, color=color)
+        else:
+            embed = discord.Embed(
+                title="🎉 Rewards Unlocked! 🎉",
+                description=f"Congratulations {digest.member.mention}!",
+                color=digest.events[-1][2]
+            )
+            for title, text, _ in digest.events[:25]:
+                embed.add_field(name=title, value=text, inline=False)
+
+        if digest.image and self.image_provider:
+            try:
+                image_url = await self.image_provider()
+                if image_url:
+                    embed.set_image(url=image_url)
+            except Exception as e:
+                logger.error(f"Error getting random image: {e}")
+        return embed
+
+    async def deliver(self, digest: Digest):
+        embed = await self.build_embed(digest)
+        member = digest.member
+
+        if digest.channel is not None:
+            self.outbound.enqueue(digest.channel, embed=embed, priority=Priority.NOTIFICATION)
+            self.messages_sent += 1
+            return
+
+        if not self.is_dm_closed(member.id):
+            try:
+                channel = await self.get_dm_channel(member)
+                await self.outbound.send(channel, embed=embed, priority=Priority.NOTIFICATION)
+                self.messages_sent += 1
+                return
+            except discord.Forbidden:
+                self._remember(self.dm_closed, member.id,
+                               time.monotonic() + self.dm_closed_ttl)
+
+        channel = self.get_announce_channel(member.guild)
+        if channel is not None:
+            try:
+                await self.outbound.send(channel, member.mention, embed=embed,
+                                         priority=Priority.NOTIFICATION)
+            except discord.Forbidden:
+                self.announce_channels.pop(member.guild.id, None)
+                raise
+            self.messages_sent += 1
+            self.dm_fallbacks += 1
+
+    def is_dm_closed(self, user_id: int) -> bool:
+        expires = self.dm_closed.get(user_id)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self.dm_closed[user_id]
+            return False
+        return True
+
+    async def get_dm_channel(self, member: discord.Member) -> discord.DMChannel:
+        channel = self.dm_channels.get(member.id) or member.dm_channel
+        if channel is None:
+            channel = await member.create_dm()
+        self._remember(self.dm_channels, member.id, channel)
+        return channel
+
+    def get_announce_channel(self, guild: Optional[discord.Guild]) -> Optional[discord.TextChannel]:
+        """Return the cached fallback channel of a guild."""
+        if guild is None:
+            return None
+
+        channel = guild.get_channel(self.announce_channels.get(guild.id, 0))
+        if channel is None:
+            candidates = [guild.system_channel] + list(guild.text_channels)
+            channel = next((c for c in candidates
+                            if c is not None and c.permissions_for(guild.me).send_messages), None)
+            if channel is None:
+                return None
+            self.announce_channels[guild.id] = channel.id
+        return channel
+
+    def _remember(self, cache: OrderedDict, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def get_metrics(self) -> Dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "pending_users": len(self.pending),
+            "events": self.events_received,
+            "messages_sent": self.messages_sent,
+            "dm_fallbacks": self.dm_fallbacks,
+            "dm_closed_cached": len(self.dm_closed)
+        }
@@ -0,0 +1,134 @@
+from typing import Dict, List, Tuple
+
+
+class GuildRoles:
+    """Compiled role lookups of one guild."""
+
+    __slots__ = ("multipliers", "rewards")
+
+    def __init__(self, multipliers: Dict[int, float], rewards: Dict[int, int]):
+        self.multipliers = multipliers
+        # (level, role_id) pairs sorted by level
+        self.rewards: List[Tuple[int, int]] = sorted(rewards.items())
+
+
+class RoleRewardResolver:
+    """Per-guild role ID lookups for XP multipliers and level reward roles.
+
+    Guilds listed in ``config`` are configured by role ID. Other guilds fall
+    back to resolving the default role names once, and are rebuilt whenever a
+    role with one of those names is created, renamed or deleted.
+
+    ``config`` is the persisted mapping of
+    ``{guild_id: {"multipliers": {role_id: multiplier}, "rewards": {level: role_id}}}``
+    with string keys, as stored in JSON.
+    """
+
+    def __init__(self, config: Dict[str, Dict], default_rewards: Dict[int, str], default_multipliers: Dict[str, float]):
+        self.config = config
+        self.default_rewards = default_rewards
+        self.default_multipliers = default_multipliers
+        self.default_names = set(default_rewards.values()) | set(default_multipliers)
+        self._guilds: Dict[int, GuildRoles] = {}
+
+    def get(self, guild) -> GuildRoles:
+        roles = self._guilds.get(guild.id)
+        if roles is None:
+            roles = self._guilds[guild.id] = self._build(guild)
+        return roles
+
+    def _build(self, guild) -> GuildRoles:
+        data = self.config.get(str(guild.id))
+        if data is None:
+            by_name = {role.name: role.id for role in guild.roles}
+            multipliers = {by_name[name]: multiplier
+                           for name, multiplier in self.default_multipliers.items()
+                           if name in by_name}
+            rewards = {level: by_name[name]
+                       for level, name in self.default_rewards.items()
+                       if name in by_name}
+        else:
+            multipliers = {int(role_id): float(multiplier)
+                           for role_id, multiplier in data.get("multipliers", {}).items()}
+            rewards = {int(level): int(role_id)
+                       for level, role_id in data.get("rewards", {}).items()}
+        return GuildRoles(multipliers, rewards)
+
+    def is_configured(self, guild_id: int) -> bool:
+        return str(guild_id) in self.config
+
+    def invalidate(self, guild_id: int):
+        self._guilds.pop(guild_id, None)
+
+    def multiplier(self, member) -> float:
+        """Return the highest XP multiplier among the member's roles."""
+        multipliers = self.get(member.guild).multipliers
+        if not multipliers:
+            return 1.0
+        return max((multiplier for role_id, multiplier in multipliers.items()
+                    if member.get_role(role_id) is not None), default=1.0)
+
+    def reward_roles(self, guild, level: int) -> List:
+        """Return the reward roles unlocked at ``level``, lowest tier first."""
+        roles = []
+        for req_level, role_id in self.get(guild).rewards:
+            if req_level > level:
+                break
+            role = guild.get_role(role_id)
+            if role is not None:
+                roles.append(role)
+        return roles
+
+    def configure(self, guild) -> Dict:
+        """Return the persisted config of a guild, creating it from the current lookups."""
+        key = str(guild.id)
+        if key not in self.config:
+            roles = self.get(guild)
+            self.config[key] = {
+                "multipliers": {str(role_id): multiplier
+                                for role_id, multiplier in roles.multipliers.items()},
+                "rewards": {str(level): role_id for level, role_id in roles.rewards}
+            }
+        return self.config[key]
+
+    def set_multiplier(self, guild, role_id: int, multiplier: float):
+        """Set the XP multiplier of a role, a multiplier of 1 removes it."""
+        multipliers = self.configure(guild)["multipliers"]
+        if multiplier == 1:
+            multipliers.pop(str(role_id), None)
+        else:
+            multipliers[str(role_id)] = multiplier
+        self.invalidate(guild.id)
+
+    def set_reward(self, guild, level: int, role_id: int = None):
+        """Set the reward role of a level, ``None`` removes the reward."""
+        rewards = self.configure(guild)["rewards"]
+        if role_id is None:
+            rewards.pop(str(level), None)
+        else:
+            rewards[str(level)] = role_id
+        self.invalidate(guild.id)
+
+    def role_changed(self, role, old_name: str = None):
+        """Invalidate a name-resolved guild if a default role name is affected."""
+        if self.is_configured(role.guild.id):
+            return
+        if role.name in self.default_names or old_name in self.default_names:
+            self.invalidate(role.guild.id)
+
+    def role_deleted(self, role) -> bool:
+        """Drop a deleted role from the lookups.
+
+        Returns True if the persisted config changed.
+        """
+        self.invalidate(role.guild.id)
+        data = self.config.get(str(role.guild.id))
+        if data is None:
+            return False
+
+        changed = data["multipliers"].pop(str(role.id), None) is not None
+        for level, role_id in list(data["rewards"].items()):
+            if role_id == role.id:
+                del data["rewards"][level]
+                changed = True
+        return changed
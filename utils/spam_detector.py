@@ -0,0 +1,148 @@
+import time
+from array import array
+from typing import Dict, Hashable, Iterator, List, Optional, Set
+
+SCOPES = ("user", "channel", "guild")
+
+
+class RingBuffer:
+    """The last ``limit`` event times of one key."""
+
+    __slots__ = ("times", "pos")
+
+    def __init__(self, limit: int):
+        # Empty slots are infinitely old, so they never fall inside a window
+        self.times = array('d', [float('-inf')]) * limit
+        self.pos = 0
+
+    def add(self, now: float, window: float) -> bool:
+        """Record an event, returns True if it is over ``limit`` events within ``window``."""
+        oldest = self.times[self.pos]
+        self.times[self.pos] = now
+        self.pos += 1
+        if self.pos == len(self.times):
+            self.pos = 0
+        return now - oldest <= window
+
+    def reset(self):
+        self.times = array('d', [float('-inf')]) * len(self.times)
+        self.pos = 0
+
+
+class SpamRule:
+    """At most ``limit`` messages per ``window`` seconds for each key of a scope."""
+
+    __slots__ = ("scope", "limit", "window", "rings")
+
+    def __init__(self, scope: str, limit: int, window: float):
+        if scope not in SCOPES:
+            raise ValueError(f"Unknown spam rule scope: {scope}")
+        self.scope = scope
+        self.limit = max(int(limit), 1)
+        self.window = window
+        self.rings: Dict[Hashable, RingBuffer] = {}
+
+    def __repr__(self):
+        return f"{self.limit} per {self.window:g}s per {self.scope}"
+
+
+class TimerWheel:
+    """Finds keys that have not been touched for ``horizon`` seconds.
+
+    Every key sits in the slot of the tick it was last touched in, so
+    touching and expiring keys is O(1) per key.
+    """
+
+    def __init__(self, horizon: float, tick: float = 1.0):
+        self.tick = tick
+        self.horizon_ticks = int(horizon // tick) + 1
+        self.slots: List[Set[Hashable]] = [set() for _ in range(self.horizon_ticks + 1)]
+        self.key_ticks: Dict[Hashable, int] = {}
+        self.expired_tick = int(time.monotonic() // tick)
+
+    def __len__(self):
+        return len(self.key_ticks)
+
+    def touch(self, key: Hashable, now: float):
+        tick = int(now // self.tick)
+        old = self.key_ticks.get(key)
+        if old == tick:
+            return
+        if old is not None:
+            self.slots[old % len(self.slots)].discard(key)
+        self.slots[tick % len(self.slots)].add(key)
+        self.key_ticks[key] = tick
+
+    def expire(self, now: float) -> Iterator[Hashable]:
+        """Yield and forget the keys idle for longer than the horizon."""
+        last = int(now // self.tick) - self.horizon_ticks
+        # After a long gap every slot is stale, visit each one once
+        first = max(self.expired_tick + 1, last - len(self.slots) + 1)
+        for tick in range(first, last + 1):
+            slot = self.slots[tick % len(self.slots)]
+            for key in list(slot):
+                if self.key_ticks[key] <= last:
+                    slot.discard(key)
+                    del self.key_ticks[key]
+                    yield key
+        self.expired_tick = max(self.expired_tick, last)
+
+
+class SpamDetector:
+    """Multi-window spam detection over users, channels and guilds.
+
+    Each rule keeps a fixed size ring buffer of monotonic timestamps per
+    key, so checking a message is O(number of rules). Keys idle for longer
+    than the longest window are evicted through a timer wheel, which
+    bounds memory to the recently active users and channels.
+    """
+
+    def __init__(self, rules: List[SpamRule]):
+        self.rules = rules
+        horizon = max((rule.window for rule in rules), default=1)
+        self.wheel = TimerWheel(horizon)
+        self.checks = 0
+        self.violations = 0
+        self.evictions = 0
+
+    def check(self, guild_id: int, channel_id: int, user_id: int,
+              now: Optional[float] = None) -> List[SpamRule]:
+        """Record a message and return the rules it broke.
+
+        A broken rule starts counting from zero again for that key, so one
+        burst is reported once.
+        """
+        now = time.monotonic() if now is None else now
+        keys = {"user": (guild_id, user_id), "channel": channel_id, "guild": guild_id}
+        broken = []
+        for rule in self.rules:
+            key = keys[rule.scope]
+            ring = rule.rings.get(key)
+            if ring is None:
+                ring = rule.rings[key] = RingBuffer(rule.limit)
+            if ring.add(now, rule.window):
+                ring.reset()
+                broken.append(rule)
+
+        for scope, key in keys.items():
+            self.wheel.touch((scope, key), now)
+        self.evict(now)
+
+        self.checks += 1
+        self.violations += len(broken)
+        return broken
+
+    def evict(self, now: float):
+        for scope, key in self.wheel.expire(now):
+            for rule in self.rules:
+                if rule.scope == scope:
+                    rule.rings.pop(key, None)
+            self.evictions += 1
+
+    def get_metrics(self) -> Dict:
+        return {
+            "tracked_keys": len(self.wheel),
+            "checks": self.checks,
+            "violations": self.violations,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,131 @@
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.daily_tasks import SECONDS_PER_DAY, TASK_TYPES
+
+
+def to_epoch(value: Any) -> int:
+    """Convert a stored timestamp (epoch number or naive UTC ISO string) to epoch seconds."""
+    if not value:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def to_epoch_day(value: Any) -> int:
+    """Convert a stored timestamp to a UTC day number."""
+    return to_epoch(value) // SECONDS_PER_DAY
+
+
+class UserTable:
+    """Struct-of-arrays storage for per-user Levels data.
+
+    Each user ID is interned to a row index the first time it is seen, and
+    every field is a typed ``array`` column indexed by that row, so a user
+    costs a few bytes per field instead of a dict of strings. Timestamps are
+    epoch seconds, streak days are UTC day numbers and achievements are a
+    bitmask over ``Achievements.ACHIEVEMENTS``.
+
+    Row indexes move when a user is removed, so they must not be kept across
+    an ``await``.
+    """
+
+    COLUMNS: Dict[str, str] = {
+        "xp": "q",
+        "level": "i",
+        "total_messages": "q",
+        "last_message": "q",
+        "karma": "q",
+        "achievements": "q",
+        "current_streak": "i",
+        "longest_streak": "i",
+        "last_active_day": "i",
+        "task_day": "i",
+        "task_done": "i",
+        **{f"task_{metric}": "i" for metric in TASK_TYPES},
+    }
+
+    def __init__(self):
+        self.index: Dict[int, int] = {}
+        self.ids = array('q')
+        for name, typecode in self.COLUMNS.items():
+            setattr(self, name, array(typecode))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.index
+
+    def row(self, user_id: int) -> Optional[int]:
+        """Return the row of a user, or None if the user is unknown."""
+        return self.index.get(user_id)
+
+    def ensure(self, user_id: int) -> int:
+        """Return the row of a user, appending an empty row if needed."""
+        row = self.index.get(user_id)
+        if row is None:
+            row = len(self.ids)
+            self.index[user_id] = row
+            self.ids.append(user_id)
+            for _, column in self.columns():
+                column.append(0)
+        return row
+
+    def remove(self, user_id: int) -> bool:
+        """Remove a user by moving the last row into its place."""
+        row = self.index.pop(user_id, None)
+        if row is None:
+            return False
+
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self.ids[row] = moved
+            for _, column in self.columns():
+                column[row] = column[last]
+            self.index[moved] = row
+
+        self.ids.pop()
+        for _, column in self.columns():
+            column.pop()
+        return True
+
+    def columns(self) -> Iterator[Tuple[str, array]]:
+        for name in self.COLUMNS:
+            yield name, getattr(self, name)
+
+    def fill(self, name: str, value: int = 0):
+        """Set every row of a column to ``value`` in a single C-level copy."""
+        column = getattr(self, name)
+        column[:] = array(column.typecode, [value]) * len(column)
+
+    def snapshot(self) -> Dict[str, List[int]]:
+        """Return a JSON-serializable copy of the table."""
+        data = {"ids": self.ids.tolist()}
+        for name, column in self.columns():
+            data[name] = column.tolist()
+        return data
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, List[int]]) -> "UserTable":
+        """Rebuild a table from ``snapshot`` output.
+
+        Columns that are missing (for example after a new column is added)
+        are filled with zeros.
+        """
+        table = cls()
+        table.ids = array('q', data.get("ids", []))
+        size = len(table.ids)
+        for name, typecode in cls.COLUMNS.items():
+            values = data.get(name)
+            if values is None or len(values) != size:
+                values = bytes(array(typecode).itemsize * size)
+            setattr(table, name, array(typecode, values))
+        table.index = {user_id: row for row, user_id in enumerate(table.ids)}
+        return table
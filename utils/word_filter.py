@@ -0,0 +1,185 @@
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+GLOBAL_KEY = "global"
+
+ZERO_WIDTH = "\u00ad\u034f\u180e\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\u2064\ufeff"
+
+# Look-alike letters from other scripts that survive NFKD
+CONFUSABLES = {
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h", "о": "o",
+    "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "і": "i", "ј": "j", "ѕ": "s",
+    "ԁ": "d", "ɡ": "g", "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k",
+    "ν": "v", "ο": "o", "ρ": "p", "τ": "t", "υ": "u", "χ": "x", "ω": "w", "ł": "l",
+    "ø": "o", "đ": "d", "ß": "ss", "æ": "ae", "œ": "oe",
+}
+
+LEETSPEAK = {
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "9": "g",
+    "@": "a", "$": "s", "!": "i", "|": "l", "+": "t", "€": "e",
+}
+
+TRANSLATION = str.maketrans({
+    **{char: None for char in ZERO_WIDTH},
+    **CONFUSABLES,
+})
+LEET_TRANSLATION = str.maketrans(LEETSPEAK)
+
+
+def normalize(text: str) -> str:
+    """Fold text to plain lowercase letters for matching.
+
+    Strips accents and zero-width characters and maps look-alike letters
+    to the letters they imitate.
+    """
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return text.translate(TRANSLATION)
+
+
+def unleet(text: str) -> str:
+    """Map leetspeak in normalized text to letters."""
+    return text.translate(LEET_TRANSLATION)
+
+
+def parse_entry(entry: str) -> Tuple[str, bool, bool]:
+    """Return (pattern, match_start, match_end) of a filter entry.
+
+    Plain entries only match whole words, a leading or trailing ``*``
+    lets the word continue on that side (``bad*`` matches "badly").
+    """
+    starts = not entry.startswith("*")
+    ends = not entry.endswith("*")
+    return unleet(normalize(entry.strip("*"))), starts, ends
+
+
+class Automaton:
+    """Aho-Corasick automaton over the normalized filter entries.
+
+    Matching a text is linear in its length, however many entries there are.
+    """
+
+    def __init__(self, entries: Iterable[str]):
+        self.entries: List[str] = []
+        self.patterns: List[Tuple[str, bool, bool]] = []
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[int]] = [[]]
+
+        for entry in entries:
+            pattern = parse_entry(entry)
+            if not pattern[0]:
+                continue
+            self.entries.append(entry)
+            self.patterns.append(pattern)
+            self._insert(pattern[0], len(self.patterns) - 1)
+        self._link()
+
+    def _insert(self, word: str, index: int):
+        node = 0
+        for char in word:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = self.goto[node][char] = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = next_node
+        self.out[node].append(index)
+
+    def _link(self):
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, child in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                self.out[child] += self.out[self.fail[child]]
+                queue.append(child)
+
+    def match(self, text: str) -> Optional[str]:
+        """Return the first entry found in already normalized ``text``."""
+        goto, fail, out, patterns = self.goto, self.fail, self.out, self.patterns
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for index in out[node]:
+                word, starts, ends = patterns[index]
+                start = end - len(word) + 1
+                if starts and start > 0 and text[start - 1].isalnum():
+                    continue
+                if ends and end + 1 < len(text) and text[end + 1].isalnum():
+                    continue
+                return self.entries[index]
+        return None
+
+
+class WordFilter:
+    """Per-guild filter word lists compiled into Aho-Corasick automata.
+
+    Entries under ``GLOBAL_KEY`` apply to every guild. A guild's automaton
+    is compiled on first use and rebuilt after its list changes.
+    """
+
+    def __init__(self, words: Dict[str, List[str]] = None):
+        self.words: Dict[str, set] = {key: set(entries) for key, entries in (words or {}).items()}
+        self._automata: Dict[int, Automaton] = {}
+
+    @classmethod
+    def from_data(cls, data: Union[Dict[str, List[str]], List[str]]) -> "WordFilter":
+        # Older versions stored one list for every guild
+        if isinstance(data, list):
+            data = {GLOBAL_KEY: data}
+        return cls(data)
+
+    def to_data(self) -> Dict[str, List[str]]:
+        return {key: sorted(entries) for key, entries in self.words.items() if entries}
+
+    def entries(self, guild_id: int) -> List[str]:
+        return sorted(self.words.get(str(guild_id), set()) | self.words.get(GLOBAL_KEY, set()))
+
+    def add(self, guild_id: int, entry: str):
+        self.words.setdefault(str(guild_id), set()).add(entry.lower())
+        self._automata.pop(guild_id, None)
+
+    def remove(self, guild_id: int, entry: str) -> bool:
+        """Remove an entry from the guild's list, global entries are left alone."""
+        entries = self.words.get(str(guild_id))
+        if not entries or entry.lower() not in entries:
+            return False
+        entries.discard(entry.lower())
+        self._automata.pop(guild_id, None)
+        return True
+
+    def add_global(self, entry: str):
+        self.words.setdefault(GLOBAL_KEY, set()).add(entry.lower())
+        # Global entries affect every guild
+        self._automata.clear()
+
+    def remove_global(self, entry: str) -> bool:
+        entries = self.words.get(GLOBAL_KEY)
+        if not entries or entry.lower() not in entries:
+            return False
+        entries.discard(entry.lower())
+        self._automata.clear()
+        return True
+
+    def is_global(self, entry: str) -> bool:
+        return entry.lower() in self.words.get(GLOBAL_KEY, ())
+
+    def match(self, guild_id: int, text: str) -> Optional[str]:
+        """Return the filter entry ``text`` violates in a guild, if any."""
+        automaton = self._automata.get(guild_id)
+        if automaton is None:
+            automaton = self._automata[guild_id] = Automaton(self.entries(guild_id))
+        if not automaton.patterns:
+            return None
+
+        # Leetspeak symbols are also punctuation ("bad!"), so match both ways
+        text = normalize(text)
+        leet = unleet(text)
+        return automaton.match(text) or (automaton.match(leet) if leet != text else None)
@@ -52,6 +52,8 @@ def home():
                     <li>/guilds - List all guilds the bot is in</li>
                     <li>/commands - List all available bot commands</li>
                     <li>/cogs - List all loaded cogs</li>
+                    <li>/metrics - Performance metrics reported by the cogs</li>
+                    <li>/audit - Search the audit log (guild_id, user_id, channel_id, type, q, since, until, page)</li>
                 </ul>
                 <p>Note: Some endpoints require authentication with an API key.</p>
             </div>
@@ -74,13 +76,15 @@ def status():
 @require_api_key
 def stats():
     process = psutil.Process()
+    levels_cog = app.config['bot'].get_cog('Levels')
     return jsonify({
         "guilds": len(app.config['bot'].guilds),
         "users": len(set(app.config['bot'].get_all_members())),
         "commands": len(app.config['bot'].commands),
         "cogs": len(app.config['bot'].cogs),
         "memory_usage": f"{process.memory_info().rss / 1024 / 1024:.2f} MB",
-        "cpu_usage": f"{psutil.cpu_percent()}%"
+        "cpu_usage": f"{psutil.cpu_percent()}%",
+        "levels": levels_cog.get_stats() if levels_cog else None
     })
 
 
@@ -117,6 +121,41 @@ def cogs():
     ])
 
 
+@app.route('/metrics')
+@require_api_key
+def metrics():
+    # Collected on the event loop, reading the cogs from this thread would race it
+    return jsonify(app.config['bot'].metrics_snapshot)
+
+
+@app.route('/audit')
+@require_api_key
+def audit():
+    logs_cog = app.config['bot'].get_cog("Logs")
+    if not logs_cog:
+        return jsonify({"error": "Logs cog not loaded"}), 503
+
+    args = request.args
+    try:
+        filters = {
+            key: int(args[key]) for key in ("guild_id", "user_id", "channel_id")
+            if key in args
+        }
+        for key in ("since", "until"):
+            if key in args:
+                filters[key] = float(args[key])
+        page = int(args.get('page', 1))
+        per_page = max(1, min(int(args.get('per_page', 50)), 200))
+    except ValueError:
+        return jsonify({"error": "Invalid query parameter"}), 400
+    if page < 1:
+        return jsonify({"error": "Invalid query parameter"}), 400
+
+    return jsonify(logs_cog.audit_store.search(
+        event_type=args.get('type'), text=args.get('q'),
+        page=page, per_page=per_page, **filters))
+
+
 @app.route('/logs')
 @require_api_key
 def logs():